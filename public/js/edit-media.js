@@ -13,6 +13,14 @@ window.EditMedia = (function() {
         HANDLE_POSITIONS: ['nw', 'ne', 'sw', 'se']
     };
 
+    // Files larger than this are sent in chunks that resume after a dropped connection
+    const RESUMABLE_THRESHOLD = 8 * 1024 * 1024;
+    const CHUNK_RETRY_LIMIT = 5;
+
+    // Conversion status polling: first delay, then backing off to the maximum (ms)
+    const STATUS_POLL_INITIAL = 250;
+    const STATUS_POLL_MAX = 2000;
+
     const ALIGNMENT_ICONS = [
         { id: 'left', icon: '<svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor"><rect x="1" y="3" width="10" height="2" rx="0.5"/><rect x="1" y="7" width="14" height="2" rx="0.5"/><rect x="1" y="11" width="8" height="2" rx="0.5"/></svg>', title: 'Align left' },
         { id: 'center', icon: '<svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor"><rect x="3" y="3" width="10" height="2" rx="0.5"/><rect x="1" y="7" width="14" height="2" rx="0.5"/><rect x="4" y="11" width="8" height="2" rx="0.5"/></svg>', title: 'Align center' },
@@ -359,12 +367,17 @@ window.EditMedia = (function() {
         const fileInput = document.createElement('input');
         fileInput.type = 'file';
         fileInput.accept = 'image/*';
+        fileInput.multiple = true;
 
         fileInput.addEventListener('change', async (e) => {
-            const file = e.target.files[0];
-            if (!file) return;
+            const files = Array.from(e.target.files);
+            if (files.length === 0) return;
 
-            await uploadImage(file, insertAfterIndex, onSuccess, showNotification);
+            if (files.length === 1) {
+                await uploadImage(files[0], insertAfterIndex, onSuccess, showNotification);
+            } else {
+                await uploadImages(files, insertAfterIndex, onSuccess, showNotification);
+            }
         });
 
         fileInput.click();
@@ -381,19 +394,32 @@ window.EditMedia = (function() {
         showNotification('Uploading image...', 'info');
 
         try {
-            const formData = new FormData();
-            formData.append('image', file);
-            formData.append('sessionId', sessionFile);
+            // Skip the transfer entirely when the server already has this image
+            let result = await checkExistingImage(file);
 
-            const response = await fetch('/api/upload-image', {
-                method: 'POST',
-                body: formData,
-            });
+            if (!result && file.size > RESUMABLE_THRESHOLD) {
+                result = await uploadResumable(file, showNotification);
+            } else if (!result) {
+                const formData = new FormData();
+                formData.append('image', file);
+                formData.append('sessionId', sessionFile);
 
-            const result = await response.json();
+                const response = await fetch('/api/upload-image', {
+                    method: 'POST',
+                    body: formData,
+                });
 
-            if (!response.ok) {
-                throw new Error(result.error || 'Upload failed');
+                result = await response.json();
+
+                if (!response.ok) {
+                    throw new Error(result.error || 'Upload failed');
+                }
+            }
+
+            // New images are converted in the background; wait for the result
+            if (result.jobId) {
+                showNotification('Converting image...', 'info');
+                result = await waitForConversion(result.jobId);
             }
 
             // Track uploaded image for cleanup on cancel (but not duplicates)
@@ -421,6 +447,236 @@ window.EditMedia = (function() {
         }
     }
 
+    /**
+     * Upload several images in one request; blocks are inserted in selection order
+     * @param {File[]} files
+     * @param {number} insertAfterIndex
+     * @param {Function} onSuccess - Called once per image with its block
+     * @param {Function} showNotification
+     */
+    async function uploadImages(files, insertAfterIndex, onSuccess, showNotification) {
+        showNotification(`Uploading ${files.length} images...`, 'info');
+
+        try {
+            const formData = new FormData();
+            formData.append('sessionId', sessionFile);
+            files.forEach(file => formData.append('images', file));
+
+            const response = await fetch('/api/upload-images', {
+                method: 'POST',
+                body: formData,
+            });
+            const batch = await response.json();
+
+            if (!response.ok) {
+                throw new Error(batch.error || 'Upload failed');
+            }
+
+            // New images convert in parallel on the server; poll for all of them together
+            const jobIds = batch.results.filter(result => result.jobId).map(result => result.jobId);
+            if (jobIds.length > 0) {
+                showNotification(`Converting ${files.length} images...`, 'info');
+            }
+            const conversions = await waitForConversions(jobIds);
+            const results = batch.results.map(result => result.jobId ? conversions[result.jobId] : result);
+
+            let added = 0;
+            results.forEach(result => {
+                if (!result.path) return;
+
+                if (!result.duplicate && !uploadedImages.includes(result.path)) {
+                    uploadedImages.push(result.path);
+                    addToImagePickerCache(result.path, sessionFile);
+                }
+
+                const block = EditBlocks.createBlock('image', {
+                    src: result.path,
+                    content: `![](${result.path})`
+                });
+                if (onSuccess) {
+                    onSuccess(insertAfterIndex + added, block);
+                }
+                added++;
+            });
+
+            const failed = results.filter(result => !result.path);
+            if (failed.length > 0) {
+                console.error('Upload errors:', failed);
+                showNotification(`Added ${added} of ${results.length} images (${failed[0].error})`, true);
+            } else {
+                showNotification(`${added} images added!`, 'success');
+            }
+
+        } catch (error) {
+            console.error('Upload error:', error);
+            showNotification(`Upload error: ${error.message}`, true);
+        }
+    }
+
+    /**
+     * Ask the server whether an image was uploaded before, by content hash
+     * @param {File} file
+     * @returns {Promise<Object|null>} Upload result for a known image, or null to upload it
+     */
+    async function checkExistingImage(file) {
+        // SubtleCrypto is only available in secure contexts (https, localhost)
+        if (!window.crypto || !crypto.subtle) return null;
+
+        let response;
+        try {
+            const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+            const sha256 = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+            response = await fetch('/api/check-image', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ sha256, size: file.size, sessionId: sessionFile }),
+            });
+        } catch (error) {
+            console.warn('Image check failed, uploading instead:', error);
+            return null;
+        }
+
+        const result = await response.json().catch(() => ({}));
+        if (response.status === 413) {
+            throw new Error(result.error || 'File too large');
+        }
+        return response.ok && result.exists ? result : null;
+    }
+
+    /**
+     * Upload a large file in chunks, resuming from the server's offset after failures
+     * @param {File} file
+     * @param {Function} showNotification
+     * @returns {Promise<Object>} Upload result (a jobId for new images)
+     */
+    async function uploadResumable(file, showNotification) {
+        const upload = await postJson('/api/upload-create', {
+            filename: file.name,
+            size: file.size,
+            sessionId: sessionFile
+        });
+
+        let offset = upload.offset;
+        let failures = 0;
+        while (offset < file.size) {
+            const end = Math.min(offset + upload.chunkSize, file.size);
+            try {
+                const response = await fetch(
+                    `/api/upload-chunk?id=${encodeURIComponent(upload.uploadId)}&offset=${offset}`,
+                    { method: 'PUT', body: file.slice(offset, end) }
+                );
+                const progress = await response.json().catch(() => ({}));
+                if (response.ok) {
+                    offset = progress.offset;
+                    failures = 0;
+                } else if (typeof progress.offset === 'number' && response.status !== 404) {
+                    // Out of sync (e.g. a retried chunk already arrived): resume where the server is
+                    offset = progress.offset;
+                    failures++;
+                } else {
+                    throw new Error(progress.error || 'Upload failed');
+                }
+            } catch (error) {
+                if (error instanceof TypeError) {
+                    // Network error: ask the server how much arrived
+                    failures++;
+                    offset = await fetchUploadOffset(upload.uploadId, offset);
+                } else {
+                    throw error;
+                }
+            }
+            if (failures > CHUNK_RETRY_LIMIT) {
+                throw new Error('Upload failed after repeated retries');
+            }
+            if (failures > 0) {
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** failures));
+            }
+            showNotification(`Uploading image... ${Math.floor(offset * 100 / file.size)}%`, 'info');
+        }
+
+        return postJson('/api/upload-finalize', { uploadId: upload.uploadId });
+    }
+
+    /**
+     * Get how many bytes of a resumable upload the server has
+     * @param {string} uploadId
+     * @param {number} fallback - Offset to use if the server can't be reached
+     * @returns {Promise<number>}
+     */
+    async function fetchUploadOffset(uploadId, fallback) {
+        try {
+            const response = await fetch(`/api/upload-progress?id=${encodeURIComponent(uploadId)}`);
+            if (response.ok) {
+                return (await response.json()).offset;
+            }
+        } catch (error) {
+            // Still offline; the retry backoff applies
+        }
+        return fallback;
+    }
+
+    /**
+     * POST a JSON body and return the parsed response, throwing on errors
+     * @param {string} url
+     * @param {Object} body
+     * @returns {Promise<Object>}
+     */
+    async function postJson(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body),
+        });
+        const result = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            throw new Error(result.error || 'Upload failed');
+        }
+        return result;
+    }
+
+    /**
+     * Poll the server until a background conversion finishes
+     * @param {string} jobId
+     * @returns {Promise<Object>} Upload result with the converted image path
+     */
+    async function waitForConversion(jobId) {
+        const status = (await waitForConversions([jobId]))[jobId];
+        if (status.status === 'failed') {
+            throw new Error(status.error || 'Conversion failed');
+        }
+        return status;
+    }
+
+    /**
+     * Poll the server with one request per round until every conversion of a batch finishes
+     * @param {string[]} jobIds
+     * @returns {Promise<Object>} Final status (done with a path, or failed) by job id
+     */
+    async function waitForConversions(jobIds) {
+        const finished = {};
+        let pending = jobIds;
+        let delay = STATUS_POLL_INITIAL;
+        while (pending.length > 0) {
+            await new Promise(resolve => setTimeout(resolve, delay));
+            delay = Math.min(delay * 2, STATUS_POLL_MAX);
+
+            const response = await fetch(`/api/upload-status?ids=${pending.map(encodeURIComponent).join(',')}`);
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error || 'Conversion failed');
+            }
+
+            pending.forEach(jobId => {
+                const status = result.jobs[jobId];
+                if (status && status.status !== 'pending') {
+                    finished[jobId] = status;
+                }
+            });
+            pending = pending.filter(jobId => !finished[jobId]);
+        }
+        return finished;
+    }
+
     // ========== IMAGE PICKER ==========
 
     /**
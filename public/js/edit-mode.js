@@ -1057,6 +1057,7 @@ function initEditMode(STATE, { parseMarkdown, updateCardMedia, isDevMode }) {
 
             // Remove card from STATE arrays
             STATE.cards.splice(cardIndex, 1);
+            STATE.cardHashes.splice(cardIndex, 1);
             STATE.cardElements.splice(cardIndex, 1);
 
             // Remove card DOM element
@@ -1122,6 +1123,7 @@ function initEditMode(STATE, { parseMarkdown, updateCardMedia, isDevMode }) {
 
             // Update state
             STATE.cards[cardIndex] = markdownContent;
+            STATE.cardHashes[cardIndex] = null; // Rendered locally; the server's hash is picked up on refresh
 
             // Re-render card
             card.innerHTML = parseMarkdown(markdownContent);
@@ -1,6 +1,7 @@
 document.addEventListener('DOMContentLoaded', () => {
     const STATE = {
         cards: [],
+        cardHashes: [],     // server card hash for each card (null when rendered in the browser)
         cardElements: [],
         cardSlugs: [],      // slug for each card (or null if no heading)
         slugToIndex: {},    // reverse lookup: slug → card index
@@ -33,8 +34,28 @@ document.addEventListener('DOMContentLoaded', () => {
         THROW_DISTANCE: '-150%',
         THROW_ROTATION: '-10deg',
         TRANSITION_CSS: 'transform 300ms cubic-bezier(0.4, 0.0, 0.2, 1), opacity 300ms ease, z-index 0s',
+        // Rendered image width: matches #card-stack's clamp(…, 88vw, 1400px)
+        IMAGE_SIZES: '(max-width: 1590px) 88vw, 1400px',
     };
 
+    // Responsive variants per image path, from media/<session>/variants.json
+    const IMAGE_VARIANTS = {};
+
+    // Width of the main converted image (server MAX_WIDTH)
+    const MAX_IMAGE_WIDTH = 1600;
+
+    // Sanitized HTML and markdown of the server's cards, keyed by card hash
+    // (cards we already have come back from the API as a bare hash)
+    const RENDERED_HTML = {};
+    const CARD_MARKDOWN = {};
+
+    // Whether cards come from the server API (false on static hosting); they
+    // carry HTML only when the server renders cards (GROWTHLAB_SERVER_RENDER=1)
+    let serverRendered = false;
+
+    // Edit mode API, once initialized (dev mode only)
+    let editMode = null;
+
     function applyHiddenCardStyles(card) {
         card.style.opacity = '0';
         card.style.zIndex = 0;
@@ -93,6 +114,16 @@ document.addEventListener('DOMContentLoaded', () => {
      * @returns {string} - Sanitized HTML
      */
     function parseMarkdown(markdown) {
+        return finishCardHtml(renderMarkdown(markdown));
+    }
+
+    /**
+     * Render card markdown to raw HTML, expanding the custom syntax.
+     * The server mirrors these rules (utils/render.py) for pre-rendered cards.
+     * @param {string} markdown - Markdown content to parse
+     * @returns {string} - Unsanitized HTML
+     */
+    function renderMarkdown(markdown) {
         // Pre-process custom video syntax: !video(url) -> <video-embed>url</video-embed>
         // This prevents marked.js from treating it as regular text
         let processedMarkdown = markdown.replace(/!video\((.*?)\)/g, (match, url) => {
@@ -133,8 +164,15 @@ document.addEventListener('DOMContentLoaded', () => {
         );
 
         // Parse markdown with marked.js
-        const rawHtml = marked.parse(processedMarkdown);
+        return marked.parse(processedMarkdown);
+    }
 
+    /**
+     * Sanitize rendered card HTML and prepare links, images and embeds
+     * @param {string} rawHtml - HTML from renderMarkdown or the server
+     * @returns {string} - Sanitized HTML
+     */
+    function finishCardHtml(rawHtml) {
         // Sanitize with DOMPurify, allowing images, video iframes, collapsible sections, and forms
         // Note: HTML comments (like <!-- block --> separators) are automatically stripped
         const cleanHtml = DOMPurify.sanitize(rawHtml, {
@@ -166,8 +204,24 @@ document.addEventListener('DOMContentLoaded', () => {
         // Convert images to lazy-load format (data-src instead of src)
         // This prevents all images from loading at once, which crashes iOS Safari
         tempDiv.querySelectorAll('img[src]').forEach(img => {
-            img.setAttribute('data-src', img.getAttribute('src'));
+            const src = img.getAttribute('src');
+            img.setAttribute('data-src', src);
             img.removeAttribute('src');
+
+            // Let the browser pick the smallest adequate size, showing a blurred placeholder meanwhile
+            const variants = IMAGE_VARIANTS[src];
+            if (variants) {
+                const dir = src.slice(0, src.lastIndexOf('/') + 1);
+                const srcset = Object.entries(variants.widths)
+                    .map(([width, file]) => `${dir}${file} ${width}w`);
+                if (srcset.length > 0) {
+                    img.setAttribute('data-srcset', [...srcset, `${src} ${MAX_IMAGE_WIDTH}w`].join(', '));
+                }
+                if (variants.placeholder) {
+                    img.setAttribute('data-placeholder', dir + variants.placeholder);
+                    img.setAttribute('src', dir + variants.placeholder);
+                }
+            }
         });
 
         // Convert iframes (YouTube embeds) to lazy-load format
@@ -226,6 +280,43 @@ document.addEventListener('DOMContentLoaded', () => {
         UI.progressBar.setAttribute('aria-valuenow', Math.round(progress));
     }
 
+    /**
+     * Whether a media element is showing nothing or only its placeholder
+     * @param {HTMLElement} el
+     * @returns {boolean}
+     */
+    function isMediaUnloaded(el) {
+        return !el.src || (!!el.dataset.placeholder && el.getAttribute('src') === el.dataset.placeholder);
+    }
+
+    /**
+     * Load full media for an element (srcset first so the browser picks a size)
+     * @param {HTMLElement} el
+     */
+    function loadMedia(el) {
+        if (!el.dataset.src || !isMediaUnloaded(el)) return;
+        if (el.dataset.srcset) {
+            el.sizes = CONFIG.IMAGE_SIZES;
+            el.srcset = el.dataset.srcset;
+        }
+        el.src = el.dataset.src;
+    }
+
+    /**
+     * Unload media for an element, falling back to its placeholder if any
+     * @param {HTMLElement} el
+     */
+    function unloadMedia(el) {
+        if (isMediaUnloaded(el)) return;
+        el.dataset.src = el.src;
+        el.removeAttribute('srcset');
+        if (el.dataset.placeholder) {
+            el.setAttribute('src', el.dataset.placeholder);
+        } else {
+            el.removeAttribute('src');
+        }
+    }
+
     /**
      * Lazy load/unload media based on card proximity to current card.
      * In presenter mode, load all images to prevent flickering.
@@ -234,9 +325,7 @@ document.addEventListener('DOMContentLoaded', () => {
         // In presenter mode, load ALL images to prevent flickering during navigation
         if (STATE.presenterMode) {
             STATE.cardElements.forEach(card => {
-                card.querySelectorAll('[data-src]').forEach(el => {
-                    if (!el.src) el.src = el.dataset.src;
-                });
+                card.querySelectorAll('[data-src]').forEach(loadMedia);
             });
             return;
         }
@@ -251,14 +340,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
             media.forEach(el => {
                 if (distance <= LOAD_DISTANCE) {
-                    if (el.dataset.src && !el.src) {
-                        el.src = el.dataset.src;
-                    }
+                    loadMedia(el);
                 } else {
-                    if (el.src) {
-                        el.dataset.src = el.src;
-                        el.removeAttribute('src');
-                    }
+                    unloadMedia(el);
                 }
             });
         });
@@ -821,6 +905,163 @@ document.addEventListener('DOMContentLoaded', () => {
         window.history.replaceState(null, '', '?' + params.toString());
     }
 
+    /**
+     * Fetch the responsive image variants generated for a session's media
+     * @param {string} sessionFile
+     * @returns {Promise<Object>} Variants keyed by image path (empty if none)
+     */
+    async function fetchImageVariants(sessionFile) {
+        try {
+            const response = await fetch(`media/${sessionFile}/variants.json`);
+            if (!response.ok) return {};
+            const variants = await response.json();
+            const byPath = {};
+            for (const [file, info] of Object.entries(variants)) {
+                byPath[`media/${sessionFile}/${file}`] = info;
+            }
+            return byPath;
+        } catch {
+            return {};
+        }
+    }
+
+    /**
+     * Fetch a session's cards pre-rendered by the server
+     * @param {string} sessionFile
+     * @param {string[]} knownHashes - Cards we already have (the server sends only their hash)
+     * @returns {Promise<Object|null>} { cards: [{ hash, markdown, html? }] }, or null without the API
+     */
+    async function fetchRenderedCards(sessionFile, knownHashes = []) {
+        try {
+            const params = new URLSearchParams({ session: sessionFile });
+            if (knownHashes.length > 0) params.set('known', knownHashes.join(','));
+            const response = await fetch(`/api/rendered-cards?${params}`);
+            if (!response.ok) return null;
+            const rendered = await response.json();
+            rendered.cards.forEach(card => {
+                if (card.markdown === undefined) card.markdown = CARD_MARKDOWN[card.hash];
+            });
+            return rendered;
+        } catch {
+            return null;
+        }
+    }
+
+    /**
+     * Sanitized HTML for a card, rendering in the browser only when the server didn't
+     * @param {{hash: ?string, markdown: string, html?: string}} card
+     * @returns {string}
+     */
+    function cardHtml(card) {
+        if (!card.hash) return parseMarkdown(card.markdown);
+        if (!(card.hash in RENDERED_HTML)) {
+            RENDERED_HTML[card.hash] = finishCardHtml(card.html ?? renderMarkdown(card.markdown));
+            CARD_MARKDOWN[card.hash] = card.markdown;
+        }
+        return RENDERED_HTML[card.hash];
+    }
+
+    /**
+     * Rebuild the slug map used for stable card references
+     */
+    function indexCardSlugs() {
+        STATE.cardSlugs = [];
+        STATE.slugToIndex = {};
+        STATE.cards.forEach((cardMarkdown, index) => {
+            const slug = generateCardSlug(cardMarkdown);
+            STATE.cardSlugs[index] = slug;
+            if (slug && !STATE.slugToIndex[slug]) {
+                STATE.slugToIndex[slug] = index; // first occurrence wins for duplicates
+            }
+        });
+    }
+
+    /**
+     * Replace the card stack with a new set of cards
+     * @param {Array<{hash: ?string, markdown: string, html?: string}>} cards
+     */
+    function buildCards(cards) {
+        STATE.cards = cards.map(card => card.markdown);
+        STATE.cardHashes = cards.map(card => card.hash);
+        indexCardSlugs();
+
+        UI.cardStack.innerHTML = '';
+        STATE.cardElements = cards.map((card, index) => {
+            const cardEl = document.createElement('article');
+            cardEl.className = 'card';
+            cardEl.innerHTML = cardHtml(card);
+            UI.cardStack.appendChild(cardEl);
+            if (editMode) editMode.addEditButtonToCard(cardEl, index);
+            return cardEl;
+        });
+    }
+
+    /**
+     * Pick up changes saved elsewhere, re-rendering only the cards that changed
+     */
+    async function refreshCards() {
+        if (!serverRendered || STATE.editingCardIndex !== -1) return;
+
+        const known = STATE.cardHashes.filter(hash => hash in RENDERED_HTML);
+        const rendered = await fetchRenderedCards(STATE.sessionFile, known);
+        if (!rendered || STATE.editingCardIndex !== -1) return;
+
+        if (rendered.cards.length !== STATE.cardElements.length) {
+            buildCards(rendered.cards);
+            STATE.currentIndex = Math.max(0, Math.min(STATE.currentIndex, STATE.cards.length - 1));
+        } else {
+            rendered.cards.forEach((card, index) => patchCard(index, card));
+            indexCardSlugs();
+        }
+        updateCardStack();
+        updateCardMedia();
+    }
+
+    /**
+     * Replace one card's content in place
+     * @param {number} index
+     * @param {{hash: string, markdown: string, html?: string}} card
+     */
+    function patchCard(index, card) {
+        const cardEl = STATE.cardElements[index];
+        if (!cardEl || index === STATE.editingCardIndex || card.hash === STATE.cardHashes[index]) return;
+
+        STATE.cardHashes[index] = card.hash;
+        if (card.markdown === STATE.cards[index]) return; // Our own save coming back
+
+        STATE.cards[index] = card.markdown;
+        cardEl.innerHTML = cardHtml(card);
+        if (editMode) editMode.addEditButtonToCard(cardEl, index);
+    }
+
+    /**
+     * Follow the session's change stream and patch cards as they are saved
+     */
+    function subscribeToChanges() {
+        if (!serverRendered || typeof EventSource === 'undefined') return;
+
+        const events = new EventSource(`/api/events?session=${encodeURIComponent(STATE.sessionFile)}`);
+
+        // Sent on every (re)connect: resync if we missed changes while disconnected
+        events.addEventListener('ready', (e) => {
+            const { hashes } = JSON.parse(e.data);
+            const inSync = hashes.length === STATE.cardHashes.length &&
+                hashes.every((hash, index) => hash === STATE.cardHashes[index]);
+            if (!inSync) refreshCards();
+        });
+
+        events.addEventListener('card', (e) => {
+            const card = JSON.parse(e.data);
+            if (STATE.cardElements.length === 0) return;
+            patchCard(card.index, card);
+            indexCardSlugs();
+            updateCardMedia();
+        });
+
+        // Cards were added, removed or reordered
+        events.addEventListener('cards', () => refreshCards());
+    }
+
     /**
      * Initialize the viewer and load session content
      */
@@ -833,33 +1074,25 @@ document.addEventListener('DOMContentLoaded', () => {
         STATE.sessionFile = sessionFile;
 
         try {
-            const response = await fetch(`sessions/${sessionFile}.md`);
-            if (!response.ok) throw new Error('Network response was not ok');
-            const markdown = await response.text();
+            const [rendered, variants] = await Promise.all([
+                fetchRenderedCards(sessionFile),
+                fetchImageVariants(sessionFile),
+            ]);
+            Object.assign(IMAGE_VARIANTS, variants);
+
+            serverRendered = rendered !== null;
+            let cards = rendered && rendered.cards;
+            if (!cards) {
+                // No API (static hosting): render the markdown in the browser
+                const response = await fetch(`sessions/${sessionFile}.md`);
+                if (!response.ok) throw new Error('Network response was not ok');
+                const markdown = await response.text();
+                cards = markdown.split(/\n\s*---\s*\n/).map(cardMarkdown => ({ hash: null, markdown: cardMarkdown }));
+            }
 
             document.title = 'GrowthLab Session';
 
-            STATE.cards = markdown.split(/\n\s*---\s*\n/);
-
-            // Build slug map for stable card references
-            STATE.cardSlugs = [];
-            STATE.slugToIndex = {};
-            STATE.cards.forEach((cardMarkdown, index) => {
-                const slug = generateCardSlug(cardMarkdown);
-                STATE.cardSlugs[index] = slug;
-                if (slug && !STATE.slugToIndex[slug]) {
-                    STATE.slugToIndex[slug] = index; // first occurrence wins for duplicates
-                }
-            });
-
-            UI.cardStack.innerHTML = '';
-            STATE.cardElements = STATE.cards.map((cardMarkdown, index) => {
-                const card = document.createElement('article');
-                card.className = 'card';
-                card.innerHTML = parseMarkdown(cardMarkdown);
-                UI.cardStack.appendChild(card);
-                return card;
-            });
+            buildCards(cards);
 
             // Resolve card param: numeric index or slug
             let initialCardIndex;
@@ -894,9 +1127,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 updateCardMedia();
             });
 
+            // Patch cards as they are saved; re-sync when the deck comes back into view
+            subscribeToChanges();
+            document.addEventListener('visibilitychange', () => {
+                if (document.visibilityState === 'visible') refreshCards();
+            });
+
             // Initialize edit mode if available
             if (isDevMode && typeof window.initEditMode === 'function') {
-                const editMode = window.initEditMode(STATE, {
+                editMode = window.initEditMode(STATE, {
                     parseMarkdown,
                     updateCardMedia,
                     isDevMode,
@@ -5,148 +5,880 @@ Zero-dependency Python HTTP server for local development with editing capabiliti
 Replaces: python3 -m http.server
 
 Usage:
-    python3 server.py [port]
+    python3 server.py [port] [--threads N] [--async] [--workers N] [--sweep] [--root DIR] [--access-log text|json|off]
+    python3 server.py --gc      (delete unreferenced images and exit)
+    python3 server.py --export DIR   (write the static site to DIR and exit)
     Default port: 8000
+    Default threads: $GROWTHLAB_THREADS or 16 (0 = thread per connection, 1 = single-threaded)
 """
 
+import argparse
 import http.server
-import socketserver
+import io
 import json
+import re
 import urllib.parse
 import os
+import shutil
+import signal
 import sys
 import tempfile
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from datetime import datetime
 
-from utils.multipart import parse_multipart
+from utils.multipart import (
+    parse_multipart_stream, parse_multipart_files, get_boundary, discard_parts, MultipartError
+)
 from utils.images import (
-    convert_to_webp, extract_image_paths, cleanup_unused_images, delete_image,
-    find_duplicate, register_image_hash
+    VARIANT_WIDTHS, convert_to_webp, find_duplicate, find_converted, link_converted, new_image_filename
+)
+from utils.markdown import (
+    validate_session_name, load_session, save_session, update_card, delete_card, apply_card_ops
 )
-from utils.markdown import validate_session_name, read_session, write_session, update_card, delete_card, join_cards
+from utils.hash_index import hash_index
+from utils.locks import session_lock
+from utils.serving import RequestBody, create_server, describe_mode, drain
+from utils.aioserver import AsyncServer
+from utils.jobs import JobQueue, QueueFullError
+from utils.catalog import image_catalog
+from utils.image_gc import image_collector
+from utils.render import render_cache
+from utils.events import event_hub
+from utils.uploads import CHUNK_SIZE, MAX_CHUNK_BYTES, MAX_RESUMABLE_BYTES, UploadError, upload_store
+from utils import blobs, converters, metrics, prefork, static
+from utils.export import ExportError, export_site
+
+
+DEFAULT_THREADS = 16
+
+# Seconds a worker waits on a slow client's request, and (without a worker
+# pool to hand idle connections back to) on an idle keep-alive connection
+KEEPALIVE_TIMEOUT = 5
+
+# Requests served on one connection before it is closed
+MAX_KEEPALIVE_REQUESTS = 200
+
+# Largest image upload accepted in one request (larger files use resumable uploads)
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+# Limits for one bulk upload request (/api/upload-images)
+MAX_BULK_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_BULK_FILES = 50
+
+ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp'}
+
+# Routes reported individually in metrics; other GETs count as 'static'
+API_ROUTES = frozenset({
+    '/api/list-images', '/api/upload-status', '/api/metrics', '/api/rendered-cards', '/api/events',
+    '/api/check-image', '/api/upload-image', '/api/update-card', '/api/delete-card',
+    '/api/upload-images', '/api/upload-create', '/api/upload-chunk', '/api/upload-progress', '/api/upload-finalize',
+    '/api/batch-cards', '/api/cleanup-images',
+})
+
+# Largest request body each route accepts (the route itself answers 413 above
+# it); the async server checks Content-Length against this before reading
+ROUTE_BODY_LIMITS = {
+    '/api/upload-image': MAX_UPLOAD_BYTES,
+    '/api/upload-images': MAX_BULK_UPLOAD_BYTES,
+    '/api/upload-chunk': MAX_CHUNK_BYTES,
+    '/api/update-card': 1024 * 1024,
+    '/api/delete-card': 1024 * 1024,
+    '/api/batch-cards': 4 * 1024 * 1024,
+    '/api/cleanup-images': 1024 * 1024,
+    '/api/check-image': 4096,
+    '/api/upload-create': 4096,
+    '/api/upload-finalize': 4096,
+}
+
+# Access log format: 'text' (http.server's default), 'json' (one object per line) or 'off'
+ACCESS_LOG = os.environ.get('GROWTHLAB_ACCESS_LOG', 'text')
+
+# With --workers, each worker gets a share of the cores for conversions and
+# publishes job states where the other workers can answer status polls
+conversion_queue = JobQueue(
+    max_workers=int(os.environ.get('GROWTHLAB_CONVERSION_WORKERS', 0)) or None,
+    status_dir=os.environ.get('GROWTHLAB_JOB_DIR'),
+)
+
+metrics.registry.gauge('growthlab_conversion_queue_pending', 'Conversions queued or running.',
+                       lambda: conversion_queue.pending)
+metrics.registry.gauge('growthlab_event_streams', 'Open Server-Sent Event streams.',
+                       lambda: event_hub.stream_count)
 
 
 class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
     """Custom HTTP handler with API endpoints for image upload and markdown editing."""
 
+    # Persistent connections: every response must be framed (Content-Length)
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK (~40ms per keep-alive request)
+    disable_nagle_algorithm = True
+
+    # Access log format ('text', 'json' or 'off'); set from --access-log
+    access_log = ACCESS_LOG
+
+    @staticmethod
+    def max_body_bytes(path):
+        """Largest request body the route for a request target accepts (0 for routes without one)."""
+        return ROUTE_BODY_LIMITS.get(urllib.parse.urlparse(path).path, 0)
+
+    def setup(self):
+        super().setup()
+        # A pooled server hands back the count of a connection it parked while idle
+        resume = getattr(self.server, 'resume', None)
+        self.requests_served = (resume(self.request) if resume else None) or 0
+        self.resume_state = None
+        self.body = None
+
+    def handle(self):
+        """
+        Serve requests until the connection closes.
+
+        On a PooledServer an idle connection is handed back instead of
+        waiting for its next request on this worker: resume_state is set
+        and the server parks the socket until the client sends more.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            can_park = getattr(self.server, 'can_park', None)
+            if can_park and can_park() and not self.input_buffered():
+                self.resume_state = self.requests_served
+                return
+            self.handle_one_request()
+
+    def input_buffered(self):
+        """Whether the client already sent (part of) its next request."""
+        try:
+            self.connection.settimeout(0)
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def handle_one_request(self):
+        """Handle one request on the connection, resetting per-request state."""
+        self.requests_served += 1
+        self.raw_requestline = b''
+        self.body = None
+        self.route = None
+        self.request_start = None
+        self.response_status = None
+        self.response_length = 0
+        super().handle_one_request()
+        if self.request_start is not None and self.response_status is not None:
+            self.record_request()
+
+    def parse_request(self):
+        # Time from the request line on, not the keep-alive wait before it
+        self.request_start = time.perf_counter()
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'content-length':
+            self.response_length = int(value)
+        super().send_header(keyword, value)
+
+    def record_request(self):
+        """Update request metrics and write the JSON access log line."""
+        elapsed = time.perf_counter() - self.request_start
+        method = self.command if self.command in ('GET', 'HEAD', 'POST', 'OPTIONS') else 'other'
+        route = self.route or ('static' if method in ('GET', 'HEAD') else 'other')
+        try:
+            bytes_in = int(self.headers.get('Content-Length', 0))
+        except (AttributeError, ValueError):
+            bytes_in = 0
+        bytes_out = 0 if method == 'HEAD' else self.response_length
+
+        metrics.http_requests.inc(route=route, method=method, status=str(self.response_status))
+        metrics.http_duration.observe(elapsed, route=route, method=method)
+        metrics.http_bytes_in.inc(bytes_in, route=route)
+        metrics.http_bytes_out.inc(bytes_out, route=route)
+
+        if self.access_log == 'json':
+            entry = {
+                'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'client': self.client_address[0],
+                'method': self.command,
+                'path': self.path,
+                'route': route,
+                'status': self.response_status,
+                'bytesIn': bytes_in,
+                'bytesOut': bytes_out,
+                'durationMs': round(elapsed * 1000, 3),
+                'userAgent': self.headers.get('User-Agent') if self.headers else None,
+            }
+            sys.stderr.write(json.dumps(entry) + '\n')
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log == 'text':
+            super().log_request(code, size)
+
+    def log_error(self, format, *args):
+        # An idle keep-alive connection timing out between requests is routine
+        if format.startswith('Request timed out') and not self.raw_requestline:
+            return
+        super().log_error(format, *args)
+
     def do_GET(self):
         """Handle GET requests - API endpoints first, then static files."""
         parsed_path = urllib.parse.urlparse(self.path)
+        self.route = parsed_path.path if parsed_path.path in API_ROUTES else 'static'
 
         if parsed_path.path == '/api/list-images':
-            self.handle_list_images()
+            self.handle_list_images(urllib.parse.parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/upload-status':
+            self.handle_upload_status(urllib.parse.parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/upload-progress':
+            self.handle_upload_progress(urllib.parse.parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/metrics':
+            self.handle_metrics()
+        elif parsed_path.path == '/api/rendered-cards':
+            self.handle_rendered_cards(urllib.parse.parse_qs(parsed_path.query))
+        elif parsed_path.path == '/api/events':
+            self.handle_events(urllib.parse.parse_qs(parsed_path.query))
         else:
             try:
-                super().do_GET()
+                f = self.send_head()
+                if f:
+                    try:
+                        self.send_static_body(f)
+                    finally:
+                        f.close()
             except (ConnectionResetError, BrokenPipeError):
                 pass  # Client disconnected, ignore
 
+    def send_head(self):
+        """
+        Send headers for a static file, with caching validators.
+
+        Adds a strong ETag and a per-path Cache-Control policy, answers
+        If-None-Match / If-Modified-Since with 304 and honours single and
+        multi-range requests (206/416). Directory redirects and listings are
+        left to SimpleHTTPRequestHandler.
+        """
+        path = self.translate_path(self.path)
+        if static.is_hidden(os.path.relpath(path)):
+            self.send_error(404, "File not found")
+            return None
+        if os.path.isdir(path):
+            index = next((os.path.join(path, name) for name in ('index.html', 'index.htm')
+                          if os.path.isfile(os.path.join(path, name))), None)
+            if index is None or not urllib.parse.urlsplit(self.path).path.endswith('/'):
+                return super().send_head()
+            path = index
+
+        if path.endswith('/'):
+            self.send_error(404, "File not found")
+            return None
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            rel_path = os.path.relpath(path)
+            etag = static.compute_etag(rel_path, path, fs)
+            cache_control = static.cache_control(rel_path)
+
+            # Serve text assets from the compressed-variant cache when accepted
+            compressible = static.is_compressible(path, fs.st_size)
+            encoding = static.negotiate_encoding(self.headers.get('Accept-Encoding')) if compressible else None
+            etag = static.encoded_etag(etag, encoding)
+
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            if_none_match = self.headers.get('If-None-Match')
+            if (static.etag_matches(if_none_match, etag) or
+                    (if_none_match is None and
+                     static.not_modified_since(self.headers.get('If-Modified-Since'), fs.st_mtime))):
+                f.close()
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', cache_control)
+                if compressible:
+                    self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return None
+
+            content_type = self.guess_type(path)
+            last_modified = self.date_time_string(fs.st_mtime)
+            status = 200
+            length = fs.st_size
+            self.static_segments = [(b'', 0, length)]
+            self.static_trailer = b''
+            extra_headers = {}
+
+            if encoding:
+                data = static.compressed_cache.get(path, fs, encoding)
+                f.close()
+                f = io.BytesIO(data)
+                length = len(data)
+                extra_headers['Content-Encoding'] = encoding
+            elif static.if_range_allows(self.headers.get('If-Range'), etag, last_modified):
+                ranges = static.parse_range(self.headers.get('Range'), fs.st_size)
+                if ranges == []:
+                    f.close()
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{fs.st_size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return None
+                if ranges and len(ranges) == 1:
+                    start, end = ranges[0]
+                    status, length = 206, end - start + 1
+                    self.static_segments = [(b'', start, length)]
+                    extra_headers['Content-Range'] = f'bytes {start}-{end}/{fs.st_size}'
+                elif ranges:
+                    boundary, self.static_segments, self.static_trailer, length = \
+                        static.byteranges_body(ranges, fs.st_size, content_type)
+                    status = 206
+                    content_type = f'multipart/byteranges; boundary={boundary}'
+
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(length))
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            if not encoding:
+                self.send_header('Accept-Ranges', 'bytes')
+            if compressible:
+                self.send_header('Vary', 'Accept-Encoding')
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def send_static_body(self, f):
+        """
+        Send the body prepared by send_head.
+
+        File ranges go out with socket.sendfile (zero-copy os.sendfile where
+        the platform supports it); compressed bodies are already in memory.
+        """
+        if isinstance(f, io.BytesIO):
+            self.wfile.write(f.getvalue())
+            return
+        for part_header, start, length in self.static_segments:
+            if part_header:
+                self.wfile.write(part_header)
+            if length:
+                self.connection.sendfile(f, start, length)
+        if self.static_trailer:
+            self.wfile.write(self.static_trailer)
+
     def do_POST(self):
         """Handle POST requests for API endpoints."""
         parsed_path = urllib.parse.urlparse(self.path)
+        self.route = parsed_path.path if parsed_path.path in API_ROUTES else 'other'
 
-        if parsed_path.path == '/api/upload-image':
+        try:
+            self.body = RequestBody(self.rfile, int(self.headers.get('Content-Length', 0)))
+        except ValueError:
+            return self.send_error(400, "Invalid Content-Length")
+
+        if parsed_path.path == '/api/check-image':
+            self.handle_check_image()
+        elif parsed_path.path == '/api/upload-image':
             self.handle_upload_image()
+        elif parsed_path.path == '/api/upload-images':
+            self.handle_upload_images()
+        elif parsed_path.path == '/api/upload-create':
+            self.handle_upload_create()
+        elif parsed_path.path == '/api/upload-finalize':
+            self.handle_upload_finalize()
         elif parsed_path.path == '/api/update-card':
             self.handle_update_card()
         elif parsed_path.path == '/api/delete-card':
             self.handle_delete_card()
+        elif parsed_path.path == '/api/batch-cards':
+            self.handle_batch_cards()
         elif parsed_path.path == '/api/cleanup-images':
             self.handle_cleanup_images()
         else:
             self.send_error(404, "Endpoint not found")
 
+    def do_PUT(self):
+        """Handle PUT requests (chunks of resumable uploads)."""
+        parsed_path = urllib.parse.urlparse(self.path)
+        self.route = parsed_path.path if parsed_path.path in API_ROUTES else 'other'
+
+        try:
+            self.body = RequestBody(self.rfile, int(self.headers.get('Content-Length', 0)))
+        except ValueError:
+            return self.send_error(400, "Invalid Content-Length")
+
+        if parsed_path.path == '/api/upload-chunk':
+            self.handle_upload_chunk(urllib.parse.parse_qs(parsed_path.query))
+        else:
+            self.send_error(404, "Endpoint not found")
+
     def handle_upload_image(self):
         """Handle image upload, conversion to WebP, and return the path."""
-        temp_path = None
+        parts = {}
         try:
             # Check request size limit (50MB max)
             content_length = int(self.headers.get('Content-Length', 0))
-            if content_length > 50 * 1024 * 1024:
+            if content_length > MAX_UPLOAD_BYTES:
                 return self.send_json_response(413, {'error': 'File too large (max 50MB)'})
 
             # Parse multipart form data
             content_type = self.headers.get('Content-Type')
-            if not content_type or 'multipart/form-data' not in content_type:
+            boundary = get_boundary(content_type)
+            if not content_type or 'multipart/form-data' not in content_type or not boundary:
                 return self.send_json_response(400, {'error': 'Invalid content type'})
 
-            boundary = content_type.split('boundary=')[1].strip()
-            body = self.rfile.read(content_length)
-            parts = parse_multipart(body, boundary)
+            # Stream file parts straight to temp files, hashing as they arrive
+            parts = parse_multipart_stream(self.body, boundary, content_length)
 
             # Get the uploaded file
-            if 'image' not in parts:
+            if 'image' not in parts or 'path' not in parts['image']:
                 return self.send_json_response(400, {'error': 'No image file provided'})
 
             file_data = parts['image']
-            if not file_data['data']:
+            if not file_data['size']:
                 return self.send_json_response(400, {'error': 'Empty file'})
 
             # Get session ID
-            session_id = parts.get('sessionId', {}).get('data', b'session-01').decode('utf-8')
+            session_id = validate_session_name(
+                parts.get('sessionId', {}).get('data', b'session-01').decode('utf-8'))
+            if not session_id:
+                return self.send_json_response(400, {'error': 'Invalid session ID'})
 
             # Validate file extension
             filename = file_data['filename']
             ext = Path(filename).suffix.lower()
-            allowed_exts = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp'}
-            if ext not in allowed_exts:
+            if ext not in ALLOWED_IMAGE_EXTENSIONS:
                 return self.send_json_response(400, {'error': f'Invalid file type: {ext}'})
 
-            # Create temp file for upload
-            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as temp_file:
-                temp_path = temp_file.name
-                temp_file.write(file_data['data'])
+            temp_path = file_data['path']
 
             # Create output directory
             output_dir = Path('media') / session_id
             output_dir.mkdir(parents=True, exist_ok=True)
 
-            # Check for duplicate before converting
-            is_duplicate, existing_file, file_hash = find_duplicate(temp_path, output_dir)
-            if is_duplicate:
-                print(f"♻️  Duplicate detected, reusing: {existing_file}")
+            file_hash = file_data['sha256']
+            existing_path = self.reuse_existing_image(file_hash, output_dir, temp_path)
+            if existing_path is not None:
                 return self.send_json_response(200, {
                     'success': True,
-                    'path': f"media/{session_id}/{existing_file}",
+                    'path': existing_path,
                     'duplicate': True
                 })
 
-            # Generate output path
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f"{timestamp}.webp"
-            output_path = output_dir / output_filename
+            if self.submit_conversion(temp_path, file_hash, output_dir, ext == '.gif'):
+                # The job now owns the temp file
+                del parts['image']
 
-            # Convert image
-            if not convert_to_webp(temp_path, output_path, is_gif=(ext == '.gif')):
-                return self.send_json_response(500, {
-                    'error': 'Image conversion failed',
-                    'details': 'No suitable converter available'
+        except MultipartError as e:
+            self.send_json_response(400, {'error': f'Invalid upload: {str(e)}'})
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
+        finally:
+            discard_parts(parts)
+
+    def handle_upload_images(self):
+        """
+        Upload several images in one multipart request (repeated 'images' fields).
+
+        Files are deduped as a batch: images the server already has are
+        reused, and a file repeated within the batch is converted once. The
+        unique new files are converted in parallel on the conversion pool.
+        Results are returned in input order; new images carry a jobId to
+        poll, like a single upload.
+        """
+        files = []
+        parts = {}
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > MAX_BULK_UPLOAD_BYTES:
+                return self.send_json_response(413, {
+                    'error': f'Upload too large (max {MAX_BULK_UPLOAD_BYTES // (1024 * 1024)}MB)'
                 })
 
-            # Verify output exists
-            if not output_path.exists():
-                return self.send_json_response(500, {
-                    'error': 'Converted image not found',
-                    'details': f'Expected: {output_path}'
+            content_type = self.headers.get('Content-Type')
+            boundary = get_boundary(content_type)
+            if not content_type or 'multipart/form-data' not in content_type or not boundary:
+                return self.send_json_response(400, {'error': 'Invalid content type'})
+
+            # Stream every file part to its own temp file, keeping input order
+            parts, files = parse_multipart_files(self.body, boundary, content_length, 'images', MAX_BULK_FILES)
+
+            if not files:
+                return self.send_json_response(400, {'error': 'No image files provided'})
+
+            session_id = validate_session_name(
+                parts.get('sessionId', {}).get('data', b'session-01').decode('utf-8'))
+            if not session_id:
+                return self.send_json_response(400, {'error': 'Invalid session ID'})
+
+            output_dir = Path('media') / session_id
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            results = []
+            batch = {}  # sha256 -> result of the first file with that content
+            batch_admitted = False
+            for file_data in files:
+                filename = file_data['filename']
+                ext = Path(filename).suffix.lower()
+                if ext not in ALLOWED_IMAGE_EXTENSIONS:
+                    results.append({'filename': filename, 'success': False,
+                                    'error': f'Invalid file type: {ext}'})
+                    continue
+                if not file_data['size']:
+                    results.append({'filename': filename, 'success': False, 'error': 'Empty file'})
+                    continue
+                if file_data['size'] > MAX_UPLOAD_BYTES:
+                    results.append({'filename': filename, 'success': False,
+                                    'error': 'File too large (max 50MB)'})
+                    continue
+
+                file_hash = file_data['sha256']
+                if file_hash in batch:
+                    results.append(dict(batch[file_hash], filename=filename))
+                    continue
+
+                existing_path = self.reuse_existing_image(file_hash, output_dir, file_data['path'])
+                if existing_path is not None:
+                    result = {'success': True, 'path': existing_path, 'duplicate': True}
+                else:
+                    # Admit the batch as a whole: refuse it only if the queue is
+                    # already full, then let its files go past the usual bound
+                    if not batch_admitted:
+                        if conversion_queue.pending >= conversion_queue.max_pending:
+                            return self.send_json_response(429, {
+                                'error': 'Too many conversions in progress, try again shortly'
+                            }, headers={'Retry-After': '5'})
+                        batch_admitted = True
+                    try:
+                        job_id = self.queue_conversion(file_data['path'], file_hash, output_dir,
+                                                       ext == '.gif', MAX_BULK_FILES)
+                    except QueueFullError:
+                        results.append({'filename': filename, 'success': False,
+                                        'error': 'Too many conversions in progress, try again shortly'})
+                        continue
+                    del file_data['path']  # The job now owns the temp file
+                    result = {'success': True, 'jobId': job_id, 'status': 'pending'}
+                batch[file_hash] = result
+                results.append(dict(result, filename=filename))
+
+            pending = any('jobId' in result for result in results)
+            self.send_json_response(202 if pending else 200, {'results': results})
+
+        except MultipartError as e:
+            self.send_json_response(400, {'error': f'Invalid upload: {str(e)}'})
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
+        finally:
+            discard_parts(parts)
+            discard_parts(dict(enumerate(files)))
+
+    def submit_conversion(self, upload_path, file_hash, output_dir, is_gif):
+        """
+        Queue an upload for conversion and answer with its job id (202).
+
+        Returns:
+            True if the job took ownership of upload_path, False if the
+            queue was full (429 sent, the caller still owns the file)
+        """
+        try:
+            job_id = self.queue_conversion(upload_path, file_hash, output_dir, is_gif)
+        except QueueFullError:
+            self.send_json_response(429, {
+                'error': 'Too many conversions in progress, try again shortly'
+            }, headers={'Retry-After': '5'})
+            return False
+
+        self.send_json_response(202, {
+            'success': True,
+            'jobId': job_id,
+            'status': 'pending'
+        })
+        return True
+
+    def queue_conversion(self, upload_path, file_hash, output_dir, is_gif, overflow=0):
+        """
+        Convert an upload in the background; the client polls /api/upload-status.
+
+        The job converts into the blob store, links the result into
+        output_dir and deletes upload_path when done.
+
+        Args:
+            overflow: Jobs this one may queue beyond the usual bound
+
+        Returns:
+            Job id (the job now owns upload_path)
+
+        Raises:
+            QueueFullError: If too many conversions are pending
+        """
+        output_filename = new_image_filename(file_hash)
+
+        # Convert into the blob store, then link into the session
+        staged_path = blobs.staging_path(file_hash, output_dir.parent)
+
+        def on_converted(future):
+            try:
+                result = future.result()
+                if not result:
+                    metrics.conversion_failures.inc()
+                    raise RuntimeError('Image conversion failed: no suitable converter available')
+                metrics.conversion_duration.observe(result['seconds'], converter=result['converter'])
+                if not staged_path.exists():
+                    raise RuntimeError(f'Converted image not found: {staged_path}')
+                blobs.commit(staged_path, file_hash, output_dir.parent)
+                return {'path': link_converted(file_hash, output_dir, output_filename)}
+            finally:
+                os.unlink(upload_path)
+                blobs.discard(staged_path)
+
+        try:
+            return conversion_queue.submit(
+                convert_to_webp, upload_path, staged_path, is_gif,
+                VARIANT_WIDTHS, converters.conversion_order(is_gif),
+                on_done=on_converted, max_pending=conversion_queue.max_pending + overflow
+            )
+        except QueueFullError:
+            blobs.discard(staged_path)
+            raise
+
+    def handle_upload_create(self):
+        """
+        Start a resumable upload.
+
+        Body: {"filename", "size", "sessionId"}. Returns the upload id and the
+        suggested chunk size; chunks then go to PUT /api/upload-chunk.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > 4096:
+                return self.send_json_response(413, {'error': 'Request too large'})
+            data = json.loads(self.body.read(content_length).decode('utf-8'))
+
+            filename = str(data.get('filename', ''))
+            size = data.get('size')
+            session_id = validate_session_name(str(data.get('sessionId', 'session-01')))
+            ext = Path(filename).suffix.lower()
+            if ext not in ALLOWED_IMAGE_EXTENSIONS:
+                return self.send_json_response(400, {'error': f'Invalid file type: {ext}'})
+            if not isinstance(size, int) or size <= 0:
+                return self.send_json_response(400, {'error': 'Invalid size'})
+            if not session_id:
+                return self.send_json_response(400, {'error': 'Invalid session ID'})
+
+            upload = upload_store.create(filename, size, session_id)
+            self.send_json_response(201, dict(upload.progress(), chunkSize=CHUNK_SIZE))
+
+        except UploadError as e:
+            self.send_json_response(e.status, {'error': str(e)})
+        except json.JSONDecodeError:
+            self.send_json_response(400, {'error': 'Invalid JSON'})
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
+
+    def handle_upload_chunk(self, query):
+        """
+        Append a chunk to a resumable upload: PUT ?id=&offset= with the raw bytes.
+
+        A chunk must start where the previous one ended; otherwise the answer
+        is 409 with the server's offset, which is where the client resumes.
+        """
+        try:
+            upload_id = query.get('id', [''])[0]
+            offset = int(query.get('offset', ['-1'])[0])
+            upload = upload_store.write_chunk(upload_id, offset, self.body, self.body.remaining)
+            self.send_json_response(200, upload.progress())
+        except ValueError:
+            self.send_json_response(400, {'error': 'Invalid offset'})
+        except UploadError as e:
+            response = {'error': str(e)}
+            if e.offset is not None:
+                response['offset'] = e.offset
+            self.send_json_response(e.status, response)
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
+
+    def handle_upload_progress(self, query):
+        """Report how many bytes of a resumable upload have arrived."""
+        try:
+            upload = upload_store.get(query.get('id', [''])[0])
+        except UploadError as e:
+            return self.send_json_response(e.status, {'error': str(e)})
+        self.send_json_response(200, upload.progress())
+
+    def handle_upload_finalize(self):
+        """
+        Complete a resumable upload and process it like a single-request upload.
+
+        Body: {"uploadId", "sha256" (optional, verified against the bytes
+        received)}. Known images are reused; new ones are queued for
+        conversion and answered with a job id to poll.
+        """
+        temp_path = None
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > 4096:
+                return self.send_json_response(413, {'error': 'Request too large'})
+            data = json.loads(self.body.read(content_length).decode('utf-8'))
+
+            expected_sha256 = data.get('sha256')
+            if expected_sha256 is not None:
+                expected_sha256 = str(expected_sha256).lower()
+                if not re.fullmatch(r'[0-9a-f]{64}', expected_sha256):
+                    return self.send_json_response(400, {'error': 'Invalid sha256'})
+
+            upload, file_hash = upload_store.finish(str(data.get('uploadId', '')), expected_sha256)
+            temp_path = str(upload.path)
+
+            output_dir = Path('media') / upload.session_id
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            existing_path = self.reuse_existing_image(file_hash, output_dir, temp_path)
+            if existing_path is not None:
+                return self.send_json_response(200, {
+                    'success': True,
+                    'path': existing_path,
+                    'duplicate': True
                 })
 
-            # Register the new image hash
-            register_image_hash(output_dir, output_filename, file_hash)
+            is_gif = Path(upload.filename).suffix.lower() == '.gif'
+            if self.submit_conversion(temp_path, file_hash, output_dir, is_gif):
+                temp_path = None  # The job now owns the file
+
+        except UploadError as e:
+            response = {'error': str(e)}
+            if e.offset is not None:
+                response['offset'] = e.offset
+            self.send_json_response(e.status, response)
+        except json.JSONDecodeError:
+            self.send_json_response(400, {'error': 'Invalid JSON'})
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
+        finally:
+            if temp_path is not None:
+                Path(temp_path).unlink(missing_ok=True)
+
+    def reuse_existing_image(self, file_hash, output_dir, file_path=None):
+        """
+        Find an image already uploaded with this source hash.
+
+        Returns the session's own copy if it has one; otherwise an image
+        converted for any session is linked into this one.
+
+        Returns:
+            Image path (media/...), or None if the image must be uploaded and converted
+        """
+        # Already in this session: reuse it
+        is_duplicate, existing_path, file_hash = find_duplicate(file_path, output_dir, file_hash)
+        if is_duplicate:
+            image_collector.retain(existing_path)
+            print(f"♻️  Duplicate detected, reusing: {existing_path}")
+            return existing_path
+
+        # Converted before (in any session): link it in, no conversion needed
+        if find_converted(file_hash, output_dir) is not None:
+            image_path = link_converted(file_hash, output_dir, new_image_filename(file_hash))
+            print(f"♻️  Already converted, linked: {image_path}")
+            return image_path
+
+        return None
+
+    def handle_check_image(self):
+        """
+        Look up an image by a client-computed SHA-256 before it is uploaded.
+
+        Body: {"sha256": hex digest, "size": bytes, "sessionId": session}.
+        A known image is reused (or linked into the session) exactly as an
+        upload of it would be, and its path returned, so the client can skip
+        sending the file. Unknown images and sessions leave nothing behind.
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > 4096:
+                return self.send_json_response(413, {'error': 'Request too large'})
+            data = json.loads(self.body.read(content_length).decode('utf-8'))
+
+            file_hash = str(data.get('sha256', '')).lower()
+            size = data.get('size')
+            session_id = validate_session_name(str(data.get('sessionId', 'session-01')))
+            if not re.fullmatch(r'[0-9a-f]{64}', file_hash):
+                return self.send_json_response(400, {'error': 'Invalid sha256'})
+            if not isinstance(size, int) or size <= 0:
+                return self.send_json_response(400, {'error': 'Invalid size'})
+            if not session_id:
+                return self.send_json_response(400, {'error': 'Invalid session ID'})
+            if size > MAX_RESUMABLE_BYTES:
+                return self.send_json_response(413, {'error': 'File too large (max 200MB)'})
 
+            # Probe without side effects; only a match for a real session is linked in
+            output_dir = Path('media') / session_id
+            known = blobs.blob_path(file_hash).exists() or hash_index.lookup(file_hash, output_dir)
+            if not known or not (Path('sessions') / f'{session_id}.md').exists():
+                return self.send_json_response(200, {'exists': False})
+            output_dir.mkdir(parents=True, exist_ok=True)
+            existing_path = self.reuse_existing_image(file_hash, output_dir)
+            if existing_path is None:
+                return self.send_json_response(200, {'exists': False})
             self.send_json_response(200, {
+                'exists': True,
                 'success': True,
-                'path': f"media/{session_id}/{output_filename}"
+                'path': existing_path,
+                'duplicate': True
             })
 
+        except json.JSONDecodeError:
+            self.send_json_response(400, {'error': 'Invalid JSON'})
         except Exception as e:
-            self.send_json_response(500, {'error': f'Upload error: {str(e)}'})
-        finally:
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception:
-                    pass
+            self.send_json_response(500, {'error': f'Check error: {str(e)}'})
+
+    def handle_upload_status(self, query):
+        """
+        Report the status of background conversions (clients poll until they finish).
+
+        ?id=<job> answers for one job (404 if unknown); ?ids=<job>,<job>,...
+        answers for a whole batch in one request, as {"jobs": {id: status}}
+        with unknown ids reported as failed.
+        """
+        if 'ids' in query:
+            job_ids = [job_id for job_id in query['ids'][0].split(',') if job_id][:MAX_BULK_FILES]
+            jobs = {job_id: self.job_status(job_id) for job_id in job_ids}
+            return self.send_json_response(200, {'jobs': {
+                job_id: status or {'jobId': job_id, 'status': 'failed', 'error': 'Unknown job id'}
+                for job_id, status in jobs.items()
+            }})
+
+        job_id = query.get('id', [''])[0]
+        status = self.job_status(job_id)
+        if status is None:
+            return self.send_json_response(404, {'error': 'Unknown job id'})
+        self.send_json_response(200, status)
+
+    def job_status(self, job_id):
+        """Client view of a conversion job, or None if the id is unknown or expired."""
+        job = conversion_queue.get(job_id)
+        if job is None:
+            return None
+        status = {'jobId': job_id, 'status': job['status']}
+        if job['status'] == 'done':
+            status.update(success=True, path=job['path'])
+        elif job['status'] == 'failed':
+            status['error'] = job['error']
+        return status
 
     def handle_update_card(self):
         """Handle markdown file update for a specific card."""
@@ -157,7 +889,7 @@ class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
                 return self.send_json_response(413, {'error': 'Markdown too large (max 1MB)'})
 
             # Read JSON body
-            body = self.rfile.read(content_length).decode('utf-8')
+            body = self.body.read(content_length).decode('utf-8')
             data = json.loads(body)
 
             # Validate input
@@ -175,28 +907,14 @@ class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
             if not session_file:
                 return self.send_json_response(400, {'error': 'Invalid session file name'})
 
-            # Update the card
-            success, old_content, new_full_content, error = update_card(session_file, card_index, new_content)
-            if not success:
-                status = 404 if 'not found' in error else 400
-                return self.send_json_response(status, {'error': error})
-
-            # Clean up unused images
-            deleted_count = cleanup_unused_images(old_content, new_full_content, session_file)
-            if deleted_count > 0:
-                print(f"✨ Cleaned up {deleted_count} unused image(s)")
-
-            # Clean up images uploaded this session but not in final markdown
-            uploaded_images = data.get('uploadedImages', [])
-            if uploaded_images:
-                new_images = extract_image_paths(new_full_content, session_file)
-                for img_path in uploaded_images:
-                    if img_path not in new_images:
-                        delete_image(img_path)
-                        deleted_count += 1
-
-            # Write the updated content
-            write_session(session_file, new_full_content)
+            with session_lock(session_file):
+                # Update the card
+                success, new_session, removed_images, error = update_card(session_file, card_index, new_content)
+                if not success:
+                    status = 404 if 'not found' in error else 400
+                    return self.send_json_response(status, {'error': error})
+
+                deleted_count = self.save_card_edit(new_session, removed_images, data.get('uploadedImages', []))
             self.send_json_response(200, {'success': True, 'deletedImages': deleted_count})
 
         except json.JSONDecodeError:
@@ -211,7 +929,7 @@ class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
             if content_length > 1 * 1024 * 1024:
                 return self.send_json_response(413, {'error': 'Request too large'})
 
-            body = self.rfile.read(content_length).decode('utf-8')
+            body = self.body.read(content_length).decode('utf-8')
             data = json.loads(body)
 
             session_file = data.get('sessionFile')
@@ -226,19 +944,14 @@ class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
             if not session_file:
                 return self.send_json_response(400, {'error': 'Invalid session file name'})
 
-            # Delete the card
-            success, deleted_content, new_full_content, error = delete_card(session_file, card_index)
-            if not success:
-                status = 404 if 'not found' in error else 400
-                return self.send_json_response(status, {'error': error})
-
-            # Clean up images from deleted card that aren't used elsewhere
-            deleted_count = cleanup_unused_images(deleted_content, new_full_content, session_file)
-            if deleted_count > 0:
-                print(f"✨ Cleaned up {deleted_count} image(s) from deleted card")
+            with session_lock(session_file):
+                # Delete the card
+                success, new_session, removed_images, error = delete_card(session_file, card_index)
+                if not success:
+                    status = 404 if 'not found' in error else 400
+                    return self.send_json_response(status, {'error': error})
 
-            # Write the updated content
-            write_session(session_file, new_full_content)
+                self.save_card_edit(new_session, removed_images)
             self.send_json_response(200, {'success': True})
 
         except json.JSONDecodeError:
@@ -246,91 +959,391 @@ class GrowthLabHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_json_response(500, {'error': f'Delete error: {str(e)}'})
 
+    def handle_batch_cards(self):
+        """Apply an ordered list of card edits to one session with a single write."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > 4 * 1024 * 1024:
+                return self.send_json_response(413, {'error': 'Request too large (max 4MB)'})
+
+            body = self.body.read(content_length).decode('utf-8')
+            data = json.loads(body)
+
+            session_file = data.get('sessionFile')
+            ops = data.get('ops')
+            if not session_file or not isinstance(ops, list):
+                return self.send_json_response(400, {'error': 'Missing required fields: sessionFile, ops'})
+
+            session_file = validate_session_name(session_file)
+            if not session_file:
+                return self.send_json_response(400, {'error': 'Invalid session file name'})
+
+            with session_lock(session_file):
+                success, new_session, removed_images, error = apply_card_ops(session_file, ops)
+                if not success:
+                    status = 404 if 'not found' in error else 400
+                    return self.send_json_response(status, {'error': error})
+
+                deleted_count = self.save_card_edit(new_session, removed_images, data.get('uploadedImages', []))
+            self.send_json_response(200, {
+                'success': True,
+                'cardCount': len(new_session.cards),
+                'deletedImages': deleted_count
+            })
+
+        except json.JSONDecodeError:
+            self.send_json_response(400, {'error': 'Invalid JSON'})
+        except Exception as e:
+            self.send_json_response(500, {'error': f'Batch error: {str(e)}'})
+
+    def save_card_edit(self, new_session, removed_images, uploaded_images=()):
+        """
+        Write an edited session and release the images it no longer uses.
+
+        Caller holds the session lock. Images no session references any
+        more are deleted shortly afterwards by the image collector.
+
+        Args:
+            new_session: Edited SessionModel
+            removed_images: Images the edit dropped from their last card
+            uploaded_images: Images uploaded while editing; released if unused
+
+        Returns:
+            Number of images queued for deletion
+        """
+        save_session(new_session)
+        return image_collector.release(set(removed_images) | set(uploaded_images))
+
     def handle_cleanup_images(self):
         """Delete images that were uploaded but never saved (on cancel)."""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length).decode('utf-8')
+            if content_length > ROUTE_BODY_LIMITS['/api/cleanup-images']:
+                return self.send_json_response(413, {'error': 'Request too large'})
+            body = self.body.read(content_length).decode('utf-8')
             data = json.loads(body)
 
-            deleted = sum(1 for img in data.get('images', []) if delete_image(img))
+            # Only images no session references are deleted (by the collector)
+            deleted = image_collector.release(data.get('images', []))
             self.send_json_response(200, {'success': True, 'deleted': deleted})
         except Exception as e:
             self.send_json_response(500, {'error': str(e)})
 
-    def handle_list_images(self):
-        """List all images across all sessions for the image picker."""
+    def handle_list_images(self, query):
+        """
+        List images across sessions for the image picker.
+
+        Served from the cached catalogue. Supports ?session= to filter and
+        ?offset=&limit= to paginate; answers If-None-Match with 304.
+        """
         try:
-            media_dir = Path('media')
-            all_images = {}
-
-            if media_dir.exists():
-                for session_dir in sorted(media_dir.iterdir()):
-                    if session_dir.is_dir() and session_dir.name.startswith('session-'):
-                        session_images = []
-                        for img in session_dir.glob('*.webp'):
-                            # Parse date from filename (20251124_152646.webp)
-                            name = img.stem
-                            formatted_date = ''
-                            try:
-                                date_obj = datetime.strptime(name, '%Y%m%d_%H%M%S')
-                                formatted_date = date_obj.strftime('%b %d')
-                            except ValueError:
-                                pass
-
-                            session_images.append({
-                                'path': f'media/{session_dir.name}/{img.name}',
-                                'date': formatted_date
-                            })
-
-                        # Sort by filename descending (newest first)
-                        session_images.sort(key=lambda x: x['path'], reverse=True)
-                        all_images[session_dir.name] = session_images
-
-            self.send_json_response(200, {'images': all_images})
+            session = query.get('session', [None])[0]
+            offset = max(int(query.get('offset', ['0'])[0]), 0)
+            limit = query.get('limit', [None])[0]
+            limit = max(int(limit), 0) if limit is not None else None
+        except ValueError:
+            return self.send_json_response(400, {'error': 'Invalid offset or limit'})
+
+        try:
+            body, etag = image_catalog.listing(session, offset, limit)
         except Exception as e:
-            self.send_json_response(500, {'error': str(e)})
+            return self.send_json_response(500, {'error': str(e)})
 
-    def send_json_response(self, status_code, data):
+        if static.etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_rendered_cards(self, query):
+        """
+        Serve a session's cards with their hashes (and HTML, when the server renders).
+
+        ?known= lists card hashes the client already has; those cards are sent
+        as just their hash so a reload only transfers changed cards. Answers If-None-Match
+        with 304 and compresses when the client accepts it.
+        """
+        session_file = validate_session_name(query.get('session', [''])[0])
+        if not session_file:
+            return self.send_json_response(400, {'error': 'Invalid session file name'})
+        known = [h for value in query.get('known', []) for h in value.split(',') if h]
+
+        try:
+            model = load_session(session_file)
+            if model is None:
+                return self.send_json_response(404, {'error': 'Session not found'})
+            body, etag = render_cache.session_payload(model, known)
+        except Exception as e:
+            return self.send_json_response(500, {'error': str(e)})
+
+        encoding = static.negotiate_encoding(self.headers.get('Accept-Encoding'))
+        etag = static.encoded_etag(etag, encoding)
+        if static.etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        if encoding:
+            body = static.compress_body(body, encoding)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_events(self, query):
+        """
+        Stream a session's card changes as Server-Sent Events.
+
+        Once the headers are sent the connection is handed to the event hub,
+        so an idle viewer holds a socket but not a worker thread.
+        """
+        session_file = validate_session_name(query.get('session', [''])[0])
+        if not session_file:
+            return self.send_json_response(400, {'error': 'Invalid session file name'})
+        if load_session(session_file) is None:
+            return self.send_json_response(404, {'error': 'Session not found'})
+        if not event_hub.has_capacity():
+            return self.send_json_response(503, {'error': 'Too many open event streams'},
+                                           {'Retry-After': '30'})
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')  # The stream ends when the connection does
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        self.attach_event_stream(session_file)
+
+    def attach_event_stream(self, session_file):
+        """Hand the connection, its event-stream headers sent, to the event hub."""
+        self.wfile.flush()
+        event_hub.attach(self.connection, session_file)
+
+    def handle_metrics(self):
+        """Expose request, conversion and cleanup metrics in Prometheus text format."""
+        body = metrics.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_response(self, status_code, data, headers=None):
         """Send a JSON response."""
+        body = json.dumps(data).encode('utf-8')
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
 
     def do_OPTIONS(self):
         """Handle CORS preflight requests."""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
     def end_headers(self):
-        """Add CORS headers to all responses."""
+        """Add CORS headers to all responses and decide whether to keep the connection."""
         self.send_header('Access-Control-Allow-Origin', '*')
+        if not self.close_connection and (
+                self.requests_served >= MAX_KEEPALIVE_REQUESTS or self.body_unread()
+                or not getattr(self.server, 'persistent_connections', True)):
+            # Sets close_connection as well
+            self.send_header('Connection', 'close')
         super().end_headers()
 
+    def body_unread(self):
+        """Whether the request body (if any) has not been fully read."""
+        if self.body is not None:
+            return self.body.remaining > 0
+        headers = getattr(self, 'headers', None)
+        if headers is None:
+            return False
+        return 'Transfer-Encoding' in headers or headers.get('Content-Length', '0').strip() not in ('', '0')
+
+
+def run_server(port=8000, threads=DEFAULT_THREADS, root='public', use_async=False, workers=1, sweep=False):
+    """
+    Start the development server.
+
+    With use_async, connections are served from an asyncio event loop. With
+    workers > 1 this process becomes the supervisor of that many worker
+    processes, which re-run this function on the shared listening socket.
+    With sweep, orphaned images are also swept periodically (as --gc does).
+    """
+    listen_socket = prefork.inherited_socket()
+    if workers > 1 and listen_socket is None:
+        return run_supervisor(port, threads, root, use_async, workers)
+    worker = prefork.worker_index()
+    if worker is not None:
+        # Each worker answers /api/metrics with its own counters
+        metrics.registry.const_labels['worker'] = str(worker)
+
+    os.chdir(root)
 
-def run_server(port=8000):
-    """Start the development server."""
-    os.chdir('public')
+    # Precompress text assets in the background; later edits refresh lazily
+    threading.Thread(target=static.compressed_cache.warm, args=('.',), daemon=True).start()
 
-    socketserver.TCPServer.allow_reuse_address = True
+    # Delete images edits dropped off the request path; sweeps are opt-in (one worker sweeps)
+    image_collector.start(sweep=sweep and not worker)
 
-    with socketserver.TCPServer(("", port), GrowthLabHandler) as httpd:
+    # Pick the fastest working converter once instead of per upload
+    available = converters.probe(VARIANT_WIDTHS)
+
+    if use_async:
+        # Threads only run handlers here; connections live on the event loop
+        threads = threads if threads > 1 else DEFAULT_THREADS
+        httpd = AsyncServer(port, GrowthLabHandler, threads, listen_socket)
+        mode = f"asyncio event loop, {threads} handler threads"
+    else:
+        httpd = create_server(port, GrowthLabHandler, threads, listen_socket)
+        mode = describe_mode(threads)
+
+    if worker is None:
         print(f"🚀 GrowthLab Dev Server running at http://localhost:{port}/")
         print(f"📝 Edit mode enabled on localhost")
-        print(f"📁 Serving from: public/")
+        print(f"📁 Serving from: {root.rstrip('/')}/")
+        print(f"🧵 Concurrency: {mode}, {conversion_queue.max_workers} conversion worker(s)")
+        print(f"🖼️  Converters: {converters.describe(available)}")
         print(f"   Press Ctrl+C to stop\n")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("\n\n👋 Server stopped")
-            sys.exit(0)
+    else:
+        print(f"👷 Worker {worker} (pid {os.getpid()}): {mode}, "
+              f"{conversion_queue.max_workers} conversion worker(s), {converters.describe(available)}")
+
+    # SIGTERM stops gracefully: no new connections, accepted ones finish
+    def stop(*_):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    if worker is not None:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor handles Ctrl+C
+        prefork.watch_parent(stop)
+        prefork.notify_ready()
+
+    graceful = False
+    try:
+        httpd.serve_forever()
+        graceful = True
+    except KeyboardInterrupt:
+        print("\n\n👋 Server stopped")
+        sys.exit(0)
+    finally:
+        if not use_async:
+            if graceful:
+                drain(httpd)
+            httpd.server_close()
+        # Conversions already accepted finish, so their clients get a result
+        conversion_queue.shutdown(wait=graceful)
+    if worker is None:
+        print("\n👋 Server stopped")
+
+
+def run_supervisor(port, threads, root, use_async, workers):
+    """Run `workers` server processes on one listening socket and supervise them."""
+    sock = prefork.listen(port)
+    job_dir = tempfile.mkdtemp(prefix='growthlab-jobs-')
+    env = dict(os.environ, GROWTHLAB_JOB_DIR=job_dir)
+    env.setdefault('GROWTHLAB_CONVERSION_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+    command = [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:]
+
+    print(f"🚀 GrowthLab Dev Server running at http://localhost:{port}/")
+    print(f"📝 Edit mode enabled on localhost")
+    print(f"📁 Serving from: {root.rstrip('/')}/")
+    print(f"🧵 Concurrency: {workers} worker processes (pid {os.getpid()} supervises; "
+          f"SIGHUP restarts them, SIGTERM stops)")
+    print(f"   Press Ctrl+C to stop\n")
+    try:
+        prefork.Supervisor(sock, workers, command, env).run()
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    print("\n👋 Server stopped")
+
+
+def run_gc(root='public'):
+    """Sweep unreferenced images, stale manifest entries and unused blobs, then exit."""
+    os.chdir(root)
+    stats = image_collector.sweep()
+    print(f"🧹 Removed {stats['images']} orphaned image(s), "
+          f"{stats['manifestEntries']} stale manifest entr(ies), {stats['blobs']} unused blob(s)")
+
+
+def run_export(out_dir, root='public'):
+    """Write the read-only site, with fingerprinted and precompressed assets, to out_dir."""
+    try:
+        manifest = export_site(root, out_dir)
+    except ExportError as e:
+        sys.exit(f"❌ Export failed: {e}")
+    files = manifest['files']
+    fingerprinted = sum(1 for source, entry in files.items() if entry['path'] != source)
+    precompressed = sum(1 for entry in files.values() if entry['encodings'])
+    print(f"📦 Exported {len(files)} file(s) to {out_dir.rstrip('/')}/: {fingerprinted} fingerprinted, "
+          f"{precompressed} precompressed, {len(manifest['omitted'])} edit-only left out")
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description='GrowthLab Dev Server')
+    parser.add_argument('port', nargs='?', type=int, default=8000,
+                        help='Port to listen on (default: 8000)')
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('GROWTHLAB_THREADS', DEFAULT_THREADS)),
+                        help='Worker threads; 0 = thread per connection, 1 = single-threaded')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        default=os.environ.get('GROWTHLAB_ASYNC') == '1',
+                        help='Serve connections from an asyncio event loop (handlers run on --threads)')
+    parser.add_argument('--sweep', action='store_true',
+                        default=os.environ.get('GROWTHLAB_SWEEP') == '1',
+                        help='Also sweep orphaned images every few hours while serving (as --gc does)')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('GROWTHLAB_WORKERS', 1)),
+                        help='Server processes sharing the port (default: 1); each runs --threads')
+    parser.add_argument('--root', default='public',
+                        help='Directory to serve (default: public)')
+    parser.add_argument('--access-log', choices=('text', 'json', 'off'), default=ACCESS_LOG,
+                        help='Access log format (default: $GROWTHLAB_ACCESS_LOG or text)')
+    parser.add_argument('--gc', action='store_true',
+                        help='Delete images no session references (older than a day) and exit')
+    parser.add_argument('--export', metavar='DIR',
+                        help='Write the read-only site with fingerprinted assets to DIR for static hosting, and exit')
+    args = parser.parse_args(argv)
+    if args.threads < 0:
+        parser.error('--threads must be >= 0')
+    if args.workers < 1:
+        parser.error('--workers must be >= 1')
+    if args.workers > 1 and os.name != 'posix':
+        parser.error('--workers requires a POSIX system')
+    return args
 
 
 if __name__ == "__main__":
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
-    run_server(port)
+    args = parse_args()
+    if args.gc:
+        run_gc(args.root)
+    elif args.export:
+        run_export(args.export, args.root)
+    else:
+        GrowthLabHandler.access_log = args.access_log
+        run_server(args.port, args.threads, args.root, args.use_async, args.workers, args.sweep)
@@ -0,0 +1,118 @@
+"""Tests for multi-op card edits."""
+
+import os
+import tempfile
+import unittest
+import uuid
+
+from utils.markdown import CARD_DELIMITER, apply_card_ops, get_session_path, load_session
+
+
+class ApplyCardOpsTest(unittest.TestCase):
+
+    def setUp(self):
+        # Sessions are read from sessions/<name>.md under the working directory
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(temp_dir.name)
+        os.mkdir('sessions')
+
+        # A fresh name per test, so the parsed-session cache never carries over
+        self.session = f'test-{uuid.uuid4().hex[:8]}'
+        self.cards = [
+            'A\n\n![](media/test/a.webp)',
+            'B\n\n![](media/test/b.webp)',
+            'C',
+        ]
+        get_session_path(self.session).write_text(CARD_DELIMITER.join(self.cards), encoding='utf-8')
+
+    def apply(self, ops):
+        return apply_card_ops(self.session, ops)
+
+    def assert_rejected(self, ops, error):
+        success, model, removed, message = self.apply(ops)
+        self.assertFalse(success)
+        self.assertIsNone(model)
+        self.assertIn(error, message)
+        # Nothing is applied, not even the ops before the bad one
+        self.assertEqual(load_session(self.session).cards, self.cards)
+
+    def test_indexes_follow_preceding_ops(self):
+        # After deleting card 0, index 0 is what was card 1
+        success, model, removed, _ = self.apply([
+            {'op': 'delete', 'index': 0},
+            {'op': 'update', 'index': 0, 'content': 'B2'},
+        ])
+        self.assertTrue(success)
+        self.assertEqual(model.cards, ['B2', 'C'])
+        self.assertEqual(removed, {'media/test/a.webp', 'media/test/b.webp'})
+
+    def test_update_then_delete_same_card(self):
+        success, model, removed, _ = self.apply([
+            {'op': 'update', 'index': 1, 'content': 'B2\n\n![](media/test/new.webp)'},
+            {'op': 'delete', 'index': 1},
+        ])
+        self.assertTrue(success)
+        self.assertEqual(model.cards, [self.cards[0], 'C'])
+        self.assertEqual(removed, {'media/test/b.webp', 'media/test/new.webp'})
+
+    def test_image_dropped_then_referenced_again(self):
+        # Deleting a card and re-inserting its image elsewhere keeps the image
+        success, model, removed, _ = self.apply([
+            {'op': 'delete', 'index': 0},
+            {'op': 'insert', 'index': 2, 'content': 'moved\n\n![](media/test/a.webp)'},
+        ])
+        self.assertTrue(success)
+        self.assertEqual(model.cards, [self.cards[1], 'C', 'moved\n\n![](media/test/a.webp)'])
+        self.assertEqual(removed, set())
+        self.assertTrue(model.references('media/test/a.webp'))
+
+    def test_move_then_update_moved_card(self):
+        success, model, removed, _ = self.apply([
+            {'op': 'move', 'from': 2, 'to': 0},
+            {'op': 'update', 'index': 0, 'content': 'C2'},
+        ])
+        self.assertTrue(success)
+        self.assertEqual(model.cards, ['C2', self.cards[0], self.cards[1]])
+        self.assertEqual(removed, set())
+
+    def test_index_removed_by_earlier_op(self):
+        self.assert_rejected([
+            {'op': 'delete', 'index': 2},
+            {'op': 'update', 'index': 2, 'content': 'gone'},
+        ], 'Invalid card index (op 1)')
+
+    def test_move_to_index_removed_by_earlier_op(self):
+        self.assert_rejected([
+            {'op': 'delete', 'index': 0},
+            {'op': 'move', 'from': 0, 'to': 2},
+        ], 'Invalid card index (op 1)')
+
+    def test_deleting_every_card(self):
+        self.assert_rejected([
+            {'op': 'delete', 'index': 0},
+            {'op': 'delete', 'index': 0},
+            {'op': 'delete', 'index': 0},
+        ], 'Cannot delete the only card')
+
+    def test_insert_past_end(self):
+        self.assert_rejected([{'op': 'insert', 'index': 4, 'content': 'x'}], 'Invalid card index (op 0)')
+
+    def test_malformed_ops(self):
+        for ops, error in (
+            ([{'op': 'update', 'index': True, 'content': 'x'}], 'Invalid card index'),
+            ([{'op': 'update', 'index': '0', 'content': 'x'}], 'Invalid card index'),
+            ([{'op': 'update', 'index': 0}], 'Missing card content'),
+            ([{'op': 'rename', 'index': 0}], 'Unknown operation (op 0)'),
+            (['delete'], 'Unknown operation (op 0)'),
+        ):
+            with self.subTest(ops=ops):
+                self.assert_rejected(ops, error)
+
+    def test_missing_session(self):
+        self.assertEqual(apply_card_ops('missing', []), (False, None, None, 'Session file not found'))
+
+
+if __name__ == '__main__':
+    unittest.main()
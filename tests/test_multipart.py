@@ -0,0 +1,164 @@
+"""Tests for the streaming multipart parser."""
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import multipart
+from utils.multipart import MultipartError, parse_multipart_stream
+
+
+BOUNDARY = 'growthlab-boundary'
+
+
+def build_body(parts, boundary=BOUNDARY, close=True):
+    """Encode (headers, data) parts as a multipart/form-data body."""
+    body = b'preamble\r\n'
+    for headers, data in parts:
+        body += f'--{boundary}\r\n{headers}\r\n\r\n'.encode() + data + b'\r\n'
+    if close:
+        body += f'--{boundary}--\r\n'.encode()
+    return body
+
+
+def field(name, value):
+    return f'Content-Disposition: form-data; name="{name}"', value
+
+
+def file_part(name, filename, data):
+    return (f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream'), data
+
+
+class TrickleStream(io.RawIOBase):
+    """Stream that returns at most `step` bytes per read, like a slow socket."""
+
+    def __init__(self, data, step):
+        self.data = io.BytesIO(data)
+        self.step = step
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.step
+        return self.data.read(min(size, self.step))
+
+
+class ParseMultipartStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        # Spooled uploads land here, so leaked temp files can be detected
+        self.temp_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(tempfile, 'tempdir', self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def parse(self, body, step=None, content_length=None):
+        stream = TrickleStream(body, step) if step else io.BytesIO(body)
+        parts = parse_multipart_stream(stream, BOUNDARY, len(body) if content_length is None else content_length)
+        for part in parts.values():
+            if 'path' in part:
+                self.addCleanup(lambda path=part['path']: os.path.exists(path) and os.unlink(path))
+        return parts
+
+    def read_file(self, part):
+        with open(part['path'], 'rb') as f:
+            return f.read()
+
+    def assert_no_temp_files(self):
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_fields_and_file(self):
+        image = os.urandom(5000)
+        parts = self.parse(build_body([field('sessionId', b'session-01'), file_part('image', 'a.PNG', image)]))
+
+        self.assertEqual(parts['sessionId']['data'], b'session-01')
+        self.assertIsNone(parts['sessionId']['filename'])
+        self.assertEqual(parts['image']['filename'], 'a.PNG')
+        self.assertEqual(parts['image']['size'], len(image))
+        self.assertEqual(parts['image']['sha256'], hashlib.sha256(image).hexdigest())
+        self.assertTrue(parts['image']['path'].endswith('.png'))
+        self.assertEqual(self.read_file(parts['image']), image)
+
+    def test_boundary_split_across_reads(self):
+        # Every read size up to past the delimiter length puts a split at each
+        # position of a boundary, including inside the file's closing delimiter
+        image = b'\x89PNG' + os.urandom(300)
+        body = build_body([field('sessionId', b'session-01'), file_part('image', 'a.png', image)])
+        for step in range(1, len(BOUNDARY) + 8):
+            with self.subTest(step=step):
+                parts = self.parse(body, step=step)
+                self.assertEqual(parts['sessionId']['data'], b'session-01')
+                self.assertEqual(self.read_file(parts['image']), image)
+
+    def test_boundary_split_across_chunks(self):
+        # CHUNK_SIZE smaller than the delimiter: the parser must keep a tail
+        # of each chunk to find a boundary that straddles two of them
+        image = os.urandom(1000)
+        body = build_body([file_part('image', 'a.png', image), field('sessionId', b'x')])
+        for chunk_size in (3, 7, 16, 64):
+            with self.subTest(chunk_size=chunk_size), mock.patch.object(multipart, 'CHUNK_SIZE', chunk_size):
+                parts = self.parse(body)
+                self.assertEqual(self.read_file(parts['image']), image)
+                self.assertEqual(parts['sessionId']['data'], b'x')
+
+    def test_boundary_lookalike_in_file(self):
+        # A partial delimiter inside the data is data, not a boundary
+        image = b'start\r\n--' + BOUNDARY[:-1].encode() + b'X\r\n--' + b'end'
+        parts = self.parse(build_body([file_part('image', 'a.png', image)]), step=5)
+        self.assertEqual(self.read_file(parts['image']), image)
+
+    def test_empty_parts(self):
+        parts = self.parse(build_body([field('caption', b''), file_part('image', 'empty.png', b'')]))
+
+        self.assertEqual(parts['caption']['data'], b'')
+        self.assertEqual(parts['image']['size'], 0)
+        self.assertEqual(parts['image']['sha256'], hashlib.sha256(b'').hexdigest())
+        self.assertEqual(self.read_file(parts['image']), b'')
+
+    def test_no_parts(self):
+        self.assertEqual(self.parse(build_body([])), {})
+
+    def test_part_without_name_is_skipped(self):
+        nameless = ('Content-Disposition: form-data; filename="a.png"', b'data')
+        parts = self.parse(build_body([nameless, field('sessionId', b'session-01')]))
+
+        self.assertEqual(list(parts), ['sessionId'])
+        self.assert_no_temp_files()
+
+    def test_repeated_file_field_keeps_last(self):
+        parts = self.parse(build_body([file_part('image', 'a.png', b'first'), file_part('image', 'b.png', b'second')]))
+
+        self.assertEqual(parts['image']['filename'], 'b.png')
+        self.assertEqual(self.read_file(parts['image']), b'second')
+        self.assertEqual(os.listdir(self.temp_dir.name), [os.path.basename(parts['image']['path'])])
+
+    def test_missing_closing_boundary(self):
+        body = build_body([file_part('image', 'a.png', b'data')], close=False)
+        with self.assertRaises(MultipartError):
+            self.parse(body)
+        self.assert_no_temp_files()
+
+    def test_missing_boundary(self):
+        body = build_body([field('sessionId', b'session-01')], boundary='other-boundary')
+        with self.assertRaises(MultipartError):
+            self.parse(body)
+
+    def test_truncated_body(self):
+        # Content-Length promises more than the client sent
+        body = build_body([field('sessionId', b'x'), file_part('image', 'a.png', os.urandom(2000))])[:1500]
+        with self.assertRaises(MultipartError):
+            self.parse(body, content_length=len(body) + 1000)
+        self.assert_no_temp_files()
+
+    def test_field_too_large(self):
+        body = build_body([field('caption', b'x' * (multipart.MAX_FIELD_SIZE + multipart.CHUNK_SIZE + 1))])
+        with self.assertRaises(MultipartError):
+            self.parse(body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Tests for Range header parsing."""
+
+import unittest
+
+from utils.static import MAX_RANGES, parse_range
+
+
+class ParseRangeTest(unittest.TestCase):
+
+    def test_valid_ranges(self):
+        cases = {
+            'bytes=0-4': [(0, 4)],
+            'bytes=5-': [(5, 9)],
+            'bytes=-3': [(7, 9)],
+            'bytes=5-100': [(5, 9)],          # end clamped to the file
+            'bytes=-50': [(0, 9)],            # suffix longer than the file
+            'bytes=0-0, 9-9': [(0, 0), (9, 9)],
+            ' Bytes = 2-3 ': [(2, 3)],
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 10), expected)
+
+    def test_ignored_headers(self):
+        # Malformed or unsupported: serve the whole file (200)
+        for header in (None, '', 'items=0-4', 'bytes', 'bytes=abc', 'bytes=0', 'bytes=-',
+                       'bytes=4-2', 'bytes=a-4', 'bytes=0-b', 'bytes=1.5-2', 'bytes=0-4,,'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 10))
+
+    def test_unsatisfiable(self):
+        # Well-formed but past the end of the file: 416
+        for header in ('bytes=10-', 'bytes=10-20', 'bytes=-0', 'bytes=50-60, 10-'):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 10), [])
+
+    def test_empty_file(self):
+        self.assertEqual(parse_range('bytes=0-', 0), [])
+        self.assertEqual(parse_range('bytes=-5', 0), [])
+
+    def test_satisfiable_part_of_multiple_ranges(self):
+        self.assertEqual(parse_range('bytes=50-60, 0-1', 10), [(0, 1)])
+
+    def test_too_many_ranges(self):
+        header = 'bytes=' + ','.join(f'{i}-{i}' for i in range(MAX_RANGES + 1))
+        self.assertIsNone(parse_range(header, 100))
+        header = 'bytes=' + ','.join(f'{i}-{i}' for i in range(MAX_RANGES))
+        self.assertEqual(len(parse_range(header, 100)), MAX_RANGES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+GrowthLab benchmark harness.
+
+Builds a synthetic public/ tree, starts server.py against it, drives
+concurrent traffic at the hot endpoints and microbenchmarks the parsing
+helpers. Results are printed as JSON so runs can be compared across commits.
+
+Usage:
+    python3 tools/benchmark.py [--sessions N] [--cards M] [--images K]
+                               [--requests R] [--concurrency C] [--output FILE]
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from utils.images import extract_image_paths
+from utils.markdown import split_cards, join_cards
+from utils.multipart import parse_multipart, parse_multipart_stream, discard_parts
+
+
+# Static assets copied from the real tree so static traffic looks realistic
+STATIC_ASSETS = ('index.html', 'session.html', 'css', 'js', 'fonts')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (ms) for a list of durations in seconds."""
+    ms = sorted(value * 1000 for value in latencies)
+    return {
+        'count': len(ms),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'per_second': round(len(ms) / elapsed, 1) if elapsed else None,
+        'p50_ms': _round(percentile(ms, 50)),
+        'p95_ms': _round(percentile(ms, 95)),
+        'p99_ms': _round(percentile(ms, 99)),
+        'max_ms': _round(ms[-1] if ms else None),
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def tiny_png(width=64, height=64, seed=0):
+    """A valid RGB PNG built with zlib (no imaging library needed)."""
+    rng = random.Random(seed)
+    raw = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def card_markdown(session, card, images, rng):
+    """One synthetic card: a heading, some prose and a few image references."""
+    lines = [f'# Session {session} card {card}', '']
+    lines += [' '.join(rng.choice(('growth', 'lab', 'deck', 'ai', 'card', 'slide', 'note'))
+                       for _ in range(40)) for _ in range(3)]
+    for name in images:
+        lines += ['', f'![figure](media/session-{session:02d}/{name})']
+    return '\n'.join(lines)
+
+
+def build_tree(root, sessions, cards, images, image_bytes, seed=0):
+    """
+    Create a synthetic public/ tree.
+
+    Returns:
+        Dict with the generated 'cards' ({session name: [card markdown]}),
+        'media' (relative image paths) and 'static' (relative asset paths)
+    """
+    rng = random.Random(seed)
+    public = Path(root) / 'public'
+    for asset in STATIC_ASSETS:
+        src = REPO_ROOT / 'public' / asset
+        if src.is_dir():
+            shutil.copytree(src, public / asset)
+        elif src.exists():
+            public.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(src, public / asset)
+    (public / 'sessions').mkdir(parents=True, exist_ok=True)
+
+    generated = {'cards': {}, 'media': [], 'static': []}
+    for s in range(1, sessions + 1):
+        name = f'session-{s:02d}'
+        media_dir = public / 'media' / name
+        media_dir.mkdir(parents=True, exist_ok=True)
+        filenames = [f'20250101_{i:06d}.webp' for i in range(images)]
+        for filename in filenames:
+            (media_dir / filename).write_bytes(rng.randbytes(image_bytes))
+            generated['media'].append(f'media/{name}/{filename}')
+
+        session_cards = []
+        for c in range(cards):
+            refs = rng.sample(filenames, min(len(filenames), 2)) if filenames else []
+            session_cards.append(card_markdown(s, c, refs, rng))
+        (public / 'sessions' / f'{name}.md').write_text(join_cards(session_cards), encoding='utf-8')
+        generated['cards'][name] = session_cards
+
+    for dirpath, _, filenames in os.walk(public):
+        for filename in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, filename), public)
+            if not rel.startswith('media'):
+                generated['static'].append(rel.replace(os.sep, '/'))
+    return generated
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(root, port, threads, use_async=False, workers=1):
+    """Start server.py serving root/public; returns the process once it accepts connections."""
+    log = open(Path(root) / 'server.log', 'w')
+    cmd = [sys.executable, str(REPO_ROOT / 'server.py'), str(port),
+           '--root', str(Path(root) / 'public'), '--threads', str(threads)]
+    if use_async:
+        cmd.append('--async')
+    if workers > 1:
+        cmd += ['--workers', str(workers)]
+    process = subprocess.Popen(cmd, cwd=root, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited early, see {log.name}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('server did not start within 30s')
+
+
+def run_load(port, make_request, total, concurrency):
+    """
+    Send total requests from concurrency keep-alive connections.
+
+    make_request(rng) returns (method, path, body, headers); a response with
+    status >= 400 (or a connection error) counts as an error.
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker(worker_id):
+        nonlocal errors
+        rng = random.Random(worker_id)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local, local_errors = [], 0
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            method, path, body, headers = make_request(rng)
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def multipart_body(fields, files):
+    """Encode a multipart/form-data body; files is {name: (filename, bytes)}."""
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for name, value in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                  f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode())
+        out.write(data + b'\r\n')
+    out.write(f'--{boundary}--\r\n'.encode())
+    return out.getvalue(), boundary
+
+
+def http_scenarios(port, generated, requests, concurrency):
+    """Run each endpoint scenario and return {scenario: summary}."""
+    sessions = sorted(generated['cards'])
+    static_paths = ['/' + p for p in generated['static']] + ['/' + p for p in generated['media']]
+
+    def static_get(rng):
+        return 'GET', rng.choice(static_paths), None, {'Accept-Encoding': 'gzip'}
+
+    def list_images(rng):
+        return 'GET', '/api/list-images', None, {}
+
+    def update_card(rng):
+        session = rng.choice(sessions)
+        index = rng.randrange(len(generated['cards'][session]))
+        body = json.dumps({'sessionFile': session, 'cardIndex': index,
+                           'content': generated['cards'][session][index]})
+        return 'POST', '/api/update-card', body, {'Content-Type': 'application/json'}
+
+    def upload_image(rng):
+        # Fresh pixels each time so dedupe doesn't short-circuit conversion
+        body, boundary = multipart_body({'sessionId': rng.choice(sessions)},
+                                        {'image': ('bench.png', tiny_png(seed=rng.randrange(1 << 30)))})
+        return 'POST', '/api/upload-image', body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+    return {
+        'static': run_load(port, static_get, requests, concurrency),
+        'list_images': run_load(port, list_images, requests, concurrency),
+        'update_card': run_load(port, update_card, max(1, requests // 4), concurrency),
+        'upload_image': run_load(port, upload_image, max(1, requests // 20), min(concurrency, 4)),
+    }
+
+
+def time_calls(fn, repeat):
+    """Run fn repeat times and summarize per-call latency."""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def microbenchmarks(generated, repeat, upload_mb):
+    """Time the parsing helpers on large inputs."""
+    markdown = join_cards([card for cards in generated['cards'].values() for card in cards])
+    session = sorted(generated['cards'])[0]
+
+    payload = random.Random(1).randbytes(upload_mb * 1024 * 1024)
+    body, boundary = multipart_body({'sessionId': session}, {'image': ('big.png', payload)})
+
+    def stream_parse():
+        discard_parts(parse_multipart_stream(io.BytesIO(body), boundary, len(body)))
+
+    results = {
+        'split_cards': time_calls(lambda: split_cards(markdown), repeat),
+        'extract_image_paths': time_calls(lambda: extract_image_paths(markdown), repeat),
+        'extract_image_paths_session': time_calls(lambda: extract_image_paths(markdown, session), repeat),
+        'parse_multipart': time_calls(lambda: parse_multipart(body, boundary), max(1, repeat // 10)),
+        'parse_multipart_stream': time_calls(stream_parse, max(1, repeat // 10)),
+    }
+    results['_inputs'] = {'markdown_bytes': len(markdown.encode('utf-8')), 'multipart_bytes': len(body)}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark GrowthLab server endpoints and parsers')
+    parser.add_argument('--sessions', type=int, default=10, help='Synthetic sessions (default: 10)')
+    parser.add_argument('--cards', type=int, default=40, help='Cards per session (default: 40)')
+    parser.add_argument('--images', type=int, default=30, help='Images per session (default: 30)')
+    parser.add_argument('--image-bytes', type=int, default=60 * 1024, help='Size of each synthetic image')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per HTTP scenario')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--threads', type=int, default=16, help='Server --threads setting')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Run the server with --async')
+    parser.add_argument('--workers', type=int, default=1, help='Server --workers setting')
+    parser.add_argument('--repeat', type=int, default=50, help='Iterations per microbenchmark')
+    parser.add_argument('--upload-mb', type=int, default=20, help='Multipart body size for parser benchmarks')
+    parser.add_argument('--skip-http', action='store_true', help='Only run microbenchmarks')
+    parser.add_argument('--skip-micro', action='store_true', help='Only run HTTP scenarios')
+    parser.add_argument('--keep', action='store_true', help='Keep the synthetic tree and server log')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = tempfile.mkdtemp(prefix='growthlab-bench-')
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {k: v for k, v in vars(args).items() if k not in ('output', 'keep')},
+        },
+    }
+    try:
+        generated = build_tree(root, args.sessions, args.cards, args.images, args.image_bytes)
+
+        if not args.skip_http:
+            port = free_port()
+            server = start_server(root, port, args.threads, args.use_async, args.workers)
+            try:
+                results['http'] = http_scenarios(port, generated, args.requests, args.concurrency)
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+
+        if not args.skip_micro:
+            results['micro'] = microbenchmarks(generated, args.repeat, args.upload_mb)
+    finally:
+        if args.keep:
+            print(f'Synthetic tree kept at {root}', file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""asyncio server mode: many concurrent connections on a small, fixed set of threads."""
+
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.events import event_hub
+from utils.serving import REQUEST_QUEUE_SIZE
+
+
+# Longest request head (request line plus headers) accepted
+MAX_HEAD_BYTES = 64 * 1024
+
+# Request bodies up to this size are held in memory; larger ones spool to a temp file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+# Bodies larger than this are refused (413) before any of it is read; a
+# handler class with max_body_bytes(path) sets a lower limit per route
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+# A request body that sends nothing for this long is treated as truncated
+BODY_TIMEOUT = 30
+
+# An idle keep-alive connection costs no thread here, so it may wait longer
+KEEPALIVE_TIMEOUT = 60
+
+# On shutdown, requests in progress get this long to finish
+DRAIN_TIMEOUT = 25
+
+
+class _BufferedInput:
+    """Request head followed by its body, read like a socket file."""
+
+    def __init__(self, head, body):
+        self.head = io.BytesIO(head)
+        self.body = body
+
+    def readline(self, limit=-1):
+        return self.head.readline(limit)
+
+    def read(self, size=-1):
+        data = self.head.read(size)
+        if size is None or size < 0:
+            return data + self.body.read()
+        return data or self.body.read(size)
+
+
+def bridged_handler(handler_class):
+    """
+    Subclass a request handler to run over a request the event loop already read.
+
+    The handler runs unchanged on an executor thread: it parses the
+    buffered request and writes its response to memory. Static file bodies
+    and event streams are left for the event loop to send, so a large
+    download or an idle viewer doesn't hold a thread.
+    """
+    class BridgedHandler(handler_class):
+        def __init__(self, head, body, client_address, server, requests_served):
+            self.request = self.connection = None
+            self.client_address = client_address
+            self.server = server
+            self.directory = os.getcwd()
+            self.rfile = _BufferedInput(head, body)
+            self.wfile = io.BytesIO()
+            self.requests_served = requests_served
+            self.body = None
+            self.close_connection = True
+            self.static_body = None     # (file, segments, trailer) for the event loop to send
+            self.event_session = None   # session whose event stream the loop should attach
+
+        def handle_expect_100(self):
+            return True  # The event loop answered it before reading the body
+
+        def send_static_body(self, f):
+            if isinstance(f, io.BytesIO):
+                self.wfile.write(f.getvalue())
+                return
+            # The caller closes f once this returns; keep a duplicate for the loop
+            self.static_body = (os.fdopen(os.dup(f.fileno()), 'rb'),
+                                self.static_segments, self.static_trailer)
+
+        def attach_event_stream(self, session_file):
+            self.event_session = session_file
+
+    BridgedHandler.__name__ = BridgedHandler.__qualname__ = f'Bridged{handler_class.__name__}'
+    return BridgedHandler
+
+
+def _request_framing(head):
+    """
+    Read the body framing from a request head.
+
+    Returns:
+        Tuple of (content length or None if invalid, expects 100-continue,
+        uses Transfer-Encoding)
+    """
+    length, expect, chunked = 0, False, False
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            try:
+                length = int(value)
+            except ValueError:
+                return None, False, False
+            if length < 0:
+                return None, False, False
+        elif name == b'expect':
+            expect = value.strip().lower() == b'100-continue'
+        elif name == b'transfer-encoding':
+            chunked = True
+    return length, expect, chunked
+
+
+def _request_target(head):
+    """The request target (path and query) from a request head, or '' if malformed."""
+    parts = head.split(b'\r\n', 1)[0].split()
+    return parts[1].decode('latin-1') if len(parts) >= 2 else ''
+
+
+async def _read_some(reader, size):
+    """Read up to size body bytes; b'' at EOF or when the client stalls for BODY_TIMEOUT."""
+    try:
+        return await asyncio.wait_for(reader.read(size), BODY_TIMEOUT)
+    except asyncio.TimeoutError:
+        return b''
+
+
+def _error_response(status, reason, message):
+    """A complete JSON error response that closes the connection."""
+    body = json.dumps({'error': message}).encode('utf-8')
+    return (f'HTTP/1.1 {status} {reason}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Access-Control-Allow-Origin: *\r\n'
+            f'Connection: close\r\n\r\n').encode('latin-1') + body
+
+
+class AsyncServer:
+    """
+    HTTP server on an asyncio event loop.
+
+    The loop accepts connections, reads requests (spooling large bodies to
+    disk) and sends responses, so idle keep-alive connections, slow
+    clients, downloads and event streams cost no thread. Each request is
+    handled by the regular handler class on a bounded executor, which
+    keeps every route identical to the threaded server; conversions still
+    go to the process pool.
+    """
+
+    def __init__(self, port, handler_class, max_workers, listen_socket=None):
+        self.port = port
+        self.handler_class = bridged_handler(handler_class)
+        self.max_workers = max_workers
+        self.listen_socket = listen_socket
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='growthlab')
+        self._loop = None
+        self._stop = None
+        self._shutdown_requested = False
+        self._busy = 0           # requests read but not yet answered
+
+    def serve_forever(self):
+        """Run the event loop until interrupted or shutdown() is called."""
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop accepting and return from serve_forever once requests in progress finish (thread-safe)."""
+        self._shutdown_requested = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(self.executor)
+        self._stop = asyncio.Event()
+        self._loop = loop
+        if self._shutdown_requested:
+            return
+        if self.listen_socket is not None:
+            server = await asyncio.start_server(
+                self._serve_connection, sock=self.listen_socket, limit=MAX_HEAD_BYTES)
+        else:
+            server = await asyncio.start_server(
+                self._serve_connection, port=self.port, backlog=REQUEST_QUEUE_SIZE,
+                reuse_address=True, limit=MAX_HEAD_BYTES
+            )
+        await self._stop.wait()
+
+        # Stop accepting, let requests in progress finish; idle connections are dropped
+        server.close()
+        deadline = loop.time() + DRAIN_TIMEOUT
+        while self._busy and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _serve_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        client_address = writer.get_extra_info('peername')[:2]
+        requests_served = 0
+        detached = False
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(_error_response(431, 'Request Header Fields Too Large', 'Request head too large'))
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+
+                length, expect, chunked = _request_framing(head)
+                if length is None:
+                    writer.write(_error_response(400, 'Bad Request', 'Invalid Content-Length'))
+                    return
+                if length > self._body_limit(head):
+                    writer.write(_error_response(413, 'Content Too Large', 'Request too large'))
+                    return
+                if expect and length:
+                    writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+                self._busy += 1
+                try:
+                    body, complete = await self._read_body(reader, length)
+                    try:
+                        handler = await loop.run_in_executor(
+                            None, self._handle, head, body, client_address, requests_served)
+                    finally:
+                        body.close()
+                    requests_served = handler.requests_served
+
+                    writer.write(handler.wfile.getvalue())
+                    if handler.static_body is not None:
+                        await self._send_file(writer, *handler.static_body)
+                    await writer.drain()
+                finally:
+                    self._busy -= 1
+
+                if handler.event_session is not None:
+                    detached = self._attach_event_stream(writer, handler.event_session)
+                    return
+                # A truncated or chunked body leaves the stream unframed
+                if handler.close_connection or not complete or chunked or self._stop.is_set():
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client disconnected
+        except Exception:
+            print(f'Exception handling request from {client_address[0]}', file=sys.stderr)
+            traceback.print_exc()
+        finally:
+            if not detached:
+                writer.close()
+
+    def _body_limit(self, head):
+        """Largest body the request's route accepts, known before reading any of it."""
+        route_limit = getattr(self.handler_class, 'max_body_bytes', None)
+        if route_limit is None:
+            return MAX_BODY_BYTES
+        return min(route_limit(_request_target(head)), MAX_BODY_BYTES)
+
+    def _handle(self, head, body, client_address, requests_served):
+        """Run one request through the handler (on an executor thread)."""
+        handler = self.handler_class(head, body, client_address, self, requests_served)
+        handler.handle_one_request()
+        return handler
+
+    async def _read_body(self, reader, length):
+        """
+        Read a request body, spooling large ones to a temp file off the loop.
+
+        Returns:
+            Tuple of (file object positioned at the start, whether all
+            `length` bytes arrived). A truncated body is still handed to the
+            handler, so a resumable upload chunk keeps the bytes that came.
+        """
+        loop = asyncio.get_running_loop()
+        if length <= SPOOL_MEMORY_BYTES:
+            data = bytearray()
+            while len(data) < length:
+                chunk = await _read_some(reader, length - len(data))
+                if not chunk:
+                    break
+                data += chunk
+            return io.BytesIO(bytes(data)), len(data) == length
+
+        spool = await loop.run_in_executor(None, tempfile.TemporaryFile)
+        try:
+            remaining = length
+            pending = bytearray()
+            while remaining:
+                data = await _read_some(reader, min(SPOOL_MEMORY_BYTES, remaining))
+                if not data:
+                    break
+                pending += data
+                remaining -= len(data)
+                if len(pending) >= SPOOL_MEMORY_BYTES or not remaining:
+                    await loop.run_in_executor(None, spool.write, bytes(pending))
+                    pending.clear()
+            if pending:
+                await loop.run_in_executor(None, spool.write, bytes(pending))
+            spool.seek(0)
+            return spool, remaining == 0
+        except BaseException:
+            spool.close()
+            raise
+
+    async def _send_file(self, writer, f, segments, trailer):
+        """Send a static body prepared by the handler, using sendfile where available."""
+        loop = asyncio.get_running_loop()
+        try:
+            for part_header, start, length in segments:
+                if part_header:
+                    writer.write(part_header)
+                if length:
+                    await writer.drain()
+                    await loop.sendfile(writer.transport, f, start, length)
+            if trailer:
+                writer.write(trailer)
+        finally:
+            f.close()
+
+    def _attach_event_stream(self, writer, session_file):
+        """
+        Move a connection whose event-stream headers were sent to the event hub.
+
+        Returns:
+            True if the hub now owns the connection
+        """
+        if writer.transport.get_write_buffer_size():
+            return False  # Headers still unsent; the client will reconnect
+        sock = writer.get_extra_info('socket')
+        event_hub.attach(socket.socket(fileno=os.dup(sock.fileno())), session_file)
+        # Closing the loop's descriptor leaves the hub's duplicate connected
+        writer.transport.abort()
+        return True
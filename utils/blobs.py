@@ -0,0 +1,98 @@
+"""Content-addressed store of converted images, shared by all sessions."""
+
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from utils.variants import VARIANT_SUFFIX_PATTERN
+
+
+# Converted images live at media/.blobs/<hh>/<source sha256>.webp
+BLOB_DIRNAME = '.blobs'
+
+
+def blob_path(file_hash, media_root='media'):
+    """Path of the converted image for a source hash."""
+    return Path(media_root) / BLOB_DIRNAME / file_hash[:2] / f'{file_hash}.webp'
+
+
+def is_blob_path(path):
+    """Whether a path (relative to the served root) points into the blob store."""
+    return BLOB_DIRNAME in Path(path).parts
+
+
+def _family(image_file):
+    """An image file plus its variants and placeholder, as (path, suffix) pairs."""
+    image_file = Path(image_file)
+    if not image_file.exists():
+        return []
+    files = [(image_file, '')]
+    for candidate in image_file.parent.glob(f'{image_file.stem}-*.webp'):
+        match = VARIANT_SUFFIX_PATTERN.search(candidate.stem)
+        if match and candidate.stem[:match.start()] == image_file.stem:
+            files.append((candidate, match.group(0)))
+    return files
+
+
+def _link_or_copy(src, dest):
+    """Hard-link src to dest, copying when links aren't supported (e.g. across devices)."""
+    try:
+        os.link(src, dest)
+    except FileExistsError:
+        pass  # Same content already linked (names are content-derived)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def staging_path(file_hash, media_root='media'):
+    """
+    Unique path to convert into before a blob is committed.
+
+    Concurrent conversions of the same source never write the same files,
+    and readers never see a partially written blob.
+    """
+    final = blob_path(file_hash, media_root)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    return final.with_name(f'{file_hash}.{uuid.uuid4().hex[:12]}.webp')
+
+
+def commit(staged, file_hash, media_root='media'):
+    """Move a converted image and its variants from staging into the store."""
+    final = blob_path(file_hash, media_root)
+    for path, suffix in _family(staged):
+        os.replace(path, final.with_name(f'{final.stem}{suffix}.webp'))
+
+
+def discard(staged):
+    """Delete whatever a failed conversion left in staging."""
+    for path, _ in _family(staged):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def adopt(image_file, file_hash, media_root='media'):
+    """
+    Add an already converted session image (and its variants) to the store.
+
+    Used for images converted before the store existed, so re-uploading
+    them elsewhere doesn't convert them again.
+    """
+    final = blob_path(file_hash, media_root)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    for path, suffix in _family(image_file):
+        _link_or_copy(path, final.with_name(f'{final.stem}{suffix}.webp'))
+
+
+def link_into(file_hash, output_path, media_root='media'):
+    """
+    Reference a stored image from a session directory.
+
+    The image and its variants are hard-linked under output_path's name
+    (copied where links aren't supported).
+    """
+    output_path = Path(output_path)
+    for path, suffix in _family(blob_path(file_hash, media_root)):
+        _link_or_copy(path, output_path.with_name(f'{output_path.stem}{suffix}.webp'))
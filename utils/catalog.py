@@ -0,0 +1,167 @@
+"""Cached catalogue of uploaded images for the image picker."""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from utils.variants import is_variant_file
+
+
+def _image_entry(session_name, filename):
+    """Build the picker entry for one image, parsing the date from its name."""
+    # Parse date from filename (20251124_152646.webp)
+    formatted_date = ''
+    try:
+        date_obj = datetime.strptime(Path(filename).stem[:15], '%Y%m%d_%H%M%S')
+        formatted_date = date_obj.strftime('%b %d')
+    except ValueError:
+        pass
+    return {'path': f'media/{session_name}/{filename}', 'date': formatted_date}
+
+
+def _serialize(data):
+    body = json.dumps(data).encode('utf-8')
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class ImageCatalog:
+    """
+    Index of media/session-*/*.webp, newest first per session.
+
+    Built once, then kept current by add()/remove() from the upload and
+    delete paths. Directories whose mtime changed behind our back (cleanup,
+    manual edits, other processes) are rescanned individually.
+    """
+
+    def __init__(self, media_root='media'):
+        self.media_root = Path(media_root)
+        self._lock = threading.Lock()
+        self._root_mtime = None
+        self._sessions = {}      # session name -> {'mtime': ns, 'images': [entry, ...]}
+        self._payload = None     # (body bytes, etag) of the full listing
+
+    def _scan_session(self, session_dir):
+        """Rescan one session directory. Caller holds the lock."""
+        images = [
+            _image_entry(session_dir.name, img.name)
+            for img in session_dir.glob('*.webp') if not is_variant_file(img.name)
+        ]
+        # Sort by filename descending (newest first)
+        images.sort(key=lambda x: x['path'], reverse=True)
+        self._sessions[session_dir.name] = {'mtime': session_dir.stat().st_mtime_ns, 'images': images}
+        self._payload = None
+
+    def _refresh(self):
+        """Pick up directories that changed on disk. Caller holds the lock."""
+        try:
+            root_mtime = self.media_root.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._sessions:
+                self._sessions = {}
+                self._payload = None
+            self._root_mtime = None
+            return
+
+        if root_mtime != self._root_mtime:
+            self._root_mtime = root_mtime
+            names = {d.name for d in self.media_root.iterdir()
+                     if d.is_dir() and d.name.startswith('session-')}
+            for name in set(self._sessions) - names:
+                del self._sessions[name]
+                self._payload = None
+            for name in names - set(self._sessions):
+                self._scan_session(self.media_root / name)
+
+        for name, cached in list(self._sessions.items()):
+            session_dir = self.media_root / name
+            try:
+                if session_dir.stat().st_mtime_ns != cached['mtime']:
+                    self._scan_session(session_dir)
+            except FileNotFoundError:
+                del self._sessions[name]
+                self._payload = None
+
+    def add(self, image_path):
+        """Record a newly converted image (media/<session>/<file>.webp)."""
+        path = Path(image_path)
+        with self._lock:
+            cached = self._sessions.get(path.parent.name)
+            if cached is None:
+                # New session directory (or catalogue not built yet)
+                self._refresh()
+                return
+            entry = _image_entry(path.parent.name, path.name)
+            if entry not in cached['images']:
+                cached['images'].append(entry)
+                cached['images'].sort(key=lambda x: x['path'], reverse=True)
+                self._payload = None
+            self._stamp(path.parent.name)
+
+    def remove(self, image_path):
+        """Forget a deleted image."""
+        path = Path(image_path)
+        with self._lock:
+            cached = self._sessions.get(path.parent.name)
+            if cached is None:
+                return
+            image_path = path.as_posix()
+            images = [entry for entry in cached['images'] if entry['path'] != image_path]
+            if len(images) != len(cached['images']):
+                cached['images'] = images
+                self._payload = None
+            self._stamp(path.parent.name)
+
+    def _stamp(self, session_name):
+        """
+        Mark a directory as current after applying our own change to it,
+        so it isn't rescanned. Caller holds the lock.
+        """
+        try:
+            self._sessions[session_name]['mtime'] = (self.media_root / session_name).stat().st_mtime_ns
+        except FileNotFoundError:
+            pass
+
+    def listing(self, session=None, offset=0, limit=None):
+        """
+        Get the serialized image listing.
+
+        Args:
+            session: Only include this session (e.g. 'session-01')
+            offset: Number of images to skip (sessions in name order, newest first)
+            limit: Maximum number of images to return
+
+        Returns:
+            Tuple of (JSON body bytes, ETag)
+        """
+        with self._lock:
+            self._refresh()
+            if session is None and offset == 0 and limit is None:
+                if self._payload is None:
+                    self._payload = _serialize({'images': self._all_images()})
+                return self._payload
+
+            all_images = self._all_images()
+            if session is not None:
+                all_images = {session: all_images.get(session, [])}
+
+        flat = [(name, entry) for name, images in all_images.items() for entry in images]
+        end = len(flat) if limit is None else offset + limit
+        page = {name: [] for name in all_images}
+        for name, entry in flat[offset:end]:
+            page[name].append(entry)
+
+        return _serialize({
+            'images': {name: images for name, images in page.items() if images},
+            'total': len(flat),
+            'offset': offset,
+            'nextOffset': end if end < len(flat) else None,
+        })
+
+    def _all_images(self):
+        """Images per session in session-name order. Caller holds the lock."""
+        return {name: list(self._sessions[name]['images']) for name in sorted(self._sessions)}
+
+
+image_catalog = ImageCatalog()
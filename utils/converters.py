@@ -0,0 +1,257 @@
+"""WebP converter backends, probed once for availability and speed."""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    from PIL import Image, ImageFilter, features
+except ImportError:
+    Image = None
+
+
+# Width (px) of the main converted image
+MAX_WIDTH = 1600
+
+# Width (px) of the blurred low-quality placeholder
+PLACEHOLDER_WIDTH = 24
+
+# Fallback order when no benchmark has been run. GIFs prefer gif2webp
+# (Google's official tool); Pillow runs inside the worker process.
+STILL_ORDER = ('magick', 'convert', 'ffmpeg', 'pillow')
+GIF_ORDER = ('gif2webp', 'magick', 'convert', 'ffmpeg', 'pillow')
+
+# Sample images for probing: a 1x1 GIF, and a gradient PPM big enough to
+# exercise the variant widths
+_SAMPLE_GIF = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+               b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+_SAMPLE_SIZE = (1024, 768)
+
+_probe_lock = threading.Lock()
+_probed = None   # name -> {'tool', 'version', 'ms', 'gif'} once probed
+
+
+def _run(cmd, timeout):
+    return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
+
+def _convert_gif2webp(tool, input_path, output_path, variants, placeholder, is_gif):
+    if not is_gif:
+        return False
+    result = _run([tool, '-q', '80', '-m', '4', '-mixed', input_path, '-o', output_path], timeout=60)
+    if result.returncode == 0:
+        print("✓ GIF converted with gif2webp")
+        return True
+    print(f"gif2webp failed: {result.stderr}")
+    return False
+
+
+def _convert_magick(tool, input_path, output_path, variants, placeholder, is_gif):
+    if is_gif:
+        # For GIFs: coalesce frames first, then convert
+        cmd = [tool, input_path, '-coalesce', '-quality', '80', output_path]
+        timeout = 60
+    else:
+        # Write each variant from a clone of the decoded image, then the main file
+        cmd = [tool, input_path, '-quality', '75']
+        for width, path in variants:
+            cmd += ['(', '+clone', '-resize', f'{width}x>', '-write', path, '+delete', ')']
+        cmd += ['(', '+clone', '-resize', f'{PLACEHOLDER_WIDTH}x', '-blur', '0x2',
+                '-write', placeholder, '+delete', ')']
+        cmd += ['-resize', f'{MAX_WIDTH}x>', output_path]
+        timeout = 30
+    result = _run(cmd, timeout=timeout)
+    if result.returncode == 0:
+        return True
+    print(f"ImageMagick stderr: {result.stderr}")
+    return False
+
+
+def _convert_ffmpeg(tool, input_path, output_path, variants, placeholder, is_gif):
+    if is_gif:
+        cmd = [tool, '-i', input_path,
+               '-vcodec', 'libwebp', '-lossless', '0',
+               '-compression_level', '4', '-q:v', '70',
+               '-loop', '0', '-an', '-vsync', '0',
+               output_path, '-y']
+        timeout = 60
+    else:
+        # Split the decoded frame once and scale each branch to its own output
+        labels = [f'v{i}' for i in range(len(variants))]
+        graph = f'[0:v]split={len(variants) + 2}[main][lqip]' + ''.join(f'[{l}]' for l in labels)
+        graph += f';[main]scale={MAX_WIDTH}:-1:flags=lanczos[main_out]'
+        graph += f';[lqip]scale={PLACEHOLDER_WIDTH}:-1,gblur=sigma=2[lqip_out]'
+        for label, (width, _) in zip(labels, variants):
+            graph += f";[{label}]scale='min({width},iw)':-1:flags=lanczos[{label}_out]"
+        cmd = [tool, '-y', '-i', input_path, '-filter_complex', graph,
+               '-map', '[main_out]', '-q:v', '75', output_path,
+               '-map', '[lqip_out]', '-q:v', '75', placeholder]
+        for label, (_, path) in zip(labels, variants):
+            cmd += ['-map', f'[{label}_out]', '-q:v', '75', path]
+        timeout = 30
+    result = _run(cmd, timeout=timeout)
+    if result.returncode == 0:
+        return True
+    print(f"FFmpeg stderr: {result.stderr}")
+    return False
+
+
+def _convert_pillow(tool, input_path, output_path, variants, placeholder, is_gif):
+    with Image.open(input_path) as img:
+        if is_gif:
+            img.save(output_path, 'WEBP', save_all=True, quality=80, method=4)
+            return True
+
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+        def scaled(width, upscale=False):
+            if img.width <= width and not upscale:
+                return img
+            return img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+
+        for width, path in variants:
+            scaled(width).save(path, 'WEBP', quality=75)
+        scaled(PLACEHOLDER_WIDTH, upscale=True).filter(ImageFilter.GaussianBlur(2)).save(
+            placeholder, 'WEBP', quality=75)
+        scaled(MAX_WIDTH).save(output_path, 'WEBP', quality=75)
+    return True
+
+
+BACKENDS = {
+    'gif2webp': _convert_gif2webp,
+    'magick': _convert_magick,
+    'convert': _convert_magick,
+    'ffmpeg': _convert_ffmpeg,
+    'pillow': _convert_pillow,
+}
+
+
+def run_converter(name, tool, input_path, output_path, variants, placeholder, is_gif):
+    """
+    Convert with one backend.
+
+    Args:
+        name: Backend name (a key of BACKENDS)
+        tool: Executable path for command-line backends
+        variants: List of (width, path) responsive variants to write
+        placeholder: Path of the blurred placeholder to write
+        is_gif: Whether the source is an animated GIF (no variants)
+
+    Returns:
+        True if conversion succeeded, False otherwise
+    """
+    try:
+        return BACKENDS[name](tool, str(input_path), str(output_path),
+                              [(width, str(path)) for width, path in variants], str(placeholder), is_gif)
+    except Exception as e:
+        print(f"{name} conversion failed: {e}")
+        return False
+
+
+def _find_tools():
+    """Locate installed converters: {name: {'tool', 'version'}}."""
+    found = {}
+    for name in ('gif2webp', 'magick', 'convert', 'ffmpeg'):
+        if name == 'convert' and 'magick' in found:
+            continue  # ImageMagick 7 still ships the legacy 'convert'
+        tool = shutil.which(name)
+        if tool:
+            found[name] = {'tool': tool, 'version': _tool_version(tool)}
+    if Image is not None and features.check('webp'):
+        import PIL
+        found['pillow'] = {'tool': None, 'version': PIL.__version__}
+    return found
+
+
+def _tool_version(tool):
+    try:
+        result = _run([tool, '-version'], timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    lines = (result.stdout or result.stderr).strip().splitlines()
+    return lines[0] if result.returncode == 0 and lines else ''
+
+
+def _write_sample_ppm(path):
+    width, height = _SAMPLE_SIZE
+    row = bytes(v for x in range(width) for v in (x % 256, (x * 3) % 256, 128))
+    with open(path, 'wb') as f:
+        f.write(f'P6 {width} {height} 255\n'.encode())
+        for y in range(height):
+            f.write(row[y % 3:] + row[:y % 3])
+
+
+def _benchmark(found, variant_widths):
+    """Time each converter on the sample images; failures are marked unusable."""
+    with tempfile.TemporaryDirectory(prefix='growthlab-probe-') as tmp:
+        still = os.path.join(tmp, 'sample.ppm')
+        gif = os.path.join(tmp, 'sample.gif')
+        _write_sample_ppm(still)
+        with open(gif, 'wb') as f:
+            f.write(_SAMPLE_GIF)
+
+        for name, info in found.items():
+            output = os.path.join(tmp, f'{name}.webp')
+            variants = [(w, os.path.join(tmp, f'{name}-{w}w.webp')) for w in variant_widths]
+            placeholder = os.path.join(tmp, f'{name}-lqip.webp')
+
+            info['ms'] = None
+            if name != 'gif2webp':
+                start = time.perf_counter()
+                if run_converter(name, info['tool'], still, output, variants, placeholder, False) \
+                        and os.path.exists(output):
+                    info['ms'] = round((time.perf_counter() - start) * 1000, 1)
+            info['gif'] = run_converter(name, info['tool'], gif, output, [], placeholder, True)
+
+
+def probe(variant_widths=(480, 960), benchmark=True):
+    """
+    Find available converters, their versions and (optionally) their speed.
+
+    Called once at server startup; later calls return the cached result.
+
+    Returns:
+        Dict of {name: {'tool', 'version', 'ms', 'gif'}}; 'ms' is the time to
+        convert the sample still (None if it failed or wasn't benchmarked)
+    """
+    global _probed
+    with _probe_lock:
+        if _probed is None:
+            found = _find_tools()
+            if benchmark:
+                _benchmark(found, variant_widths)
+            _probed = found
+        return _probed
+
+
+def conversion_order(is_gif):
+    """
+    Converters to try for an input type, best first.
+
+    Stills go to the fastest converter that passed the benchmark; GIFs keep
+    the reliability order among converters that handled the sample GIF.
+
+    Returns:
+        Tuple of (name, tool) pairs
+    """
+    found = probe(benchmark=False)
+    if is_gif:
+        names = [n for n in GIF_ORDER if n in found and found[n].get('gif', True)]
+    else:
+        names = [n for n in STILL_ORDER if n in found and found[n].get('ms', 0) is not None]
+        names.sort(key=lambda n: found[n].get('ms') or 0)
+    return tuple((name, found[name]['tool']) for name in names)
+
+
+def describe(found):
+    """One-line summary of probed converters for the startup banner."""
+    parts = []
+    for name, info in found.items():
+        version = f" ({info['version'][:40]})" if info.get('version') else ''
+        timing = f", {info['ms']:.0f}ms" if info.get('ms') is not None else ''
+        parts.append(f'{name}{version}{timing}')
+    return '; '.join(parts) or 'none found'
@@ -0,0 +1,270 @@
+"""Server-Sent Events: push card changes to open viewers."""
+
+import json
+import selectors
+import socket
+import threading
+import time
+
+from utils.markdown import add_save_listener, load_session
+from utils.render import card_hash, render_cache
+
+
+# Streams beyond this are refused (503) instead of running out of file descriptors
+MAX_STREAMS = 1000
+
+# Idle streams get a comment line this often, so proxies keep them open and
+# dead clients are noticed
+HEARTBEAT_SECONDS = 15
+
+# A client that falls this far behind is disconnected; it reconnects and resyncs
+MAX_BACKLOG_BYTES = 1024 * 1024
+
+# How long (ms) browsers wait before reconnecting a dropped stream
+RETRY_MS = 3000
+
+# How often followed sessions are checked for saves made by other processes
+# (other --workers, or edits to the .md file outside the server)
+SESSION_POLL_SECONDS = 1
+
+
+def format_event(event, data):
+    """Encode one event in the text/event-stream format."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
+
+
+class _Stream:
+    """An attached client: its socket, session and unsent bytes."""
+
+    __slots__ = ('sock', 'session_file', 'outbox', 'overflowed')
+
+    def __init__(self, sock, session_file, outbox):
+        self.sock = sock
+        self.session_file = session_file
+        self.outbox = bytearray(outbox)
+        self.overflowed = False
+
+
+class EventHub:
+    """
+    Holds Server-Sent Event streams open on a single selector thread.
+
+    A handler sends the response headers and hands its socket over with
+    attach(), so an idle viewer costs a file descriptor rather than a
+    worker thread. Saves are compared with the session's previously
+    published cards and sent as 'card' events for each changed card, or
+    as a 'cards' event listing every hash when cards were added, removed
+    or moved. Saves in this process arrive through the save listener;
+    followed sessions are also re-checked on disk every
+    SESSION_POLL_SECONDS to catch changes written by other processes.
+    """
+
+    def __init__(self, max_streams=MAX_STREAMS):
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._streams = {}       # fd -> _Stream
+        self._new = []           # streams not yet registered with the selector
+        self._dirty = set()      # fds with bytes to send
+        self._hashes = {}        # session name -> card hashes last published
+        self._models = {}        # session name -> model last published
+        self._selector = None
+        self._wakeup = None      # socket pair that interrupts select()
+        self._thread = None
+
+    @property
+    def stream_count(self):
+        with self._lock:
+            return len(self._streams)
+
+    def has_capacity(self):
+        """Whether another stream can be attached."""
+        return self.stream_count < self.max_streams
+
+    def start(self):
+        """Start the selector thread (attach() does this on first use)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._selector = selectors.DefaultSelector()
+            self._wakeup = socket.socketpair()
+            self._wakeup[0].setblocking(False)
+            self._wakeup[1].setblocking(False)
+            self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+            self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+            self._thread.start()
+
+    def attach(self, sock, session_file):
+        """
+        Take over a connection whose event-stream headers were already sent.
+
+        The socket is detached from its handler (which then closes nothing)
+        and receives a 'ready' event with the session's current card hashes,
+        so a reconnecting viewer can tell whether it missed changes.
+
+        Args:
+            sock: Connected socket of the request
+            session_file: Sanitized session name to follow
+        """
+        self.start()
+        hashes = self._current_hashes(session_file)
+        greeting = f'retry: {RETRY_MS}\n\n'.encode() + format_event('ready', {'hashes': hashes})
+
+        conn = socket.socket(fileno=sock.detach())
+        conn.setblocking(False)
+        stream = _Stream(conn, session_file, greeting)
+        with self._lock:
+            self._hashes.setdefault(session_file, hashes)
+            self._streams[conn.fileno()] = stream
+            self._new.append(stream)
+            self._dirty.add(conn.fileno())
+        self._wake()
+
+    def _current_hashes(self, session_file):
+        model = load_session(session_file)
+        return [card_hash(card) for card in model.cards] if model else []
+
+    def session_saved(self, model):
+        """Save listener: publish the cards a save changed to the session's viewers."""
+        name = model.session_file
+        with self._lock:
+            if not any(stream.session_file == name for stream in self._streams.values()):
+                self._hashes.pop(name, None)
+                self._models.pop(name, None)
+                return
+            if self._models.get(name) is model:
+                return
+            self._models[name] = model
+            previous = self._hashes.get(name)
+
+        hashes = [card_hash(card) for card in model.cards]
+        if previous is not None and len(previous) == len(hashes):
+            payload = b''.join(
+                format_event('card', self._card_event(index, digest, card))
+                for index, (digest, card) in enumerate(zip(hashes, model.cards))
+                if previous[index] != digest)
+        else:
+            payload = format_event('cards', {'hashes': hashes})
+
+        with self._lock:
+            self._hashes[name] = hashes
+            if payload:
+                for fd, stream in self._streams.items():
+                    if stream.session_file == name:
+                        self._queue(fd, stream, payload)
+        self._wake()
+
+    def _card_event(self, index, digest, card):
+        """Data of a 'card' event; HTML only when the server renders cards."""
+        data = {'index': index, 'hash': digest, 'markdown': card}
+        if render_cache.enabled:
+            data['html'] = render_cache.render(card, digest)[1]
+        return data
+
+    def _queue(self, fd, stream, data):
+        """Append bytes to a stream's outbox. Caller holds the lock."""
+        if len(stream.outbox) + len(data) > MAX_BACKLOG_BYTES:
+            stream.overflowed = True
+        else:
+            stream.outbox += data
+        self._dirty.add(fd)
+
+    def _wake(self):
+        try:
+            self._wakeup[1].send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Already pending, or not started
+
+    def _poll_sessions(self):
+        """Publish followed sessions whose file changed since they were last published."""
+        with self._lock:
+            names = {stream.session_file for stream in self._streams.values()}
+        for name in names:
+            model = load_session(name)
+            if model is not None:
+                self.session_saved(model)
+
+    def _run(self):
+        last_heartbeat = last_poll = time.monotonic()
+        while True:
+            if time.monotonic() - last_poll >= SESSION_POLL_SECONDS:
+                last_poll = time.monotonic()
+                try:
+                    self._poll_sessions()
+                except Exception as e:
+                    print(f"⚠️  Warning: Session poll failed: {e}")
+            timeout = max(0.0, min(HEARTBEAT_SECONDS - (time.monotonic() - last_heartbeat),
+                                   SESSION_POLL_SECONDS - (time.monotonic() - last_poll)))
+            for key, mask in self._selector.select(timeout):
+                if key.fileobj is self._wakeup[0]:
+                    try:
+                        while self._wakeup[0].recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                stream = key.data
+                if mask & selectors.EVENT_READ and not self._readable(stream):
+                    self._close(stream)
+                elif mask & selectors.EVENT_WRITE:
+                    with self._lock:
+                        self._dirty.add(stream.sock.fileno())
+
+            with self._lock:
+                new, self._new = self._new, []
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_SECONDS:
+                    last_heartbeat = time.monotonic()
+                    for fd, stream in self._streams.items():
+                        self._queue(fd, stream, b': ping\n\n')
+                dirty, self._dirty = self._dirty, set()
+                to_flush = [self._streams[fd] for fd in dirty if fd in self._streams]
+
+            for stream in new:
+                self._selector.register(stream.sock, selectors.EVENT_READ, stream)
+            for stream in to_flush:
+                self._flush(stream)
+
+    def _readable(self, stream):
+        """Drain input from a client; False once it has disconnected."""
+        try:
+            return bool(stream.sock.recv(4096))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _flush(self, stream):
+        """Send what a stream has queued, waiting for writability if the socket is full."""
+        if stream.overflowed:
+            return self._close(stream)
+        with self._lock:
+            data = bytes(stream.outbox)
+        try:
+            sent = stream.sock.send(data) if data else 0
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            return self._close(stream)
+        with self._lock:
+            del stream.outbox[:sent]
+            backlog = bool(stream.outbox)
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if backlog else 0)
+        try:
+            self._selector.modify(stream.sock, events, stream)
+        except (KeyError, ValueError):
+            pass  # Closed meanwhile
+
+    def _close(self, stream):
+        with self._lock:
+            fd = stream.sock.fileno()
+            if self._streams.get(fd) is not stream:
+                return
+            del self._streams[fd]
+        try:
+            self._selector.unregister(stream.sock)
+        except (KeyError, ValueError):
+            pass
+        stream.sock.close()
+
+
+event_hub = EventHub()
+add_save_listener(event_hub.session_saved)
@@ -0,0 +1,221 @@
+"""Static site export: the read-only site with fingerprinted, precompressed assets."""
+
+import fnmatch
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+
+from utils import static
+from utils.hash_index import VARIANTS_FILENAME
+from utils.images import compute_file_hash
+
+
+# Written at the root of the export: every source file and what it became
+EXPORT_MANIFEST_FILENAME = 'export-manifest.json'
+
+# Hex digits of the content hash put in fingerprinted filenames
+FINGERPRINT_LENGTH = 12
+
+# Files only edit mode uses; the export leaves them (and tags loading them) out
+EDIT_ONLY_PATTERNS = ('js/edit-*.js', 'css/edit-mode.css')
+
+# Text files whose references to other exported files are rewritten
+_REWRITTEN_EXTENSIONS = {'.html', '.md', '.js', '.css'}
+
+# A whole line loading one file, e.g. <script src="js/edit-mode.js"></script>
+_TAG_LINE = re.compile(
+    r'''^\s*<(?:script|link)\b[^>]*\b(?:src|href)=["']([^"']+)["'][^>]*>(?:\s*</script>)?\s*$''')
+_COMMENT_LINE = re.compile(r'^\s*<!--.*-->\s*$')
+
+
+class ExportError(Exception):
+    """The export can't run with these arguments (nothing was written)."""
+
+
+def keeps_name(rel_path):
+    """
+    Whether a file keeps its name in the export instead of being fingerprinted.
+
+    Pages are entered by URL, the viewer builds session markdown and
+    variants.json URLs from the session name, so these stay put (and are
+    revalidated on use); everything they load gets a content-hashed name.
+    """
+    path = PurePosixPath(rel_path)
+    return path.suffix.lower() in {'.html', '.md'} or path.name == VARIANTS_FILENAME
+
+
+def is_edit_only(rel_path):
+    """Whether a file is only loaded by edit mode."""
+    return any(fnmatch.fnmatch(rel_path, pattern) for pattern in EDIT_ONLY_PATTERNS)
+
+
+def fingerprinted_name(rel_path, file_hash):
+    """Name of a file with its content hash inserted before the extension."""
+    path = PurePosixPath(rel_path)
+    return str(path.with_name(f'{path.stem}.{file_hash[:FINGERPRINT_LENGTH]}{path.suffix}'))
+
+
+def _source_files(root):
+    """Relative POSIX paths of the files under root, skipping dotfiles and the blob store."""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if not filename.startswith('.'):
+                files.append(Path(dirpath, filename).relative_to(root).as_posix())
+    return files
+
+
+def _reference_pattern(paths):
+    """Regex matching any of the paths where it appears as a whole URL path."""
+    alternatives = '|'.join(re.escape(path) for path in sorted(paths, key=len, reverse=True))
+    return re.compile(rf'(?<![\w.-])({alternatives})(?![\w.-])')
+
+
+def _drop_references(text, dropped):
+    """Remove lines whose tag loads a dropped file, with the comment heading them."""
+    lines = text.splitlines(keepends=True)
+    kept = []
+    for line in lines:
+        match = _TAG_LINE.match(line)
+        if match and match.group(1).lstrip('/') in dropped:
+            if kept and _COMMENT_LINE.match(kept[-1]):
+                kept.pop()
+            continue
+        kept.append(line)
+    return ''.join(kept)
+
+
+def _rewrite(text, mapping, dropped):
+    """Point references at fingerprinted names and drop tags loading edit-only files."""
+    if dropped:
+        text = _drop_references(text, dropped)
+    if mapping:
+        text = _reference_pattern(mapping).sub(lambda m: mapping[m.group(1)], text)
+    return text
+
+
+def _rewrite_variants(data, rel_path, mapping):
+    """Rename the images listed in a media directory's variants.json."""
+    directory = PurePosixPath(rel_path).parent
+
+    def renamed(filename):
+        new_path = mapping.get(str(directory / filename))
+        return PurePosixPath(new_path).name if new_path else filename
+
+    variants = json.loads(data)
+    rewritten = {}
+    for filename, info in variants.items():
+        info = dict(info)
+        info['widths'] = {width: renamed(name) for width, name in info.get('widths', {}).items()}
+        if info.get('placeholder'):
+            info['placeholder'] = renamed(info['placeholder'])
+        rewritten[renamed(filename)] = info
+    return json.dumps(rewritten, indent=2)
+
+
+def _prepare_output(out_dir, root):
+    """Create an empty output directory, replacing only a previous export."""
+    out_dir, root = Path(out_dir).resolve(), Path(root).resolve()
+    if out_dir == root or root in out_dir.parents or out_dir in root.parents:
+        raise ExportError(f'Output directory must be outside {root}')
+    if out_dir.exists():
+        if (out_dir / EXPORT_MANIFEST_FILENAME).exists():
+            shutil.rmtree(out_dir)
+        elif any(out_dir.iterdir()):
+            raise ExportError(f'{out_dir} is not empty and does not hold a previous export')
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir
+
+
+def export_site(root, out_dir):
+    """
+    Export the site under root as static files for any static host or CDN.
+
+    JS, CSS, media and other assets are copied under content-hashed names
+    (e.g. js/viewer.3f2a1b9c0d4e.js) and may be cached forever; pages,
+    session markdown and variants.json keep their names, with references
+    rewritten. Edit-only scripts and styles are left out: without the API
+    the viewer renders markdown in the browser and edit mode stays off.
+    Compressible files get .gz (and .br, with brotli) siblings.
+
+    Args:
+        root: Served directory to export (e.g. 'public')
+        out_dir: Directory to write; must be empty or a previous export
+
+    Returns:
+        The manifest written to out_dir/export-manifest.json: for each
+        source path, its exported path, sha256, size, Cache-Control policy
+        and precompressed encodings
+    """
+    root = Path(root)
+    out_dir = _prepare_output(out_dir, root)
+    sources = _source_files(root)
+    dropped = {rel for rel in sources if is_edit_only(rel)}
+
+    # Assets that reference nothing go first, so scripts and styles can point
+    # at their new names before being hashed, and pages last of all
+    renamed = [rel for rel in sources if rel not in dropped and not keeps_name(rel)]
+    stages = [
+        [rel for rel in renamed if PurePosixPath(rel).suffix.lower() not in _REWRITTEN_EXTENSIONS],
+        [rel for rel in renamed if PurePosixPath(rel).suffix.lower() in _REWRITTEN_EXTENSIONS],
+        [rel for rel in sources if rel not in dropped and keeps_name(rel)],
+    ]
+
+    mapping = {}       # source path -> exported path, for renamed files
+    files = {}
+    for stage in stages:
+        for rel in stage:
+            target = out_dir / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            suffix = PurePosixPath(rel).suffix.lower()
+            if suffix in _REWRITTEN_EXTENSIONS:
+                text = (root / rel).read_text(encoding='utf-8')
+                target.write_text(_rewrite(text, mapping, dropped), encoding='utf-8')
+            elif PurePosixPath(rel).name == VARIANTS_FILENAME:
+                data = (root / rel).read_text(encoding='utf-8')
+                target.write_text(_rewrite_variants(data, rel, mapping), encoding='utf-8')
+            else:
+                shutil.copyfile(root / rel, target)
+
+            file_hash = compute_file_hash(target)
+            exported = rel
+            if not keeps_name(rel):
+                exported = fingerprinted_name(rel, file_hash)
+                target = target.rename(out_dir / exported)
+                mapping[rel] = exported
+            files[rel] = {
+                'path': exported,
+                'sha256': file_hash,
+                'size': target.stat().st_size,
+                'cacheControl': static.cache_control(rel) if keeps_name(rel) else static.IMMUTABLE,
+                'encodings': _precompress(target),
+            }
+
+    manifest = {
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'files': files,
+        'omitted': sorted(dropped),
+    }
+    with open(out_dir / EXPORT_MANIFEST_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _precompress(path):
+    """Write .gz/.br siblings of a compressible file where they are smaller; returns the encodings."""
+    size = path.stat().st_size
+    if not static.is_compressible(path, size):
+        return []
+    data = path.read_bytes()
+    encodings = []
+    for encoding in static.precompress_encodings():
+        compressed = static.precompress(data, encoding)
+        if len(compressed) < size:
+            extension = '.br' if encoding == 'br' else '.gz'
+            path.with_name(path.name + extension).write_bytes(compressed)
+            encodings.append(encoding)
+    return encodings
@@ -0,0 +1,228 @@
+"""In-memory, write-through index of uploaded image hashes."""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from utils.locks import file_lock
+
+
+MANIFEST_FILENAME = '.image-hashes.json'
+
+# Sidecar mapping each image to its responsive variants, fetched by the viewer
+VARIANTS_FILENAME = 'variants.json'
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file in the same directory and rename it into place."""
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def write_manifest(session_dir, manifest):
+    """
+    Atomically write a hash manifest.
+
+    The manifest is written to a temp file in the same directory and renamed
+    over the old one, so readers never see a partially written file.
+    """
+    _write_json_atomic(Path(session_dir) / MANIFEST_FILENAME, manifest)
+
+
+def entry_filename(entry):
+    """
+    Get the main image filename from a manifest entry.
+
+    Entries are either a filename or, for images with responsive variants,
+    {'file': filename, 'widths': {width: filename}, 'placeholder': filename}.
+    """
+    return entry['file'] if isinstance(entry, dict) else entry
+
+
+def _manifest_signature(session_dir):
+    # Writes replace the file, so the inode changes even within one mtime tick
+    try:
+        stat_result = (Path(session_dir) / MANIFEST_FILENAME).stat()
+    except FileNotFoundError:
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_size
+
+
+class HashIndex:
+    """
+    Process-wide map of source-image SHA-256 -> converted file.
+
+    Each session directory's manifest is parsed once and re-read only when
+    it changes on disk (e.g. another worker process wrote it); rewrites
+    happen under a file lock so concurrent processes merge their entries. All sessions under
+    the media root are indexed so duplicates are found across sessions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}          # session dir -> {'signature': stat tuple, 'entries': {hash: entry}}
+        self._by_hash = {}       # hash -> (session dir, filename)
+        self._roots = {}         # media root -> mtime_ns of last directory scan
+
+    def _load_dir(self, session_dir):
+        """Load (or reload if changed on disk) a session's manifest. Caller holds the lock."""
+        key = str(session_dir)
+        signature = _manifest_signature(session_dir)
+        cached = self._dirs.get(key)
+        if cached is not None and cached['signature'] == signature:
+            return cached['entries']
+
+        entries = {}
+        if signature is not None:
+            try:
+                with open(Path(session_dir) / MANIFEST_FILENAME, 'r') as f:
+                    entries = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+
+        if cached is not None:
+            for file_hash in cached['entries']:
+                if self._by_hash.get(file_hash, (None,))[0] == key:
+                    del self._by_hash[file_hash]
+        for file_hash, entry in entries.items():
+            self._by_hash.setdefault(file_hash, (key, entry_filename(entry)))
+
+        self._dirs[key] = {'signature': signature, 'entries': entries}
+        return entries
+
+    def _load_root(self, media_root):
+        """Index every session directory under the media root. Caller holds the lock."""
+        media_root = Path(media_root)
+        try:
+            root_mtime = media_root.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if self._roots.get(str(media_root)) != root_mtime:
+            self._roots[str(media_root)] = root_mtime
+            for session_dir in sorted(media_root.iterdir()):
+                if session_dir.is_dir() and session_dir.name.startswith('session-'):
+                    self._load_dir(session_dir)
+        else:
+            for key in list(self._dirs):
+                if Path(key).parent == media_root:
+                    self._load_dir(key)
+
+    def _save_dir(self, session_dir, entries):
+        """Persist a session's manifest and variants sidecar. Caller holds the lock."""
+        write_manifest(session_dir, entries)
+        self._dirs[str(session_dir)] = {'signature': _manifest_signature(session_dir), 'entries': entries}
+
+        variants = {
+            entry['file']: {'widths': entry['widths'], 'placeholder': entry['placeholder']}
+            for entry in entries.values() if isinstance(entry, dict)
+        }
+        variants_path = Path(session_dir) / VARIANTS_FILENAME
+        if variants or variants_path.exists():
+            _write_json_atomic(variants_path, variants)
+
+    def lookup(self, file_hash, session_dir, other_sessions=True):
+        """
+        Find an existing converted image for a source hash.
+
+        Prefers a match in session_dir, then (unless other_sessions is False)
+        any other session under the same media root. Entries whose file has
+        disappeared are dropped.
+
+        Returns:
+            Path to the existing file, or None
+        """
+        session_dir = Path(session_dir)
+        with self._lock:
+            entries = self._load_dir(session_dir)
+            if file_hash in entries:
+                existing = session_dir / entry_filename(entries[file_hash])
+                if existing.exists():
+                    return existing
+                self._forget_hash(session_dir, file_hash)
+
+            if not other_sessions:
+                return None
+            self._load_root(session_dir.parent)
+            match = self._by_hash.get(file_hash)
+            if match is not None:
+                existing = Path(match[0]) / match[1]
+                if existing.exists():
+                    return existing
+                self._forget_hash(Path(match[0]), file_hash)
+        return None
+
+    def register(self, session_dir, filename, file_hash, variants=None):
+        """
+        Record a newly converted image and persist the manifest.
+
+        Args:
+            session_dir: Session media directory
+            filename: Main converted image filename
+            file_hash: SHA-256 of the source upload
+            variants: Optional {'widths': ..., 'placeholder': ...} from list_variants
+        """
+        session_dir = Path(session_dir)
+        with self._lock, file_lock(session_dir / MANIFEST_FILENAME):
+            entries = dict(self._load_dir(session_dir))
+            entries[file_hash] = dict(variants, file=filename) if variants else filename
+            self._save_dir(session_dir, entries)
+            self._by_hash[file_hash] = (str(session_dir), filename)
+
+    def forget_file(self, session_dir, filename):
+        """Drop manifest entries for a file that has been deleted."""
+        session_dir = Path(session_dir)
+        with self._lock:
+            entries = self._load_dir(session_dir)
+            stale = [h for h, entry in entries.items() if entry_filename(entry) == filename]
+            for file_hash in stale:
+                self._forget_hash(session_dir, file_hash)
+
+    def prune(self, session_dir):
+        """
+        Drop entries whose file no longer exists.
+
+        Returns:
+            Number of entries removed
+        """
+        session_dir = Path(session_dir)
+        with self._lock:
+            entries = self._load_dir(session_dir)
+            stale = [h for h, entry in entries.items()
+                     if not (session_dir / entry_filename(entry)).exists()]
+            for file_hash in stale:
+                self._forget_hash(session_dir, file_hash)
+        return len(stale)
+
+    def _forget_hash(self, session_dir, file_hash):
+        """Remove one entry and persist. Caller holds the lock."""
+        key = str(session_dir)
+        with file_lock(Path(session_dir) / MANIFEST_FILENAME):
+            entries = dict(self._load_dir(session_dir))
+            if entries.pop(file_hash, None) is None:
+                return
+            self._save_dir(session_dir, entries)
+        if self._by_hash.get(file_hash, (None,))[0] == key:
+            del self._by_hash[file_hash]
+            # Fall back to a copy in another session, if any
+            for other_key, cached in self._dirs.items():
+                if file_hash in cached['entries']:
+                    self._by_hash[file_hash] = (other_key, entry_filename(cached['entries'][file_hash]))
+                    break
+
+    def entries(self, session_dir):
+        """Return a copy of a session's {hash: entry} manifest."""
+        with self._lock:
+            return dict(self._load_dir(Path(session_dir)))
+
+
+hash_index = HashIndex()
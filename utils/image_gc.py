@@ -0,0 +1,231 @@
+"""Reference-counted garbage collection of uploaded images."""
+
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from utils import blobs, metrics
+from utils.hash_index import hash_index
+from utils.images import delete_image
+from utils.markdown import add_save_listener, load_session
+from utils.variants import is_variant_file
+
+
+# Released images are deleted only if still unreferenced after this long,
+# so an edit that drops an image and an undo that restores it don't race
+RELEASE_DELAY_SECONDS = 60
+
+# Unreferenced files younger than this are left alone by sweeps: an upload
+# isn't referenced by any session until its card is saved
+ORPHAN_GRACE_SECONDS = 24 * 60 * 60
+
+# How often the collector thread deletes released images / sweeps everything
+COLLECT_INTERVAL_SECONDS = 30
+SWEEP_INTERVAL_SECONDS = 6 * 60 * 60
+
+
+class ReferenceIndex:
+    """
+    Number of cards referencing each image, across all sessions.
+
+    Built from sessions/*.md on first use and kept current by every
+    save_session(); refresh() picks up files changed outside the server.
+    """
+
+    def __init__(self, sessions_dir='sessions'):
+        self.sessions_dir = Path(sessions_dir)
+        self._lock = threading.Lock()
+        self._models = None      # session name -> SessionModel last counted
+        self._counts = Counter()
+
+    def _set(self, name, model):
+        """Replace the references counted for one session. Caller holds the lock."""
+        old = self._models.get(name)
+        if old is model:
+            return
+        if old is not None:
+            self._counts.subtract(old.image_counts)
+        if model is None:
+            self._models.pop(name, None)
+        else:
+            self._counts.update(model.image_counts)
+            self._models[name] = model
+
+    def refresh(self):
+        """Recount sessions that changed on disk and drop deleted ones."""
+        with self._lock:
+            if self._models is None:
+                self._models = {}
+            names = {md_path.stem for md_path in self.sessions_dir.glob('*.md')}
+            for name in set(self._models) - names:
+                self._set(name, None)
+            for name in names:
+                self._set(name, load_session(name))
+            self._counts = +self._counts
+
+    def session_saved(self, model):
+        """Save listener: recount the saved session."""
+        with self._lock:
+            if self._models is not None:
+                self._set(model.session_file, model)
+
+    def count(self, image_path):
+        """Number of cards referencing an image (media/session-id/file.webp)."""
+        if self._models is None:
+            self.refresh()
+        with self._lock:
+            return max(self._counts[image_path], 0)
+
+
+class ImageCollector:
+    """
+    Deletes images no session references, off the request path.
+
+    Edits release() the images they dropped; the collector thread deletes
+    them after RELEASE_DELAY_SECONDS if they are still unreferenced.
+    sweep() additionally finds orphans on disk (crashed uploads, canceled
+    edits), stale manifest entries and blobs no session links to.
+    """
+
+    def __init__(self, references, media_root='media'):
+        self.references = references
+        self.media_root = Path(media_root)
+        self._lock = threading.Lock()
+        self._released = {}      # image path -> time released
+        self._thread = None
+
+    def release(self, image_paths):
+        """
+        Queue images an edit may have left unreferenced.
+
+        Returns:
+            Number of images queued for deletion
+        """
+        queued = 0
+        now = time.time()
+        for image_path in image_paths:
+            if (not isinstance(image_path, str) or not image_path.startswith('media/')
+                    or blobs.is_blob_path(image_path) or not Path(image_path).exists()):
+                continue
+            if self.references.count(image_path) == 0:
+                with self._lock:
+                    self._released.setdefault(image_path, now)
+                queued += 1
+        return queued
+
+    def retain(self, image_path):
+        """Cancel a pending deletion (e.g. the image was just reused by an upload)."""
+        with self._lock:
+            self._released.pop(image_path, None)
+
+    def collect(self):
+        """
+        Delete released images that are still unreferenced after the delay.
+
+        Returns:
+            Number of images deleted
+        """
+        cutoff = time.time() - RELEASE_DELAY_SECONDS
+        with self._lock:
+            due = [path for path, released in self._released.items() if released <= cutoff]
+            for path in due:
+                del self._released[path]
+        if not due:
+            return 0
+
+        self.references.refresh()
+        deleted = sum(1 for path in due if self.references.count(path) == 0 and delete_image(path))
+        if deleted > 0:
+            metrics.images_deleted.inc(deleted, reason='released')
+            print(f"✨ Cleaned up {deleted} unused image(s)")
+        return deleted
+
+    def sweep(self, grace=ORPHAN_GRACE_SECONDS):
+        """
+        Delete everything unreferenced that is older than grace seconds.
+
+        Returns:
+            Dict with the number of 'images', 'manifestEntries' and 'blobs' removed
+        """
+        self.references.refresh()
+        cutoff = time.time() - grace
+        stats = {'images': 0, 'manifestEntries': 0, 'blobs': 0}
+        if not self.media_root.is_dir():
+            return stats
+
+        for session_dir in sorted(self.media_root.iterdir()):
+            if not session_dir.is_dir() or not session_dir.name.startswith('session-'):
+                continue
+            for image_file in session_dir.glob('*.webp'):
+                if is_variant_file(image_file.name) or not _older_than(image_file, cutoff):
+                    continue
+                image_path = image_file.as_posix()
+                if self.references.count(image_path) == 0 and delete_image(image_path):
+                    stats['images'] += 1
+            stats['manifestEntries'] += hash_index.prune(session_dir)
+
+        stats['blobs'] = self._sweep_blobs(cutoff)
+        metrics.images_deleted.inc(stats['images'], reason='orphan')
+        metrics.images_deleted.inc(stats['blobs'], reason='blob')
+        return stats
+
+    def _sweep_blobs(self, cutoff):
+        """Delete blobs with no session links left, and abandoned staging files."""
+        removed = 0
+        for blob in (self.media_root / blobs.BLOB_DIRNAME).glob('*/*.webp'):
+            if not _older_than(blob, cutoff):
+                continue
+            if '.' in blob.stem:
+                blob.unlink(missing_ok=True)  # Left over from a crashed conversion
+            elif not is_variant_file(blob.name) and blob.stat().st_nlink == 1:
+                # Only the store's own link remains (copies made where hard
+                # links aren't supported count as unlinked; that just means
+                # a later re-upload converts again)
+                blobs.discard(blob)
+                removed += 1
+        return removed
+
+    def start(self, sweep=False):
+        """
+        Collect released images, and sweep periodically, on a daemon thread.
+
+        Args:
+            sweep: Also run periodic sweeps, starting now (--sweep; with
+                --workers only one process does)
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(sweep,), name='image-gc', daemon=True)
+            self._thread.start()
+
+    def _run(self, sweep):
+        last_sweep = None
+        while True:
+            try:
+                self.collect()
+                if sweep and (last_sweep is None or time.monotonic() - last_sweep >= SWEEP_INTERVAL_SECONDS):
+                    last_sweep = time.monotonic()
+                    stats = self.sweep()
+                    if any(stats.values()):
+                        print(f"🧹 Swept {stats['images']} orphaned image(s), "
+                              f"{stats['manifestEntries']} stale manifest entr(ies), "
+                              f"{stats['blobs']} unused blob(s)")
+            except Exception as e:
+                print(f"⚠️  Warning: Image cleanup failed: {e}")
+            time.sleep(COLLECT_INTERVAL_SECONDS)
+
+
+def _older_than(path, cutoff):
+    """Whether a file was last written or linked before cutoff."""
+    try:
+        stat_result = path.stat()
+    except FileNotFoundError:
+        return False
+    # ctime changes when a link is added, so a blob just linked into a session counts as new
+    return max(stat_result.st_mtime, stat_result.st_ctime) < cutoff
+
+
+reference_index = ReferenceIndex()
+add_save_listener(reference_index.session_saved)
+
+image_collector = ImageCollector(reference_index)
@@ -1,15 +1,23 @@
 """Image conversion and cleanup utilities."""
 
 import hashlib
-import json
 import os
 import re
-import shutil
-import subprocess
+import time
+from datetime import datetime
 from pathlib import Path
 
+from utils import blobs, metrics
+from utils.catalog import image_catalog
+from utils.converters import conversion_order, run_converter
+from utils.hash_index import hash_index
+from utils.variants import VARIANT_SUFFIX_PATTERN, variant_path, placeholder_path
 
-MANIFEST_FILENAME = '.image-hashes.json'
+
+# Widths (px) of the smaller responsive variants generated alongside the main image
+VARIANT_WIDTHS = tuple(
+    int(w) for w in os.environ.get('GROWTHLAB_VARIANT_WIDTHS', '480,960').split(',') if w.strip()
+)
 
 
 def compute_file_hash(file_path):
@@ -21,147 +29,162 @@ def compute_file_hash(file_path):
     return sha256.hexdigest()
 
 
-def load_hash_manifest(session_dir):
-    """Load hash manifest for a session directory."""
-    manifest_path = Path(session_dir) / MANIFEST_FILENAME
-    if manifest_path.exists():
-        try:
-            with open(manifest_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            pass
-    return {}
+def find_duplicate(file_path, session_dir, file_hash=None):
+    """
+    Check if a file was already uploaded to this session, by hash.
 
+    Args:
+        file_path: Path to the uploaded file
+        session_dir: Session media directory
+        file_hash: SHA-256 of the file if already known (skips re-reading it)
 
-def save_hash_manifest(session_dir, manifest):
-    """Save hash manifest for a session directory."""
-    manifest_path = Path(session_dir) / MANIFEST_FILENAME
-    with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+    Returns:
+        tuple: (is_duplicate, existing image path (media/...) or None, file_hash)
+    """
+    if file_hash is None:
+        file_hash = compute_file_hash(file_path)
 
+    existing = hash_index.lookup(file_hash, session_dir, other_sessions=False)
+    if existing is not None:
+        metrics.upload_dedupe.inc(result='session')
+        return True, existing.as_posix(), file_hash
 
-def find_duplicate(file_path, session_dir):
+    return False, None, file_hash
+
+
+def find_converted(file_hash, session_dir):
     """
-    Check if a file already exists in the session directory by hash.
+    Find the stored conversion of a source image uploaded anywhere before.
+
+    Images converted before the blob store existed are found through the
+    other sessions' manifests and adopted into the store.
 
     Returns:
-        tuple: (is_duplicate, existing_filename or None)
+        Path of the blob, or None if the image must be converted
     """
-    file_hash = compute_file_hash(file_path)
-    manifest = load_hash_manifest(session_dir)
+    media_root = Path(session_dir).parent
+    stored = blobs.blob_path(file_hash, media_root)
+    if stored.exists():
+        metrics.upload_dedupe.inc(result='store')
+        return stored
 
-    if file_hash in manifest:
-        existing_file = manifest[file_hash]
-        # Verify the file still exists
-        if (Path(session_dir) / existing_file).exists():
-            return True, existing_file, file_hash
+    existing = hash_index.lookup(file_hash, session_dir)
+    if existing is not None:
+        blobs.adopt(existing, file_hash, media_root)
+        metrics.upload_dedupe.inc(result='store')
+        return stored
 
-    return False, None, file_hash
+    metrics.upload_dedupe.inc(result='miss')
+    return None
+
+
+def new_image_filename(file_hash):
+    """
+    Name for a new session image: upload time plus a short content hash.
+
+    The hash keeps uploads made within the same second from colliding.
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file_hash[:8]}.webp"
+
+
+def link_converted(file_hash, session_dir, filename):
+    """
+    Add a stored image to a session under filename and record it.
+
+    Returns:
+        Relative image path (media/session-id/filename.webp)
+    """
+    session_dir = Path(session_dir)
+    output_path = session_dir / filename
+    blobs.link_into(file_hash, output_path, session_dir.parent)
+    register_image_hash(session_dir, filename, file_hash, list_variants(output_path))
+    image_catalog.add(output_path.as_posix())
+    return output_path.as_posix()
+
+
+def register_image_hash(session_dir, filename, file_hash, variants=None):
+    """Register a new image hash (and its responsive variants) in the manifest."""
+    hash_index.register(session_dir, filename, file_hash, variants)
+
+
+def list_variants(output_path):
+    """
+    Find the variants that were generated for a converted image.
+
+    Returns:
+        Dict with 'widths' ({width: filename}) and 'placeholder' (filename
+        or None), or None if no variants exist
+    """
+    widths = {
+        str(width): variant_path(output_path, width).name
+        for width in VARIANT_WIDTHS if variant_path(output_path, width).exists()
+    }
+    placeholder = placeholder_path(output_path)
+    placeholder = placeholder.name if placeholder.exists() else None
+    if not widths and not placeholder:
+        return None
+    return {'widths': widths, 'placeholder': placeholder}
+
+
+def delete_variants(image_file):
+    """Delete the variants and placeholder of an image. Returns the number removed."""
+    image_file = Path(image_file)
+    deleted = 0
+    for candidate in image_file.parent.glob(f'{image_file.stem}-*.webp'):
+        if VARIANT_SUFFIX_PATTERN.search(candidate.stem) and candidate.stem.rsplit('-', 1)[0] == image_file.stem:
+            try:
+                candidate.unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
 
 
-def register_image_hash(session_dir, filename, file_hash):
-    """Register a new image hash in the manifest."""
-    manifest = load_hash_manifest(session_dir)
-    manifest[file_hash] = filename
-    save_hash_manifest(session_dir, manifest)
+def forget_deleted_image(image_file):
+    """Remove a deleted image's variants, manifest entry and catalogue entry."""
+    image_file = Path(image_file)
+    delete_variants(image_file)
+    hash_index.forget_file(image_file.parent, image_file.name)
+    image_catalog.remove(image_file.as_posix())
 
 
-def convert_to_webp(input_path, output_path, is_gif=False):
+def convert_to_webp(input_path, output_path, is_gif=False, variant_widths=VARIANT_WIDTHS, converters=None):
     """
     Convert an image to WebP format.
 
-    Tries converters in order of reliability:
-    1. gif2webp (for GIFs - Google's official tool)
-    2. ImageMagick (magick or convert)
-    3. FFmpeg
+    Tries the converters probed at startup, best first (see
+    utils.converters.conversion_order): the fastest working tool for
+    stills, gif2webp (Google's official tool) first for GIFs. Pillow, when
+    installed, converts inside the worker process without spawning a tool.
+
+    Still images also get smaller width variants and a blurred placeholder
+    (see variant_path/placeholder_path), written in the same converter pass.
+    Animated GIFs are converted at full size only.
 
     Args:
         input_path: Path to source image
         output_path: Path for output WebP file
         is_gif: Whether the source is an animated GIF
+        variant_widths: Widths of the responsive variants to generate
+        converters: (name, tool) pairs to try in order; defaults to
+            conversion_order(is_gif)
 
     Returns:
-        True if conversion succeeded, False otherwise
+        Dict with the 'converter' used and the 'seconds' it took, or None
+        if every converter failed
     """
-    input_path = str(input_path)
-    output_path = str(output_path)
+    variants = [(width, variant_path(output_path, width)) for width in variant_widths]
+    placeholder = placeholder_path(output_path)
 
-    # For GIFs: use gif2webp (Google's official tool) - most reliable
-    if is_gif and shutil.which('gif2webp'):
-        try:
-            result = subprocess.run(
-                ['gif2webp', '-q', '80', '-m', '4', '-mixed', input_path, '-o', output_path],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            if result.returncode == 0:
-                print("✓ GIF converted with gif2webp")
-                return True
-            else:
-                print(f"gif2webp failed: {result.stderr}")
-        except Exception as e:
-            print(f"gif2webp conversion failed: {e}")
-
-    # Try ImageMagick (prefer 'magick' for v7)
-    magick_cmd = 'magick' if shutil.which('magick') else 'convert' if shutil.which('convert') else None
-    if magick_cmd:
-        try:
-            if is_gif:
-                # For GIFs: coalesce frames first, then convert
-                result = subprocess.run(
-                    [magick_cmd, input_path, '-coalesce', '-quality', '80', output_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-            else:
-                result = subprocess.run(
-                    [magick_cmd, input_path, '-resize', '1600x>', '-quality', '75', output_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-            if result.returncode == 0:
-                return True
-            else:
-                print(f"ImageMagick stderr: {result.stderr}")
-        except Exception as e:
-            print(f"ImageMagick conversion failed: {e}")
-
-    # Try FFmpeg as last resort
-    if shutil.which('ffmpeg'):
-        try:
-            if is_gif:
-                result = subprocess.run(
-                    ['ffmpeg', '-i', input_path,
-                     '-vcodec', 'libwebp', '-lossless', '0',
-                     '-compression_level', '4', '-q:v', '70',
-                     '-loop', '0', '-an', '-vsync', '0',
-                     output_path, '-y'],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-            else:
-                result = subprocess.run(
-                    ['ffmpeg', '-i', input_path, '-vf', 'scale=1600:-1:flags=lanczos',
-                     '-q:v', '75', output_path, '-y'],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-            if result.returncode == 0:
-                return True
-            else:
-                print(f"FFmpeg stderr: {result.stderr}")
-        except Exception as e:
-            print(f"FFmpeg conversion failed: {e}")
+    for name, tool in converters or conversion_order(is_gif):
+        start = time.perf_counter()
+        if run_converter(name, tool, input_path, output_path, variants, placeholder, is_gif):
+            return {'converter': name, 'seconds': time.perf_counter() - start}
 
-    return False
+    return None
 
 
-def extract_image_paths(markdown, session_id):
+def extract_image_paths(markdown, session_id=None):
     """
     Extract all image paths from markdown for a session.
 
@@ -170,7 +193,8 @@ def extract_image_paths(markdown, session_id):
 
     Args:
         markdown: The markdown content to search
-        session_id: Session identifier for path matching
+        session_id: Session identifier for path matching (None matches
+            images in any session's media directory)
 
     Returns:
         Set of relative image paths found
@@ -178,7 +202,8 @@ def extract_image_paths(markdown, session_id):
     normalized_images = set()
 
     # Pattern to match: media/session-id/filename.webp
-    relative_path_pattern = rf'media/{session_id}/[^)\s"\']+\.webp'
+    session_pattern = re.escape(session_id) if session_id else r'[^/)\s"\']+'
+    relative_path_pattern = rf'media/{session_pattern}/[^)\s"\']+\.webp'
 
     # Match markdown syntax: ![alt](url)
     markdown_matches = re.finditer(rf'!\[[^\]]*\]\(([^)]+)\)', markdown)
@@ -199,52 +224,21 @@ def extract_image_paths(markdown, session_id):
     return normalized_images
 
 
-def cleanup_unused_images(old_markdown, new_markdown, session_id):
-    """
-    Delete images no longer referenced in markdown.
-
-    Args:
-        old_markdown: Previous markdown content
-        new_markdown: Updated markdown content
-        session_id: Session identifier
-
-    Returns:
-        Number of images deleted
-    """
-    old_images = extract_image_paths(old_markdown, session_id)
-    new_images = extract_image_paths(new_markdown, session_id)
-
-    to_delete = old_images - new_images
-    deleted = 0
-
-    for image_path in to_delete:
-        try:
-            image_file = Path(image_path)
-            if image_file.exists():
-                image_file.unlink()
-                print(f"🗑️  Deleted unused image: {image_path}")
-                deleted += 1
-        except FileNotFoundError:
-            pass
-        except Exception as e:
-            print(f"⚠️  Warning: Could not delete {image_path}: {e}")
-
-    return deleted
-
-
 def delete_image(image_path):
     """
     Delete a single image file safely.
 
     Args:
-        image_path: Path to the image (must be in media/ and .webp)
+        image_path: Path to the image (must be a .webp in media/, outside the blob store)
 
     Returns:
         True if deleted, False otherwise
     """
-    if image_path.startswith('media/') and image_path.endswith('.webp'):
+    if image_path.startswith('media/') and image_path.endswith('.webp') and not blobs.is_blob_path(image_path):
         try:
-            Path(image_path).unlink()
+            image_file = Path(image_path)
+            image_file.unlink()
+            forget_deleted_image(image_file)
             print(f"🗑️  Deleted: {image_path}")
             return True
         except FileNotFoundError:
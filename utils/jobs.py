@@ -0,0 +1,184 @@
+"""Background job queue for image conversions."""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Finished jobs are kept this long so clients can collect their result
+JOB_TTL_SECONDS = 600
+
+# Workers start from a clean interpreter, not a fork of the threaded server
+# (a fork can inherit locks held by other threads mid-request)
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class QueueFullError(Exception):
+    """Raised when the queue cannot accept another job."""
+
+
+class JobQueue:
+    """
+    Bounded process pool with pollable job status.
+
+    Work runs in separate processes so converters (and their CPU use) are
+    capped at ``max_workers`` regardless of how many requests arrive, and
+    request threads return immediately with a job id.
+
+    With a status_dir, job states are also written there as <id>.json, so
+    a server process that didn't submit a job (--workers) can still report
+    it to a polling client.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, status_dir=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.status_dir = Path(status_dir) if status_dir else None
+        self._executor = None
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context(START_METHOD))
+        return self._executor
+
+    def submit(self, fn, *args, on_done=None, max_pending=None):
+        """
+        Queue a function call in the worker pool.
+
+        Args:
+            fn: Picklable top-level function to run
+            *args: Arguments for fn
+            on_done: Optional callback(future) run in the parent process when
+                fn completes; its return value (a dict) becomes the job result,
+                and an exception marks the job failed
+            max_pending: Override the queue's bound for this job (a batch
+                admitted as a whole may go past the usual limit)
+
+        Returns:
+            The new job id
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._prune()
+            if self._pending >= (max_pending or self.max_pending):
+                raise QueueFullError(f'{self._pending} jobs already pending')
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {'id': job_id, 'status': 'pending', 'created': time.time()}
+            self._pending += 1
+            self._publish(self._jobs[job_id])
+
+            try:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM-killed); start a fresh pool
+                    self._executor = None
+                    future = self._get_executor().submit(fn, *args)
+            except Exception as e:
+                job = self._jobs[job_id]
+                job.update(status='failed', error=str(e), finished=time.time())
+                self._publish(job)
+                self._pending -= 1
+                raise
+
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_done))
+        return job_id
+
+    def _finish(self, job_id, future, on_done):
+        try:
+            update = on_done(future) if on_done else {'result': future.result()}
+            update.setdefault('status', 'done')
+        except Exception as e:
+            update = {'status': 'failed', 'error': str(e)}
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(update)
+                job['finished'] = time.time()
+                self._publish(job)
+            self._pending -= 1
+
+    def _publish(self, job):
+        """Write a job's state for other processes. Caller holds the lock."""
+        if self.status_dir is None:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.status_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(job, f)
+            os.replace(temp_path, self.status_dir / f"{job['id']}.json")
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    @property
+    def pending(self):
+        """Number of jobs queued or running."""
+        return self._pending
+
+    def get(self, job_id):
+        """
+        Get a snapshot of a job's status.
+
+        Never blocks: clients poll until the job is no longer pending, so a
+        status request doesn't hold a server thread while a conversion runs.
+
+        Args:
+            job_id: Job id returned by submit
+
+        Returns:
+            Job dict, or None if the id is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        if self.status_dir is None:
+            return None
+        # Submitted by another process: read its status file
+        return self._read_status(job_id)
+
+    def _read_status(self, job_id):
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self.status_dir / f'{job_id}.json') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.get('finished', float('inf')) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self.status_dir is not None:
+                (self.status_dir / f'{job_id}.json').unlink(missing_ok=True)
+
+    def shutdown(self, wait=False):
+        """
+        Stop the worker pool.
+
+        Args:
+            wait: Finish queued and running jobs first (graceful shutdown);
+                otherwise queued jobs are cancelled
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
@@ -0,0 +1,120 @@
+"""Locking helpers for concurrent request handling (threads and worker processes)."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: locks only cover threads of one process
+
+
+# Lock files live here, outside the served (and git-tracked) tree
+LOCK_DIR = Path(tempfile.gettempdir()) / 'growthlab-locks'
+
+_registry_lock = threading.Lock()
+_session_locks = {}
+
+
+def lock_path(path):
+    """
+    Lock file guarding a file or directory.
+
+    Keyed by the absolute path, so every process serving the same tree
+    (whatever its working directory) agrees on it.
+    """
+    digest = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:32]
+    return LOCK_DIR / f'{digest}.lock'
+
+
+def _acquire_file(path):
+    """Open and exclusively lock the lock file guarding path; returns its fd (None if unsupported)."""
+    if fcntl is None:
+        return None
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _release_file(fd):
+    if fd is not None:
+        os.close(fd)  # Closing the descriptor releases the lock
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on a file, shared with other processes.
+
+    Files that several server processes rewrite (--workers) are updated
+    under this lock and replaced by atomic rename, so read-modify-write
+    cycles don't interleave and readers never see a partial file. Not
+    re-entrant: a thread must not take the same lock twice.
+
+    Args:
+        path: File (or directory) to guard; the lock file itself is kept
+            in LOCK_DIR
+    """
+    fd = _acquire_file(path)
+    try:
+        yield
+    finally:
+        _release_file(fd)
+
+
+class SessionLock:
+    """Re-entrant lock for one session, held across threads and processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = _acquire_file(self.path)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            _release_file(self._fd)
+            self._fd = None
+        self._lock.release()
+
+
+def session_lock(session_file):
+    """
+    Get the lock guarding a session's markdown and media.
+
+    Card mutations are read-modify-write cycles on the whole session file,
+    so requests touching the same session must not interleave, whether
+    they run on threads of this process or in other worker processes.
+
+    Args:
+        session_file: Sanitized session name
+
+    Returns:
+        A re-entrant SessionLock shared by all threads for this session
+    """
+    with _registry_lock:
+        lock = _session_locks.get(session_file)
+        if lock is None:
+            lock = _session_locks[session_file] = SessionLock(Path('sessions') / f'{session_file}.md')
+        return lock
@@ -2,8 +2,13 @@
 
 import os
 import re
+import tempfile
+import threading
+from collections import Counter
 from pathlib import Path
 
+from utils.images import extract_image_paths
+
 
 CARD_DELIMITER = '\n---\n'
 
@@ -50,6 +55,149 @@ def get_session_path(session_file):
     return Path('sessions') / f"{session_file}.md"
 
 
+class SessionModel:
+    """
+    Parsed session: its cards plus the images each card references
+    (in any session's media directory).
+
+    Models are treated as immutable; edits return a new model that shares
+    the unchanged cards, so only the edited card is re-scanned for images.
+    """
+
+    def __init__(self, session_file, cards, card_images, image_counts):
+        self.session_file = session_file
+        self.cards = cards
+        self.card_images = card_images
+        self.image_counts = image_counts
+        self._content = None
+
+    @classmethod
+    def parse(cls, session_file, content):
+        """Build a model from full markdown content."""
+        cards = split_cards(content)
+        card_images = [frozenset(extract_image_paths(card)) for card in cards]
+        image_counts = Counter(img for images in card_images for img in images)
+        model = cls(session_file, cards, card_images, image_counts)
+        model._content = content
+        return model
+
+    @property
+    def content(self):
+        """Full markdown content of the session."""
+        if self._content is None:
+            self._content = join_cards(self.cards)
+        return self._content
+
+    def references(self, image_path):
+        """Whether any card still references an image."""
+        return self.image_counts[image_path] > 0
+
+    def replace_card(self, card_index, new_content):
+        """
+        Return a new model with one card replaced.
+
+        Returns:
+            Tuple of (new_model, removed_images) where removed_images are
+            paths the old card referenced that no card references any more
+        """
+        new_images = frozenset(extract_image_paths(new_content))
+        old_images = self.card_images[card_index]
+
+        cards = list(self.cards)
+        cards[card_index] = new_content
+        card_images = list(self.card_images)
+        card_images[card_index] = new_images
+        image_counts = self.image_counts.copy()
+        image_counts.subtract(old_images)
+        image_counts.update(new_images)
+
+        model = SessionModel(self.session_file, cards, card_images, image_counts)
+        return model, {img for img in old_images if not model.references(img)}
+
+    def remove_card(self, card_index):
+        """
+        Return a new model with one card removed.
+
+        Returns:
+            Tuple of (new_model, removed_images)
+        """
+        old_images = self.card_images[card_index]
+
+        cards = self.cards[:card_index] + self.cards[card_index + 1:]
+        card_images = self.card_images[:card_index] + self.card_images[card_index + 1:]
+        image_counts = self.image_counts.copy()
+        image_counts.subtract(old_images)
+
+        model = SessionModel(self.session_file, cards, card_images, image_counts)
+        return model, {img for img in old_images if not model.references(img)}
+
+    def insert_card(self, card_index, content):
+        """Return a new model with a card inserted before card_index."""
+        images = frozenset(extract_image_paths(content))
+        cards = self.cards[:card_index] + [content] + self.cards[card_index:]
+        card_images = self.card_images[:card_index] + [images] + self.card_images[card_index:]
+        image_counts = self.image_counts.copy()
+        image_counts.update(images)
+        return SessionModel(self.session_file, cards, card_images, image_counts)
+
+    def move_card(self, from_index, to_index):
+        """Return a new model with a card moved to to_index."""
+        cards = list(self.cards)
+        card_images = list(self.card_images)
+        cards.insert(to_index, cards.pop(from_index))
+        card_images.insert(to_index, card_images.pop(from_index))
+        return SessionModel(self.session_file, cards, card_images, self.image_counts)
+
+
+# Parsed sessions keyed by name, validated against the file's (mtime_ns, inode, size);
+# saves replace the file, so the inode changes even within one mtime tick
+_session_cache = {}
+_session_cache_lock = threading.Lock()
+
+# Callbacks run with the new model after every save
+_save_listeners = []
+
+
+def add_save_listener(listener):
+    """Register listener(model) to be called after a session is saved."""
+    _save_listeners.append(listener)
+
+
+def _file_signature(md_path):
+    stat_result = md_path.stat()
+    return stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_size
+
+
+def load_session(session_file):
+    """
+    Get the parsed model of a session, re-reading the file only if it changed.
+
+    Args:
+        session_file: Sanitized session name
+
+    Returns:
+        SessionModel, or None if the session file doesn't exist
+    """
+    md_path = get_session_path(session_file)
+    try:
+        signature = _file_signature(md_path)
+    except FileNotFoundError:
+        return None
+
+    with _session_cache_lock:
+        cached = _session_cache.get(session_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with open(md_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    model = SessionModel.parse(session_file, content)
+
+    with _session_cache_lock:
+        _session_cache[session_file] = (signature, model)
+    return model
+
+
 def read_session(session_file):
     """
     Read a session markdown file.
@@ -60,14 +208,42 @@ def read_session(session_file):
     Returns:
         Tuple of (content, cards) or (None, None) if not found
     """
-    md_path = get_session_path(session_file)
-    if not md_path.exists():
+    model = load_session(session_file)
+    if model is None:
         return None, None
 
-    with open(md_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    return model.content, list(model.cards)
+
+
+def save_session(model):
+    """
+    Write a session model to its markdown file and cache it.
 
-    return content, split_cards(content)
+    Args:
+        model: SessionModel to persist
+    """
+    md_path = get_session_path(model.session_file)
+    # Write a temp file and rename it over the session, so readers (including
+    # other worker processes) never see a partially written file
+    fd, temp_path = tempfile.mkstemp(dir=md_path.parent, prefix=f'.{md_path.name}', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(model.content)
+        try:
+            os.chmod(temp_path, os.stat(md_path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, md_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    with _session_cache_lock:
+        _session_cache[model.session_file] = (_file_signature(md_path), model)
+
+    for listener in _save_listeners:
+        listener(model)
 
 
 def write_session(session_file, content):
@@ -78,61 +254,123 @@ def write_session(session_file, content):
         session_file: Sanitized session name
         content: Full markdown content to write
     """
-    md_path = get_session_path(session_file)
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    save_session(SessionModel.parse(session_file, content))
 
 
 def update_card(session_file, card_index, new_content):
     """
     Update a specific card in a session file.
 
+    The edit is applied to the cached model; nothing is written until
+    save_session() is called with the returned model.
+
     Args:
         session_file: Sanitized session name
         card_index: Index of card to update
         new_content: New content for the card
 
     Returns:
-        Tuple of (success, old_content, new_full_content, error_message)
+        Tuple of (success, new_model, removed_images, error_message)
     """
-    old_content, cards = read_session(session_file)
+    model = load_session(session_file)
 
-    if old_content is None:
+    if model is None:
         return False, None, None, 'Session file not found'
 
-    if card_index < 0 or card_index >= len(cards):
+    if card_index < 0 or card_index >= len(model.cards):
         return False, None, None, 'Invalid card index'
 
-    cards[card_index] = new_content
-    new_full_content = join_cards(cards)
+    new_model, removed_images = model.replace_card(card_index, new_content)
 
-    return True, old_content, new_full_content, None
+    return True, new_model, removed_images, None
 
 
 def delete_card(session_file, card_index):
     """
     Delete a specific card from a session file.
 
+    The edit is applied to the cached model; nothing is written until
+    save_session() is called with the returned model.
+
     Args:
         session_file: Sanitized session name
         card_index: Index of card to delete
 
     Returns:
-        Tuple of (success, deleted_card_content, new_full_content, error_message)
+        Tuple of (success, new_model, removed_images, error_message)
     """
-    old_content, cards = read_session(session_file)
+    model = load_session(session_file)
 
-    if old_content is None:
+    if model is None:
         return False, None, None, 'Session file not found'
 
-    if card_index < 0 or card_index >= len(cards):
+    if card_index < 0 or card_index >= len(model.cards):
         return False, None, None, 'Invalid card index'
 
-    if len(cards) <= 1:
+    if len(model.cards) <= 1:
         return False, None, None, 'Cannot delete the only card'
 
-    deleted_card_content = cards[card_index]
-    del cards[card_index]
-    new_full_content = join_cards(cards)
+    new_model, removed_images = model.remove_card(card_index)
+
+    return True, new_model, removed_images, None
+
+
+def apply_card_ops(session_file, ops):
+    """
+    Apply an ordered list of card edits to a session as one change.
+
+    Each op is one of:
+        {'op': 'update', 'index': i, 'content': str}
+        {'op': 'insert', 'index': i, 'content': str}   (i may equal the card count)
+        {'op': 'delete', 'index': i}
+        {'op': 'move', 'from': i, 'to': j}
+    Indexes refer to the cards as left by the preceding ops. Nothing is
+    written until save_session() is called with the returned model.
+
+    Args:
+        session_file: Sanitized session name
+        ops: List of op dicts
+
+    Returns:
+        Tuple of (success, new_model, removed_images, error_message)
+    """
+    model = load_session(session_file)
+
+    if model is None:
+        return False, None, None, 'Session file not found'
 
-    return True, deleted_card_content, new_full_content, None
+    def valid_index(value, upper):
+        return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < upper
+
+    removed_images = set()
+    for position, op in enumerate(ops):
+        kind = op.get('op') if isinstance(op, dict) else None
+        card_count = len(model.cards)
+
+        if kind in ('update', 'insert'):
+            upper = card_count + (kind == 'insert')
+            if not valid_index(op.get('index'), upper):
+                return False, None, None, f'Invalid card index (op {position})'
+            if not isinstance(op.get('content'), str):
+                return False, None, None, f'Missing card content (op {position})'
+            if kind == 'update':
+                model, removed = model.replace_card(op['index'], op['content'])
+                removed_images |= removed
+            else:
+                model = model.insert_card(op['index'], op['content'])
+        elif kind == 'delete':
+            if not valid_index(op.get('index'), card_count):
+                return False, None, None, f'Invalid card index (op {position})'
+            if card_count <= 1:
+                return False, None, None, 'Cannot delete the only card'
+            model, removed = model.remove_card(op['index'])
+            removed_images |= removed
+        elif kind == 'move':
+            if not valid_index(op.get('from'), card_count) or not valid_index(op.get('to'), card_count):
+                return False, None, None, f'Invalid card index (op {position})'
+            model = model.move_card(op['from'], op['to'])
+        else:
+            return False, None, None, f'Unknown operation (op {position})'
+
+    # An image dropped by one op may be referenced again by a later one
+    return True, model, {img for img in removed_images if not model.references(img)}, None
@@ -0,0 +1,158 @@
+"""In-process metrics exposed in the Prometheus text format."""
+
+import math
+import threading
+
+
+# Latency buckets (seconds) for HTTP requests and for image conversions
+REQUEST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONVERSION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self, const=()):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_labels(self.label_names, key, const)} {_number(value)}'
+
+
+class Histogram:
+    """Cumulative histogram with optional labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}        # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self, const=()):
+        with self._lock:
+            items = sorted((key, list(entry)) for key, entry in self._values.items())
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f'{self.name}_bucket{_labels(self.label_names, key, [*const, le])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.label_names, key, const)} {entry[-2]!r}'
+            yield f'{self.name}_count{_labels(self.label_names, key, const)} {entry[-1]}'
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self, const=()):
+        yield f'{self.name}{_labels((), (), const)} {_number(self.read())}'
+
+
+class Registry:
+    """Set of metrics rendered together for /api/metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self.const_labels = {}   # added to every series (e.g. worker="0" under --workers)
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self.register(Gauge(name, help_text, read))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        const = [f'{name}="{_escape(value)}"' for name, value in self.const_labels.items()]
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(const))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'growthlab_http_requests_total', 'HTTP requests by route, method and status.',
+    ('route', 'method', 'status'))
+http_duration = registry.histogram(
+    'growthlab_http_request_duration_seconds', 'Time to handle a request, from request line to last byte.',
+    ('route', 'method'))
+http_bytes_in = registry.counter(
+    'growthlab_http_request_bytes_total', 'Request body bytes received.', ('route',))
+http_bytes_out = registry.counter(
+    'growthlab_http_response_bytes_total', 'Response body bytes sent.', ('route',))
+
+conversion_duration = registry.histogram(
+    'growthlab_conversion_duration_seconds', 'Image conversion time by converter.',
+    ('converter',), CONVERSION_BUCKETS)
+conversion_failures = registry.counter(
+    'growthlab_conversion_failures_total', 'Uploads no converter could convert.')
+upload_dedupe = registry.counter(
+    'growthlab_upload_dedupe_total',
+    'Upload dedupe lookups: session (already in the session), store (already converted), miss.',
+    ('result',))
+images_deleted = registry.counter(
+    'growthlab_images_deleted_total', 'Images deleted by cleanup, by reason.', ('reason',))
@@ -1,57 +1,245 @@
 """Multipart form-data parser (replaces deprecated cgi module)."""
 
+import hashlib
+import io
+import os
 import re
+import tempfile
+from pathlib import Path
 
 
-def parse_multipart(body, boundary):
+# Bytes read from the socket at a time; bounds peak memory per upload
+CHUNK_SIZE = 64 * 1024
+
+# Limits for the parts that are held in memory
+MAX_HEADER_SIZE = 16 * 1024
+MAX_FIELD_SIZE = 1024 * 1024
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart body is malformed or exceeds limits."""
+
+
+def get_boundary(content_type):
+    """
+    Extract the boundary from a multipart Content-Type header.
+
+    Returns:
+        Boundary string, or None if missing
     """
-    Parse multipart/form-data.
+    match = re.search(r'boundary=(?:"([^"]+)"|([^;\s]+))', content_type or '')
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
+
+
+class _BodyReader:
+    """Buffered reader over at most content_length bytes of a stream."""
+
+    def __init__(self, stream, content_length):
+        self.stream = stream
+        self.remaining = content_length
+        self.buffer = bytearray()
+
+    def fill(self):
+        """Read another chunk into the buffer. Returns False at end of body."""
+        if self.remaining <= 0:
+            return False
+        chunk = self.stream.read(min(CHUNK_SIZE, self.remaining))
+        if not chunk:
+            raise MultipartError('Unexpected end of request body')
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+        return True
+
+    def read_until(self, marker, limit):
+        """Consume and return bytes up to (not including) marker."""
+        start = 0
+        while True:
+            idx = self.buffer.find(marker, start)
+            if idx >= 0:
+                data = bytes(self.buffer[:idx])
+                del self.buffer[:idx + len(marker)]
+                return data
+            if len(self.buffer) > limit:
+                raise MultipartError('Multipart section too large')
+            start = max(0, len(self.buffer) - len(marker) + 1)
+            if not self.fill():
+                raise MultipartError('Multipart boundary not found')
+
+    def stream_until(self, marker, write):
+        """Pass bytes up to marker to write() without buffering them all."""
+        keep = len(marker) - 1
+        while True:
+            idx = self.buffer.find(marker)
+            if idx >= 0:
+                write(bytes(self.buffer[:idx]))
+                del self.buffer[:idx + len(marker)]
+                return
+            if len(self.buffer) > keep:
+                write(bytes(self.buffer[:-keep]))
+                del self.buffer[:-keep]
+            if not self.fill():
+                raise MultipartError('Multipart boundary not found')
+
+    def read_exact(self, size):
+        while len(self.buffer) < size:
+            if not self.fill():
+                raise MultipartError('Unexpected end of request body')
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def drain(self):
+        """Discard whatever is left of the body (e.g. the epilogue)."""
+        self.buffer.clear()
+        while self.remaining > 0:
+            chunk = self.stream.read(min(CHUNK_SIZE, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+
+
+def iter_multipart(stream, boundary, content_length, spool_files=True):
+    """
+    Incrementally parse multipart/form-data from a stream.
+
+    File parts are streamed to temp files and hashed as they arrive, so
+    memory use is bounded by CHUNK_SIZE regardless of upload size.
 
     Args:
-        body: Raw bytes of the request body
+        stream: File-like object positioned at the start of the body
         boundary: The boundary string from Content-Type header
+        content_length: Number of body bytes to read from stream
+        spool_files: Write file parts to temp files (False keeps them in memory)
 
-    Returns:
-        Dict of {field_name: {'data': bytes, 'filename': str or None}}
+    Yields:
+        Dicts with 'name' and 'filename' plus either 'data' (bytes) or,
+        for spooled files, 'path', 'size' and 'sha256'. The caller owns
+        (and must delete) any temp files.
+
+    Raises:
+        MultipartError: If the body is malformed or a limit is exceeded
     """
-    boundary_bytes = f'--{boundary}'.encode()
-    parts = body.split(boundary_bytes)
+    reader = _BodyReader(stream, content_length)
+    delimiter = b'\r\n--' + boundary.encode()
+
+    # Skip the preamble up to the first boundary
+    reader.read_until(delimiter[2:], MAX_HEADER_SIZE)
+
+    while True:
+        if reader.read_exact(2) == b'--':
+            break  # Closing boundary
+
+        headers_str = reader.read_until(b'\r\n\r\n', MAX_HEADER_SIZE).decode('utf-8', errors='ignore')
+        name_match = re.search(r'\bname="([^"]*)"', headers_str)
+        filename_match = re.search(r'filename="([^"]*)"', headers_str)
+        part = {
+            'name': name_match.group(1) if name_match else None,
+            'filename': filename_match.group(1) if filename_match else None,
+        }
 
-    result = {}
-    for part in parts:
-        if not part or part == b'--\r\n' or part == b'--':
-            continue
+        if part['filename'] is not None and spool_files:
+            suffix = Path(part['filename']).suffix.lower()
+            sha256 = hashlib.sha256()
+            size = 0
+            fd, temp_path = tempfile.mkstemp(suffix=suffix)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    def write(data):
+                        nonlocal size
+                        sha256.update(data)
+                        size += len(data)
+                        f.write(data)
+                    reader.stream_until(delimiter, write)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            part.update(path=temp_path, size=size, sha256=sha256.hexdigest())
+        else:
+            limit = MAX_FIELD_SIZE if part['filename'] is None else content_length
+            part['data'] = reader.read_until(delimiter, limit)
+
+        if part['name'] is not None:
+            yield part
+        elif 'path' in part:
+            os.unlink(part['path'])
+
+    reader.drain()
+
+
+def parse_multipart_stream(stream, boundary, content_length):
+    """
+    Parse multipart/form-data from a stream, spooling files to disk.
 
-        # Split headers from data
-        if b'\r\n\r\n' not in part:
-            continue
+    Returns:
+        Dict of {field_name: part} as yielded by iter_multipart
+    """
+    result = {}
+    try:
+        for part in iter_multipart(stream, boundary, content_length):
+            previous = result.get(part['name'])
+            if previous and 'path' in previous:
+                os.unlink(previous['path'])
+            result[part['name']] = part
+    except BaseException:
+        discard_parts(result)
+        raise
+    return result
 
-        headers_data = part.split(b'\r\n\r\n', 1)
-        if len(headers_data) != 2:
-            continue
 
-        headers_bytes, data = headers_data
+def parse_multipart_files(stream, boundary, content_length, file_field, max_files):
+    """
+    Parse multipart/form-data with a repeated file field, spooling files to disk.
 
-        # Parse Content-Disposition header
-        headers_str = headers_bytes.decode('utf-8', errors='ignore')
+    Args:
+        file_field: Name of the field that may hold many files
+        max_files: Most files accepted in file_field
 
-        # Extract field name
-        name_match = re.search(r'name="([^"]+)"', headers_str)
-        if not name_match:
-            continue
+    Returns:
+        Tuple of (fields, files): a dict of the other parts as in
+        parse_multipart_stream, and the file_field parts in input order
 
-        field_name = name_match.group(1)
+    Raises:
+        MultipartError: If the body is malformed or a limit is exceeded
+    """
+    fields = {}
+    files = []
+    try:
+        for part in iter_multipart(stream, boundary, content_length):
+            if part['name'] == file_field and 'path' in part:
+                files.append(part)
+                if len(files) > max_files:
+                    raise MultipartError(f'Too many files (max {max_files})')
+                continue
+            previous = fields.get(part['name'])
+            if previous and 'path' in previous:
+                os.unlink(previous['path'])
+            fields[part['name']] = part
+    except BaseException:
+        discard_parts(fields)
+        discard_parts(dict(enumerate(files)))
+        raise
+    return fields, files
+
+
+def discard_parts(parts):
+    """Delete the temp files of any spooled file parts."""
+    for part in parts.values():
+        if part.get('path') and os.path.exists(part['path']):
+            os.unlink(part['path'])
 
-        # Extract filename if present
-        filename_match = re.search(r'filename="([^"]+)"', headers_str)
-        filename = filename_match.group(1) if filename_match else None
 
-        # Remove trailing boundary markers
-        data = data.rstrip(b'\r\n')
+def parse_multipart(body, boundary):
+    """
+    Parse multipart/form-data held in memory.
 
-        result[field_name] = {
-            'data': data,
-            'filename': filename
-        }
+    Args:
+        body: Raw bytes of the request body
+        boundary: The boundary string from Content-Type header
 
-    return result
+    Returns:
+        Dict of {field_name: {'data': bytes, 'filename': str or None}}
+    """
+    parts = iter_multipart(io.BytesIO(body), boundary, len(body), spool_files=False)
+    return {part['name']: {'data': part['data'], 'filename': part['filename']} for part in parts}
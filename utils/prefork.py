@@ -0,0 +1,214 @@
+"""Pre-forked worker processes sharing one listening socket (--workers)."""
+
+import os
+import select
+import signal
+import socket
+import subprocess
+import threading
+import time
+
+from utils.serving import REQUEST_QUEUE_SIZE
+
+
+# Environment a worker is started with
+LISTEN_FD_ENV = 'GROWTHLAB_LISTEN_FD'
+READY_FD_ENV = 'GROWTHLAB_READY_FD'
+WORKER_INDEX_ENV = 'GROWTHLAB_WORKER'
+
+# Workers get this long to finish in-flight requests before they are killed
+SHUTDOWN_GRACE_SECONDS = 30
+
+# Longest a (re)started worker may take to import, probe converters and start serving
+READY_TIMEOUT_SECONDS = 60
+
+# A worker that dies sooner than this after starting is restarted with a growing delay
+MIN_UPTIME_SECONDS = 5
+MAX_RESTART_DELAY = 30
+
+
+def listen(port):
+    """Bind the listening socket that workers will share."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('', port))
+    sock.listen(REQUEST_QUEUE_SIZE)
+    return sock
+
+
+def inherited_socket():
+    """The listening socket passed down by the supervisor, or None outside a worker."""
+    fd = os.environ.get(LISTEN_FD_ENV)
+    return socket.socket(fileno=int(fd)) if fd is not None else None
+
+
+def worker_index():
+    """This worker's slot number, or None outside a worker."""
+    index = os.environ.get(WORKER_INDEX_ENV)
+    return int(index) if index is not None else None
+
+
+def notify_ready():
+    """Tell the supervisor this worker is about to serve."""
+    fd = os.environ.pop(READY_FD_ENV, None)
+    if fd is None:
+        return
+    try:
+        os.write(int(fd), b'1')
+    except OSError:
+        pass  # The supervisor isn't waiting for this one
+    finally:
+        os.close(int(fd))
+
+
+def watch_parent(on_orphaned, interval=1):
+    """Call on_orphaned() once if the supervisor dies (e.g. kill -9)."""
+    parent = os.getppid()
+
+    def watch():
+        while os.getppid() == parent:
+            time.sleep(interval)
+        on_orphaned()
+
+    threading.Thread(target=watch, name='parent-watch', daemon=True).start()
+
+
+class Supervisor:
+    """
+    Runs copies of the server as worker processes on one listening socket.
+
+    Each worker is a fresh `python server.py ...` process that inherits the
+    socket, so the kernel spreads connections across processes and cores.
+    Workers that die are restarted (with backoff if they die right away).
+    SIGHUP replaces workers one at a time, picking up code changes: the old
+    worker is retired only once its replacement is serving, and a
+    replacement that fails to start leaves the old one running. SIGTERM or
+    SIGINT stops all workers gracefully, letting in-flight requests finish.
+    """
+
+    def __init__(self, sock, count, command, env=None):
+        self.sock = sock
+        self.count = count
+        self.command = command
+        self.env = dict(os.environ if env is None else env)
+        self.workers = {}        # slot -> Popen (None while waiting to restart)
+        self._started = {}       # slot -> monotonic start time
+        self._failures = {}      # slot -> consecutive early exits
+        self._restart_at = {}    # slot -> monotonic time of the next start attempt
+        self._retiring = []      # replaced workers finishing their requests
+        self._stopping = False
+        self._reload = False
+
+    def run(self):
+        """Start the workers and supervise them until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        try:
+            started = [(slot, self._spawn(slot)) for slot in range(self.count)]
+            for slot, ready_fd in started:
+                if not self._wait_ready(self.workers[slot], ready_fd):
+                    print(f"⚠️  Worker {slot} failed to start")
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self._restart_all()
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            self._shutdown()
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def _spawn(self, slot):
+        """Start a worker in a slot; returns the read end of its readiness pipe."""
+        ready_read, ready_write = os.pipe()
+        env = dict(self.env)
+        env.update({
+            LISTEN_FD_ENV: str(self.sock.fileno()),
+            READY_FD_ENV: str(ready_write),
+            WORKER_INDEX_ENV: str(slot),
+        })
+        try:
+            self.workers[slot] = subprocess.Popen(
+                self.command, env=env, pass_fds=(self.sock.fileno(), ready_write))
+        finally:
+            os.close(ready_write)
+        self._started[slot] = time.monotonic()
+        return ready_read
+
+    def _wait_ready(self, process, ready_fd):
+        """Wait until a worker reports it is serving; False if it exited or timed out."""
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        try:
+            while not self._stopping and time.monotonic() < deadline:
+                readable, _, _ = select.select([ready_fd], [], [], 0.2)
+                if readable:
+                    return os.read(ready_fd, 1) == b'1'
+                if process.poll() is not None:
+                    return False
+            return False
+        finally:
+            os.close(ready_fd)
+
+    def _restart_all(self):
+        """Replace every worker, one slot at a time."""
+        print(f"🔄 Restarting {self.count} worker(s)")
+        for slot in range(self.count):
+            if self._stopping:
+                return
+            old = self.workers.get(slot)
+            ready_fd = self._spawn(slot)
+            new = self.workers[slot]
+            if not self._wait_ready(new, ready_fd):
+                print(f"⚠️  Replacement for worker {slot} failed to start; keeping the running workers")
+                self._stop_process(new)
+                self._retiring.append(new)
+                self.workers[slot] = old
+                return
+            if old is not None:
+                self._stop_process(old)
+                self._retiring.append(old)
+
+    def _reap(self):
+        """Restart workers that exited."""
+        self._retiring = [process for process in self._retiring if process.poll() is None]
+        now = time.monotonic()
+        for slot in range(self.count):
+            process = self.workers.get(slot)
+            if process is not None:
+                if process.poll() is None:
+                    continue
+                early = now - self._started[slot] < MIN_UPTIME_SECONDS
+                self._failures[slot] = self._failures.get(slot, 0) + 1 if early else 0
+                delay = min(MAX_RESTART_DELAY, 2 ** self._failures[slot] - 1)
+                print(f"⚠️  Worker {slot} (pid {process.pid}) exited with status {process.returncode}, "
+                      f"restarting in {delay}s")
+                self.workers[slot] = None
+                self._restart_at[slot] = now + delay
+            if now >= self._restart_at.get(slot, 0):
+                os.close(self._spawn(slot))
+
+    def _stop_process(self, process):
+        try:
+            process.send_signal(signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _shutdown(self):
+        """Stop all workers gracefully, killing any still running after the grace period."""
+        processes = [p for p in self.workers.values() if p is not None] + self._retiring
+        for process in processes:
+            self._stop_process(process)
+        deadline = time.monotonic() + SHUTDOWN_GRACE_SECONDS
+        for process in processes:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.sock.close()
@@ -0,0 +1,905 @@
+"""Server-side rendering of session cards to HTML fragments."""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+import urllib.parse
+from collections import OrderedDict
+
+from utils.markdown import add_save_listener
+
+
+# Bump when the rendered output changes, so cached fragments (here and in
+# browsers) keyed by the old card hashes are not reused
+RENDERER_VERSION = 1
+
+# Rendered cards kept in memory, least recently used evicted first
+MAX_CACHED_CARDS = 4096
+
+# Cards are rendered here only when enabled. Otherwise the API sends card
+# hashes and markdown, and browsers render with marked, which stays the
+# reference output until this port is proven to match it.
+SERVER_RENDER = os.environ.get('GROWTHLAB_SERVER_RENDER') == '1'
+
+
+# ---------------------------------------------------------------------------
+# Markdown -> HTML
+#
+# Follows marked's default (GFM) output for the constructs session decks use:
+# headings, paragraphs, emphasis, links and images, lists, rules, raw HTML
+# blocks, code, blockquotes and tables. Like marked, the output is not
+# sanitized; the viewer runs DOMPurify over it.
+# ---------------------------------------------------------------------------
+
+_BLOCK_TAGS = (
+    'address|article|aside|base|basefont|blockquote|body|caption|center|col|colgroup|dd|details|'
+    'dialog|dir|div|dl|dt|fieldset|figcaption|figure|footer|form|frame|frameset|h[1-6]|head|'
+    'header|hr|html|iframe|legend|li|link|main|menu|menuitem|meta|nav|noframes|ol|optgroup|'
+    'option|p|param|search|section|summary|table|tbody|td|tfoot|th|thead|title|tr|track|ul'
+)
+_ATTRIBUTE = r''' +[a-zA-Z:_][\w.:-]*(?: *= *"[^"\n]*"| *= *'[^'\n]*'| *= *[^\s"'=<>`]+)?'''
+
+_BLANK = re.compile(r'^[ \t]*$')
+_FENCE = re.compile(r'^( {0,3})(`{3,}|~{3,})(.*)$')
+_HEADING = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t]*$')
+_HR = re.compile(r'^ {0,3}(?:(?:-[ \t]*){3,}|(?:_[ \t]*){3,}|(?:\*[ \t]*){3,})$')
+_SETEXT = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_BLOCKQUOTE = re.compile(r'^ {0,3}> ?')
+_LIST_ITEM = re.compile(r'^( {0,3})([*+-]|\d{1,9}[.)])(?=[ \t]|$)(.*)$')
+_TASK = re.compile(r'^\[([ xX])\][ \t]+')
+# A list can interrupt a top-level paragraph only with a bullet or "1."
+_PARAGRAPH_LIST = re.compile(r'^ {0,3}(?:[*+-]|1[.)])[ \t]+\S')
+_TABLE_DELIMITER = re.compile(r'^ {0,3}\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$')
+
+_HTML_RAW = re.compile(r'^ {0,3}<(script|pre|style|textarea)(?:[\s>]|$)', re.I)
+_HTML_COMMENT = re.compile(r'^ {0,3}<!--')
+_HTML_PROCESSING = re.compile(r'^ {0,3}<\?')
+_HTML_DECLARATION = re.compile(r'^ {0,3}<![A-Za-z]')
+_HTML_CDATA = re.compile(r'^ {0,3}<!\[CDATA\[')
+_HTML_BLOCK_TAG = re.compile(rf'^ {{0,3}}</?(?:{_BLOCK_TAGS})(?: +|/?>|$)', re.I)
+_HTML_LONE_TAG = re.compile(
+    rf'^ {{0,3}}(?:<(?!(?:script|pre|style|textarea)\b)[a-zA-Z][\w-]*(?:{_ATTRIBUTE})*? */?>'
+    rf'|</(?!(?:script|pre|style|textarea)\b)[a-zA-Z][\w-]*\s*>)[ \t]*$', re.I)
+
+_INLINE_HTML = re.compile(
+    r'<!--[\s\S]*?-->|<\?[\s\S]*?\?>|<![a-zA-Z]+\s[^>]*>|<!\[CDATA\[[\s\S]*?\]\]>'
+    r'|</[a-zA-Z][\w-]*\s*>'
+    r'''|<[a-zA-Z][\w-]*(?:\s+[a-zA-Z:_][\w.:-]*(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*\s*/?>''')
+_AUTOLINK = re.compile(r'<([a-zA-Z][a-zA-Z0-9+.-]{1,31}:[^\s<>]*)>')
+_AUTOLINK_EMAIL = re.compile(r"<([a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?"
+                             r"(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*)>")
+_BARE_URL = re.compile(r'(?:(?:https?|ftp)://|www\.)(?:[a-zA-Z0-9\-]+\.?)+[^\s<]*')
+_BARE_EMAIL = re.compile(r'[a-zA-Z0-9._+-]+@[a-zA-Z0-9-_]+(?:\.[a-zA-Z0-9-_]*[a-zA-Z0-9])+(?![-_])')
+_EMAIL_CHARS = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._+-')
+_ENTITY = re.compile(r'&(?:#\d{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{1,31});')
+
+_ASCII_PUNCTUATION = set('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}
+
+
+def escape(text):
+    """Escape text for HTML the way marked does."""
+    return ''.join(_ESCAPES.get(ch, ch) for ch in text)
+
+
+def _clean_url(href):
+    """Percent-encode a URL like encodeURI (keeping existing escapes)."""
+    return urllib.parse.quote(href, safe="!#$&'()*+,-./:;=?@_~%")
+
+
+def _unescape_backslashes(text):
+    return re.sub(r'\\([!-/:-@\[-`{-~])', r'\1', text)
+
+
+def _is_punctuation(ch):
+    return ch in _ASCII_PUNCTUATION or unicodedata.category(ch)[0] in 'PS'
+
+
+def _html_block_end(line):
+    """
+    Which condition ends an HTML block starting at line.
+
+    Returns:
+        A closing marker the block runs up to (inclusive), '' for blocks that
+        end at a blank line, or None if line doesn't start an HTML block
+    """
+    match = _HTML_RAW.match(line)
+    if match:
+        return f'</{match.group(1).lower()}>'
+    if _HTML_COMMENT.match(line):
+        return '-->'
+    if _HTML_PROCESSING.match(line):
+        return '?>'
+    if _HTML_CDATA.match(line):
+        return ']]>'
+    if _HTML_DECLARATION.match(line):
+        return '>'
+    if _HTML_BLOCK_TAG.match(line) or _HTML_LONE_TAG.match(line):
+        return ''
+    return None
+
+
+def _interrupts_paragraph(line, top):
+    """Whether line starts a new block instead of continuing a paragraph."""
+    if (_HEADING.match(line) or _HR.match(line) or _FENCE.match(line)
+            or _BLOCKQUOTE.match(line)):
+        return True
+    if not top:
+        # Inside list items marked tries every block rule on every line
+        return _LIST_ITEM.match(line) is not None or _html_block_end(line) is not None
+    if _PARAGRAPH_LIST.match(line):
+        return True
+    return _html_block_end(line) not in (None, '') or _HTML_BLOCK_TAG.match(line) is not None
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def _split_row(line):
+    row = line.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|') and not row.endswith('\\|'):
+        row = row[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', row)]
+
+
+class _Block:
+    """A parsed block: kind, data, and whether blank lines followed it."""
+
+    __slots__ = ('kind', 'data', 'gap')
+
+    def __init__(self, kind, data):
+        self.kind = kind
+        self.data = data
+        self.gap = False
+
+
+def _parse_blocks(lines, top=True):
+    """Parse lines into a list of _Block."""
+    blocks = []
+    i, n = 0, len(lines)
+
+    while i < n:
+        line = lines[i]
+
+        if _BLANK.match(line):
+            # Headings, rules, HTML and indented code swallow the blank lines after them
+            if blocks and blocks[-1].kind in ('paragraph', 'fence', 'list', 'blockquote'):
+                blocks[-1].gap = True
+            i += 1
+            continue
+
+        # Indented code (can't interrupt a paragraph, which is handled below)
+        if _indent(line) >= 4:
+            code = []
+            while i < n and (_indent(lines[i]) >= 4 or _BLANK.match(lines[i])):
+                code.append(lines[i][4:])
+                i += 1
+            while code and not code[-1].strip():
+                code.pop()
+            blocks.append(_Block('code', ('', '\n'.join(code))))
+            continue
+
+        match = _FENCE.match(line)
+        if match and not (match.group(2)[0] == '`' and '`' in match.group(3)):
+            fence_indent, fence = len(match.group(1)), match.group(2)
+            closing = re.compile(rf'^ {{0,3}}{re.escape(fence[0])}{{{len(fence)},}}[ \t]*$')
+            code = []
+            i += 1
+            while i < n and not closing.match(lines[i]):
+                code_line = lines[i]
+                code.append(code_line[min(fence_indent, _indent(code_line)):])
+                i += 1
+            i += 1
+            language = match.group(3).strip().split(' ')[0] if match.group(3).strip() else ''
+            blocks.append(_Block('fence', (_unescape_backslashes(language), '\n'.join(code))))
+            continue
+
+        match = _HEADING.match(line)
+        if match:
+            text = (match.group(2) or '').strip()
+            trimmed = text.rstrip('#')
+            if not trimmed or trimmed.endswith((' ', '\t')):
+                text = trimmed.strip()
+            blocks.append(_Block('heading', (len(match.group(1)), text)))
+            i += 1
+            continue
+
+        if _HR.match(line):
+            blocks.append(_Block('hr', None))
+            i += 1
+            continue
+
+        if _BLOCKQUOTE.match(line):
+            quoted = []
+            while i < n and not _BLANK.match(lines[i]):
+                if _BLOCKQUOTE.match(lines[i]):
+                    quoted.append(_BLOCKQUOTE.sub('', lines[i], count=1))
+                elif quoted and quoted[-1].strip() and not _interrupts_paragraph(lines[i], True):
+                    quoted.append(lines[i])  # Lazy continuation
+                else:
+                    break
+                i += 1
+            blocks.append(_Block('blockquote', _parse_blocks(quoted)))
+            continue
+
+        if _LIST_ITEM.match(line):
+            i = _parse_list(lines, i, blocks)
+            continue
+
+        end_marker = _html_block_end(line)
+        if end_marker is not None:
+            html = [line]
+            i += 1
+            if end_marker:
+                # The end marker may be on the opening line itself
+                closed = end_marker in line.lower()[line.find('<') + 2:]
+                while not closed and i < n:
+                    html.append(lines[i])
+                    closed = end_marker in lines[i].lower()
+                    i += 1
+            else:
+                while i < n and not _BLANK.match(lines[i]):
+                    html.append(lines[i])
+                    i += 1
+            blocks.append(_Block('html', '\n'.join(html)))
+            continue
+
+        # Table: header row, delimiter row, body rows
+        if i + 1 < n and '|' in line and _TABLE_DELIMITER.match(lines[i + 1]):
+            header = _split_row(line)
+            aligns = []
+            for cell in _split_row(lines[i + 1]):
+                if cell.startswith(':') and cell.endswith(':'):
+                    aligns.append('center')
+                elif cell.endswith(':'):
+                    aligns.append('right')
+                elif cell.startswith(':'):
+                    aligns.append('left')
+                else:
+                    aligns.append(None)
+            if len(aligns) == len(header):
+                i += 2
+                rows = []
+                while i < n and not _BLANK.match(lines[i]) and not _interrupts_paragraph(lines[i], top):
+                    cells = _split_row(lines[i])
+                    rows.append((cells + [''] * len(header))[:len(header)])
+                    i += 1
+                blocks.append(_Block('table', (header, aligns, rows)))
+                continue
+
+        # Paragraph, possibly turned into a heading by a setext underline
+        para = [line.lstrip(' ')]
+        i += 1
+        heading_level = None
+        while i < n and not _BLANK.match(lines[i]):
+            match = _SETEXT.match(lines[i])
+            if match:
+                heading_level = 1 if match.group(1)[0] == '=' else 2
+                i += 1
+                break
+            if _indent(lines[i]) < 4 and _interrupts_paragraph(lines[i], top):
+                break
+            para.append(lines[i].lstrip(' '))
+            i += 1
+        if heading_level:
+            blocks.append(_Block('heading', (heading_level, '\n'.join(para).strip())))
+        else:
+            blocks.append(_Block('paragraph', '\n'.join(para).rstrip()))
+
+    return blocks
+
+
+def _parse_list(lines, i, blocks):
+    """Parse a list starting at lines[i]; returns the index after it."""
+    n = len(lines)
+    first = _LIST_ITEM.match(lines[i])
+    marker = first.group(2)
+    ordered = marker[0].isdigit()
+    same_list = re.compile(r'^ {0,3}' + (r'\d{1,9}' + re.escape(marker[-1]) if ordered else re.escape(marker))
+                           + r'(?=[ \t]|$)')
+    items = []
+    loose = False
+    ends_with_blank = False
+
+    while i < n:
+        match = _LIST_ITEM.match(lines[i])
+        if not match or not same_list.match(lines[i]) or _HR.match(lines[i]):
+            break
+        if ends_with_blank:
+            loose = True
+
+        rest = match.group(3)
+        content = rest.lstrip(' \t')
+        spaces = len(rest) - len(content)
+        if not content:
+            spaces = 1
+        elif spaces > 4:
+            spaces = 1
+            content = rest[1:]
+        indent = len(match.group(1)) + len(match.group(2)) + spaces
+
+        bound = min(3, indent - 1)
+        ends_item = re.compile(rf'^ {{0,{bound}}}(?:[*+-]|\d{{1,9}}[.)])(?:[ \t]|$)')
+        item_lines = [content]
+        previous = content
+        blank_seen = False
+        i += 1
+        while i < n:
+            next_line = lines[i]
+            if (_indent(next_line) <= bound and (
+                    ends_item.match(next_line) or _HR.match(next_line)
+                    or _FENCE.match(next_line) or _HEADING.match(next_line))):
+                break
+            if _BLANK.match(next_line):
+                item_lines.append('')
+            elif _indent(next_line) >= indent:
+                item_lines.append(next_line[indent:])
+            else:
+                if blank_seen or _indent(previous) >= 4 or _FENCE.match(previous) \
+                        or _HEADING.match(previous) or _HR.match(previous):
+                    break
+                item_lines.append(next_line)  # Lazy paragraph continuation
+            if _BLANK.match(next_line):
+                blank_seen = True
+            previous = item_lines[-1]
+            i += 1
+
+        trailing_blank = False
+        while item_lines and not item_lines[-1].strip():
+            item_lines.pop()
+            trailing_blank = True
+        ends_with_blank = trailing_blank
+
+        task = None
+        match = _TASK.match(item_lines[0]) if item_lines else None
+        if match:
+            task = match.group(1) != ' '
+            item_lines[0] = item_lines[0][match.end():]
+
+        item_blocks = _parse_blocks(item_lines, top=False)
+        if any(block.gap for block in item_blocks[:-1]):
+            loose = True
+        items.append((task, item_blocks))
+
+    start = int(first.group(2)[:-1]) if ordered else None
+    block = _Block('list', (ordered, start, loose, items))
+    block.gap = ends_with_blank
+    blocks.append(block)
+    return i
+
+
+def _render_blocks(blocks, loose=True):
+    out = []
+    for block in blocks:
+        kind, data = block.kind, block.data
+        if kind == 'paragraph':
+            text = render_inline(data)
+            out.append(f'<p>{text}</p>\n' if loose else text)
+        elif kind == 'heading':
+            out.append(f'<h{data[0]}>{render_inline(data[1])}</h{data[0]}>\n')
+        elif kind == 'hr':
+            out.append('<hr>\n')
+        elif kind == 'html':
+            out.append(data + '\n')
+        elif kind in ('code', 'fence'):
+            language, code = data
+            css_class = f' class="language-{escape(language)}"' if language else ''
+            code = escape(code) + ('\n' if code else '')
+            out.append(f'<pre><code{css_class}>{code}</code></pre>\n')
+        elif kind == 'blockquote':
+            out.append(f'<blockquote>\n{_render_blocks(data)}</blockquote>\n')
+        elif kind == 'list':
+            out.append(_render_list(*data))
+        elif kind == 'table':
+            out.append(_render_table(*data))
+    return ''.join(out)
+
+
+def _render_list(ordered, start, loose, items):
+    tag = 'ol' if ordered else 'ul'
+    start_attr = f' start="{start}"' if ordered and start != 1 else ''
+    out = [f'<{tag}{start_attr}>\n']
+    for task, item_blocks in items:
+        body = _render_blocks(item_blocks, loose)
+        if task is not None:
+            checked = 'checked="" ' if task else ''
+            checkbox = f'<input {checked}disabled="" type="checkbox">'
+            if loose and body.startswith('<p>'):
+                body = f'<p>{checkbox} {body[3:]}'
+            else:
+                body = f'{checkbox} {body}'
+        out.append(f'<li>{body}</li>\n')
+    out.append(f'</{tag}>\n')
+    return ''.join(out)
+
+
+def _render_table(header, aligns, rows):
+    def cells(values, tag):
+        parts = []
+        for value, align in zip(values, aligns):
+            align_attr = f' align="{align}"' if align else ''
+            parts.append(f'<{tag}{align_attr}>{render_inline(value)}</{tag}>\n')
+        return '<tr>\n' + ''.join(parts) + '</tr>\n'
+
+    body = ''.join(cells(row, 'td') for row in rows)
+    return ('<table>\n<thead>\n' + cells(header, 'th') + '</thead>\n'
+            + (f'<tbody>{body}</tbody>' if body else '') + '</table>\n')
+
+
+class _Delimiter:
+    """A run of *, _ or ~ that may open or close emphasis."""
+
+    __slots__ = ('char', 'length', 'count', 'can_open', 'can_close', 'opens', 'closes')
+
+    def __init__(self, char, length, can_open, can_close):
+        self.char = char
+        self.length = length
+        self.count = length
+        self.can_open = can_open
+        self.can_close = can_close
+        self.opens = []      # tags opened here, outermost first
+        self.closes = []     # tags closed here, innermost first
+
+    def html(self):
+        return ''.join(self.closes) + self.char * self.count + ''.join(self.opens)
+
+
+def _can_pair(opener, closer):
+    """Whether opener can be closed by closer."""
+    if opener.char != closer.char or not opener.can_open or opener.count == 0:
+        return False
+    if closer.char == '~':
+        return opener.count == closer.count and opener.count <= 2
+    # The "rule of 3": a run that can both open and close doesn't pair with
+    # one whose length would make the total a multiple of 3
+    return not ((opener.can_close or closer.can_open)
+                and (opener.length + closer.length) % 3 == 0
+                and not (opener.length % 3 == 0 and closer.length % 3 == 0))
+
+
+def _process_emphasis(nodes):
+    """Match delimiter runs into <em>/<strong>/<del> (CommonMark's algorithm)."""
+    delimiters = [node for node in nodes if isinstance(node, _Delimiter)]
+    closer_index = 0
+    while closer_index < len(delimiters):
+        closer = delimiters[closer_index]
+        opener_index = -1
+        if closer.can_close and closer.count > 0:
+            opener_index = next((index for index in range(closer_index - 1, -1, -1)
+                                 if _can_pair(delimiters[index], closer)), -1)
+        if opener_index == -1:
+            closer_index += 1
+            continue
+
+        opener = delimiters[opener_index]
+        if closer.char == '~':
+            used, tag = opener.count, 'del'
+        else:
+            used = 2 if opener.count >= 2 and closer.count >= 2 else 1
+            tag = 'strong' if used == 2 else 'em'
+        opener.count -= used
+        closer.count -= used
+        opener.opens.insert(0, f'<{tag}>')
+        closer.closes.append(f'</{tag}>')
+        # Delimiters between the pair are left as literal text
+        for between in delimiters[opener_index + 1:closer_index]:
+            between.can_open = between.can_close = False
+        if closer.count == 0:
+            closer_index += 1
+    return ''.join(node.html() if isinstance(node, _Delimiter) else node for node in nodes)
+
+
+def _find_label_end(text, start):
+    """Index of the ']' closing the '[' at start, or -1."""
+    depth, i, n = 0, start, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '`':
+            run = len(text[i:]) - len(text[i:].lstrip('`'))
+            close = text.find('`' * run, i + run)
+            if close != -1:
+                i = close + run
+                continue
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+
+def _parse_destination(text, i):
+    """Parse '(dest "title")' at text[i] == '('; returns (end, href, title) or None."""
+    n = len(text)
+    i += 1
+    while i < n and text[i] in ' \t\n':
+        i += 1
+    if i < n and text[i] == '<':
+        close = text.find('>', i)
+        if close == -1 or '\n' in text[i:close]:
+            return None
+        href = text[i + 1:close]
+        i = close + 1
+    else:
+        depth, begin = 0, i
+        while i < n:
+            ch = text[i]
+            if ch == '\\' and i + 1 < n:
+                i += 2
+                continue
+            if ch in ' \t\n' or ord(ch) < 0x20:
+                break
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                if depth == 0:
+                    break
+                depth -= 1
+            i += 1
+        href = text[begin:i]
+    while i < n and text[i] in ' \t\n':
+        i += 1
+    title = None
+    if i < n and text[i] in '"\'(':
+        closing = ')' if text[i] == '(' else text[i]
+        j = i + 1
+        while j < n and text[j] != closing:
+            j += 2 if text[j] == '\\' else 1
+        if j >= n:
+            return None
+        title = text[i + 1:j]
+        i = j + 1
+        while i < n and text[i] in ' \t\n':
+            i += 1
+    if i >= n or text[i] != ')':
+        return None
+    return i + 1, _unescape_backslashes(href), _unescape_backslashes(title) if title is not None else None
+
+
+def _trim_bare_url(url):
+    """Drop trailing punctuation from a bare URL, as GFM autolinking does."""
+    while url:
+        if url[-1] in '?!.,:;*_\'"~':
+            url = url[:-1]
+        elif url[-1] == ')' and url.count(')') > url.count('('):
+            url = url[:-1]
+        elif url.endswith(';') or re.search(r'&[a-zA-Z0-9]+;$', url):
+            url = re.sub(r'&[a-zA-Z0-9]+;$', '', url)
+        else:
+            break
+    return url
+
+
+def render_inline(text, in_link=False):
+    """Render inline markdown (emphasis, code, links, images, raw HTML)."""
+    nodes = []
+    buf = []
+    i, n = 0, len(text)
+
+    def flush():
+        if buf:
+            nodes.append(''.join(buf))
+            buf.clear()
+
+    while i < n:
+        ch = text[i]
+
+        if ch == '\\' and i + 1 < n:
+            if text[i + 1] in _ASCII_PUNCTUATION:
+                buf.append(escape(text[i + 1]))
+                i += 2
+                continue
+            if text[i + 1] == '\n':
+                buf.append('<br>')
+                i += 2
+                continue
+
+        if ch == '`':
+            run = len(text[i:]) - len(text[i:].lstrip('`'))
+            match = re.compile(rf'(?<!`)`{{{run}}}(?!`)').search(text, i + run)
+            if match:
+                code = text[i + run:match.start()].replace('\n', ' ')
+                if code.startswith(' ') and code.endswith(' ') and code.strip(' '):
+                    code = code[1:-1]
+                buf.append(f'<code>{escape(code)}</code>')
+                i = match.end()
+            else:
+                buf.append('`' * run)
+                i += run
+            continue
+
+        if ch == '<':
+            match = _AUTOLINK.match(text, i)
+            if match and not in_link:
+                url = match.group(1)
+                buf.append(f'<a href="{_clean_url(url)}">{escape(url)}</a>')
+                i = match.end()
+                continue
+            match = _AUTOLINK_EMAIL.match(text, i)
+            if match and not in_link:
+                email = match.group(1)
+                buf.append(f'<a href="mailto:{escape(email)}">{escape(email)}</a>')
+                i = match.end()
+                continue
+            match = _INLINE_HTML.match(text, i)
+            if match:
+                buf.append(match.group(0))
+                i = match.end()
+                continue
+
+        if ch == '[' or (ch == '!' and text.startswith('[', i + 1)):
+            is_image = ch == '!'
+            label_start = i + 1 if is_image else i
+            label_end = _find_label_end(text, label_start)
+            if label_end != -1 and text.startswith('(', label_end + 1) and (is_image or not in_link):
+                parsed = _parse_destination(text, label_end + 1)
+                if parsed:
+                    end, href, title = parsed
+                    label = text[label_start + 1:label_end]
+                    title_attr = f' title="{escape(title)}"' if title is not None else ''
+                    if is_image:
+                        buf.append(f'<img src="{_clean_url(href)}" alt="{escape(label)}"{title_attr}>')
+                    else:
+                        buf.append(f'<a href="{_clean_url(href)}"{title_attr}>'
+                                   f'{render_inline(label, in_link=True)}</a>')
+                    i = end
+                    continue
+
+        if ch == '&':
+            match = _ENTITY.match(text, i)
+            if match:
+                buf.append(match.group(0))
+                i = match.end()
+                continue
+
+        if ch in '*_~':
+            run = len(text[i:]) - len(text[i:].lstrip(ch))
+            before = text[i - 1] if i > 0 else ' '
+            after = text[i + run] if i + run < n else ' '
+            left = not after.isspace() and (
+                not _is_punctuation(after) or before.isspace() or _is_punctuation(before))
+            right = not before.isspace() and (
+                not _is_punctuation(before) or after.isspace() or _is_punctuation(after))
+            if ch == '_':
+                can_open = left and (not right or _is_punctuation(before))
+                can_close = right and (not left or _is_punctuation(after))
+            else:
+                can_open, can_close = left, right
+            if ch == '~' and run > 2:
+                can_open = can_close = False
+            flush()
+            nodes.append(_Delimiter(ch, run, can_open, can_close))
+            i += run
+            continue
+
+        if ch == '\n':
+            trailing = 0
+            while buf and buf[-1] == ' ':
+                buf.pop()
+                trailing += 1
+            buf.append('<br>' if trailing >= 2 else '\n')
+            i += 1
+            continue
+
+        if not in_link and ch in 'hfw' and (text.startswith(('http://', 'https://', 'ftp://', 'www.'), i)):
+            match = _BARE_URL.match(text, i)
+            if match:
+                url = _trim_bare_url(match.group(0))
+                if url and (not url.startswith('www.') or '.' in url[4:]):
+                    href = ('http://' + url) if url.startswith('www.') else url
+                    buf.append(f'<a href="{_clean_url(href)}">{escape(url)}</a>')
+                    i += len(url)
+                    continue
+
+        if (not in_link and ch in _EMAIL_CHARS and (i == 0 or text[i - 1] not in _EMAIL_CHARS)
+                and '@' in text[i:i + 254]):
+            match = _BARE_EMAIL.match(text, i)
+            if match:
+                email = match.group(0)
+                buf.append(f'<a href="mailto:{escape(email)}">{escape(email)}</a>')
+                i = match.end()
+                continue
+
+        buf.append(_ESCAPES.get(ch, ch))
+        i += 1
+
+    flush()
+    return _process_emphasis(nodes)
+
+
+def render_markdown(markdown):
+    """
+    Render markdown to HTML, matching marked.parse() for session content.
+
+    Args:
+        markdown: Markdown text
+
+    Returns:
+        HTML string (unsanitized)
+    """
+    lines = markdown.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    lines = [re.sub(r'^\t+', lambda m: '    ' * len(m.group(0)), line) for line in lines]
+    return _render_blocks(_parse_blocks(lines))
+
+
+# ---------------------------------------------------------------------------
+# Card rendering: the viewer's parseMarkdown() preprocessing
+# ---------------------------------------------------------------------------
+
+_VIDEO = re.compile(r'!video\((.*?)\)')
+_ROW = re.compile(r'<!--\s*row\s*-->\s*([\s\S]*?)\s*<!--\s*col\s*-->\s*([\s\S]*?)\s*<!--\s*/row\s*-->')
+_CALLOUT = re.compile(r'<div class="callout">([\s\S]*?)</div>')
+_ALIGN = re.compile(r'<div style="text-align:\s*(left|center|right)">([\s\S]*?)</div>')
+
+_VIDEO_EMBED = (
+    '<div class="video-container"><iframe src="{}" frameborder="0" '
+    'allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" '
+    'allowfullscreen></iframe></div>'
+)
+
+
+def _is_valid_video_url(url):
+    try:
+        parsed = urllib.parse.urlsplit(url)
+    except ValueError:
+        return False
+    return parsed.scheme in ('http', 'https') and bool(parsed.netloc) and not any(c.isspace() for c in url)
+
+
+def _video(match):
+    url = match.group(1)
+    if not _is_valid_video_url(url):
+        return '[Invalid video URL]'
+    return _VIDEO_EMBED.format(url)
+
+
+def render_card(markdown):
+    """
+    Render one card the way the viewer's parseMarkdown() does before sanitizing.
+
+    Expands !video(url) embeds, <!-- row --> columns, callouts and
+    text-align blocks, then renders the result as markdown.
+
+    Args:
+        markdown: Raw markdown of one card
+
+    Returns:
+        HTML fragment (unsanitized)
+    """
+    processed = _VIDEO.sub(_video, markdown)
+    processed = _ROW.sub(
+        lambda m: (f'<div class="row-container"><div class="row-col">{render_markdown(m.group(1).strip())}</div>'
+                   f'<div class="row-col">{render_markdown(m.group(2).strip())}</div></div>'),
+        processed)
+    processed = _CALLOUT.sub(
+        lambda m: f'<div class="callout">{render_markdown(m.group(1).strip())}</div>', processed)
+    processed = _ALIGN.sub(
+        lambda m: f'<div style="text-align: {m.group(1)}">{render_markdown(m.group(2).strip())}</div>',
+        processed)
+    return render_markdown(processed)
+
+
+def card_hash(markdown):
+    """Content hash identifying a card's rendered HTML."""
+    digest = hashlib.sha256(f'{RENDERER_VERSION}\n{markdown}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class RenderCache:
+    """
+    Rendered card HTML keyed by card hash, shared by all sessions.
+
+    Saving a session renders its new cards right away and evicts the
+    fragments of cards the edit replaced; sessions changed outside the
+    server are picked up (and rendered) on the next request. When not
+    enabled, payloads carry only hashes and markdown.
+    """
+
+    def __init__(self, max_cards=MAX_CACHED_CARDS, enabled=SERVER_RENDER):
+        self.max_cards = max_cards
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._html = OrderedDict()   # card hash -> HTML
+        self._sessions = {}          # session name -> (model, card hashes, full payload or None)
+
+    def render(self, markdown, digest=None):
+        """
+        Get the HTML of one card, rendering it on a miss.
+
+        Returns:
+            Tuple of (card hash, HTML)
+        """
+        digest = digest or card_hash(markdown)
+        with self._lock:
+            html = self._html.get(digest)
+            if html is not None:
+                self._html.move_to_end(digest)
+                return digest, html
+
+        html = render_card(markdown)
+        with self._lock:
+            self._html[digest] = html
+            while len(self._html) > self.max_cards:
+                self._html.popitem(last=False)
+        return digest, html
+
+    def _hashes(self, model):
+        """Card hashes of a model, computed once per model."""
+        with self._lock:
+            cached = self._sessions.get(model.session_file)
+            if cached is not None and cached[0] is model:
+                return cached[1]
+            previous = cached[1] if cached is not None else ()
+
+        hashes = tuple(card_hash(card) for card in model.cards)
+        with self._lock:
+            self._sessions[model.session_file] = (model, hashes, None)
+            # Drop fragments of cards this session no longer has (unless another session shares them)
+            still_used = {h for _, other, _ in self._sessions.values() for h in other}
+            for digest in set(previous) - still_used:
+                self._html.pop(digest, None)
+        return hashes
+
+    def session_saved(self, model):
+        """Save listener: render the saved session's changed cards ahead of the next request."""
+        hashes = self._hashes(model)
+        if not self.enabled:
+            return
+        for digest, card in zip(hashes, model.cards):
+            self.render(card, digest)
+
+    def session_payload(self, model, known=()):
+        """
+        Serialize a session's rendered cards.
+
+        Args:
+            model: SessionModel of the session
+            known: Card hashes the client already has; those cards are sent
+                as just their hash (and other cards carry HTML only when
+                server rendering is enabled)
+
+        Returns:
+            Tuple of (JSON body bytes, ETag)
+        """
+        hashes = self._hashes(model)
+        known = set(known) & set(hashes)
+        if not known:
+            with self._lock:
+                cached = self._sessions.get(model.session_file)
+                if cached is not None and cached[0] is model and cached[2] is not None:
+                    return cached[2]
+
+        cards = []
+        for digest, card in zip(hashes, model.cards):
+            if digest in known:
+                cards.append({'hash': digest})
+                continue
+            entry = {'hash': digest, 'markdown': card}
+            if self.enabled:
+                entry['html'] = self.render(card, digest)[1]
+            cards.append(entry)
+        body = json.dumps({'session': model.session_file, 'renderer': RENDERER_VERSION,
+                           'cards': cards}).encode('utf-8')
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+        if not known:
+            with self._lock:
+                cached = self._sessions.get(model.session_file)
+                if cached is not None and cached[0] is model:
+                    self._sessions[model.session_file] = (model, hashes, (body, etag))
+        return body, etag
+
+
+render_cache = RenderCache()
+add_save_listener(render_cache.session_saved)
@@ -0,0 +1,265 @@
+"""HTTP server classes for concurrent request handling."""
+
+import selectors
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Listen backlog; socketserver's default of 5 drops connection bursts from
+# browsers and load tests, which then wait out a 1s SYN retransmit
+REQUEST_QUEUE_SIZE = 128
+
+# How long a PooledServer keeps an idle keep-alive connection parked (on the
+# idle selector, not a worker thread) waiting for its next request
+IDLE_TIMEOUT = 60
+
+
+class RequestBody:
+    """
+    Reader over a request body that tracks how much of it is still unread.
+
+    On a persistent connection any unread body bytes would be parsed as the
+    next request, so the handler closes the connection when a response is
+    sent before the body was consumed (e.g. an early 413).
+    """
+
+    def __init__(self, rfile, length):
+        self.rfile = rfile
+        self.remaining = max(length, 0)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return b''
+        data = self.rfile.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+class ThreadedServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """TCP server that handles each connection on its own thread."""
+
+    allow_reuse_address = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+    daemon_threads = True
+
+
+class PooledServer(socketserver.TCPServer):
+    """
+    TCP server that handles connections on a bounded pool of worker threads.
+
+    Connections beyond the pool size wait in the executor queue instead of
+    spawning unbounded threads during an upload burst. Between requests a
+    keep-alive connection is handed back to a single selector thread (the
+    handler sets resume_state and returns), so an idle browser costs a file
+    descriptor rather than a worker; it is queued for a worker again when
+    its next request arrives, and closed after IDLE_TIMEOUT.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+    idle_timeout = IDLE_TIMEOUT
+
+    def __init__(self, server_address, handler_class, max_workers, bind_and_activate=True):
+        super().__init__(server_address, handler_class, bind_and_activate)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='growthlab')
+        self._idle_lock = threading.Lock()
+        self._idle = {}          # fd -> (socket, client address, state, deadline)
+        self._parking = []       # idle connections not yet registered with the selector
+        self._resumed = {}       # socket -> state handed to the connection's next handler
+        self._closing = False
+        self._selector = None
+        self._wakeup = None      # socket pair that interrupts select()
+        self._idle_thread = None
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker thread."""
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        state = None
+        try:
+            # finish_request(), keeping the handler to see whether it went idle
+            handler = self.RequestHandlerClass(request, client_address, self)
+            state = getattr(handler, 'resume_state', None)
+        except Exception:
+            self.handle_error(request, client_address)
+        if state is None or not self._park(request, client_address, state):
+            self.shutdown_request(request)
+
+    def can_park(self):
+        """Whether handlers may hand idle connections back (False once draining)."""
+        return not self._closing
+
+    def resume(self, request):
+        """State the previous handler left for this connection, or None for a new one."""
+        with self._idle_lock:
+            return self._resumed.pop(request, None)
+
+    def _park(self, request, client_address, state):
+        """Hold an idle connection on the selector thread until its next request."""
+        if not self.can_park():
+            return False
+        self._start_idle_thread()
+        with self._idle_lock:
+            if self._closing:
+                return False
+            self._parking.append((request, client_address, state, time.monotonic() + self.idle_timeout))
+        self._wake()
+        return True
+
+    def _start_idle_thread(self):
+        with self._idle_lock:
+            if self._idle_thread is not None:
+                return
+            self._selector = selectors.DefaultSelector()
+            self._wakeup = socket.socketpair()
+            self._wakeup[0].setblocking(False)
+            self._wakeup[1].setblocking(False)
+            self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+            self._idle_thread = threading.Thread(target=self._run_idle, name='growthlab-idle', daemon=True)
+            self._idle_thread.start()
+
+    def _wake(self):
+        try:
+            self._wakeup[1].send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Already pending, or not started
+
+    def _run_idle(self):
+        while True:
+            with self._idle_lock:
+                if self._closing:
+                    break
+                for conn in self._parking:
+                    self._idle[conn[0].fileno()] = conn
+                    self._selector.register(conn[0], selectors.EVENT_READ)
+                self._parking.clear()
+                deadlines = [conn[3] for conn in self._idle.values()]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            ready = []
+            for key, mask in self._selector.select(timeout):
+                if key.fileobj is self._wakeup[0]:
+                    try:
+                        while self._wakeup[0].recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                ready.append(key.fd)
+
+            now = time.monotonic()
+            with self._idle_lock:
+                expired = [fd for fd, conn in self._idle.items() if conn[3] <= now and fd not in ready]
+                ready = [self._idle.pop(fd) for fd in ready]
+                expired = [self._idle.pop(fd) for fd in expired]
+                for request, client_address, state, deadline in ready:
+                    self._resumed[request] = state
+            for request, *_ in ready + expired:
+                self._selector.unregister(request)
+
+            for request, client_address, state, deadline in ready:
+                try:
+                    self.executor.submit(self._process_request_worker, request, client_address)
+                except RuntimeError:
+                    # Executor already shut down
+                    self.resume(request)
+                    self.shutdown_request(request)
+            for request, *_ in expired:
+                self.shutdown_request(request)
+
+    def _close_idle(self):
+        """Stop parking connections and close the ones waiting for a request."""
+        with self._idle_lock:
+            self._closing = True
+            thread = self._idle_thread
+        if thread is not None:
+            self._wake()
+            thread.join()
+            self._selector.close()
+            for sock in self._wakeup:
+                sock.close()
+        with self._idle_lock:
+            idle = list(self._idle.values()) + self._parking
+            self._idle.clear()
+            self._parking.clear()
+        for request, *_ in idle:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Finish every connection already accepted (call after shutdown())."""
+        self._close_idle()
+        self.executor.shutdown(wait=True)
+
+    def server_close(self):
+        super().server_close()
+        self._close_idle()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleThreadedServer(socketserver.TCPServer):
+    """
+    TCP server that handles one connection at a time.
+
+    Connections are closed after each response: an idle keep-alive
+    connection would stall every other client until it timed out.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+    persistent_connections = False
+
+
+def create_server(port, handler_class, threads, listen_socket=None):
+    """
+    Create the HTTP server for the requested concurrency mode.
+
+    Args:
+        port: Port to listen on
+        handler_class: Request handler class
+        threads: Worker pool size; 0 for a thread per connection,
+            1 for single-threaded serving
+        listen_socket: Already listening socket to serve (shared by
+            --workers processes) instead of binding the port
+
+    Returns:
+        A bound socketserver instance
+    """
+    address = ("", port)
+    bind = listen_socket is None
+    if threads == 0:
+        server = ThreadedServer(address, handler_class, bind)
+    elif threads == 1:
+        server = SingleThreadedServer(address, handler_class, bind)
+    else:
+        server = PooledServer(address, handler_class, threads, bind)
+
+    if listen_socket is not None:
+        server.socket.close()
+        server.socket = listen_socket
+        server.server_address = listen_socket.getsockname()
+        # Other processes accept from the same socket: a wakeup may find the
+        # connection already taken, so accept() must not block
+        listen_socket.setblocking(False)
+    return server
+
+
+def drain(server):
+    """Let connections a stopped server already accepted finish, where it tracks them."""
+    if isinstance(server, PooledServer):
+        server.drain()
+
+
+def describe_mode(threads):
+    """Human-readable description of a concurrency mode."""
+    if threads == 0:
+        return "thread per connection"
+    if threads == 1:
+        return "single-threaded"
+    return f"{threads} worker threads"
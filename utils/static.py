@@ -0,0 +1,366 @@
+"""Static file delivery helpers: caching, conditional and range requests, compression."""
+
+import datetime
+import email.utils
+import gzip
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from utils.hash_index import hash_index, entry_filename
+from utils.variants import VARIANT_SUFFIX_PATTERN
+
+
+# Uploaded media never changes once written (new uploads get new names)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Content that is edited live must be revalidated on every use
+REVALIDATE = 'no-cache'
+
+# Code and styles change only on deploys; allow a short reuse window
+SHORT_TTL = 'public, max-age=60, must-revalidate'
+
+# Icons, fonts and other rarely changing assets
+LONG_TTL = 'public, max-age=86400'
+
+MEDIA_EXTENSIONS = {'.webp', '.png', '.jpg', '.jpeg', '.gif'}
+
+# Text formats worth compressing; images and fonts in binary formats are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.md', '.js', '.css', '.html', '.json', '.svg', '.txt'}
+
+# Files smaller than this gain nothing from compression
+MIN_COMPRESS_SIZE = 1024
+
+# Upper bound on memory held by compressed variants
+COMPRESSED_CACHE_BYTES = 32 * 1024 * 1024
+
+# Requests asking for more ranges than this get the whole file instead
+MAX_RANGES = 16
+
+# Bounded cache of computed content hashes: (path, size, mtime_ns) -> etag
+_ETAG_CACHE_SIZE = 4096
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def is_hidden(rel_path):
+    """
+    Whether a path under public/ names a dotfile or lies in a dot directory.
+
+    Hash manifests, the blob store and in-progress atomic writes are
+    server state, not site content, so they are never served.
+    """
+    return any(part.startswith('.') and part not in ('.', '..') for part in Path(rel_path).parts)
+
+
+def cache_control(rel_path):
+    """
+    Choose the Cache-Control policy for a file under public/.
+
+    Args:
+        rel_path: Path relative to the served root (e.g. 'media/session-01/x.webp')
+
+    Returns:
+        Cache-Control header value
+    """
+    path = Path(rel_path)
+    suffix = path.suffix.lower()
+    in_media = bool(path.parts) and path.parts[0] == 'media'
+    if in_media and suffix in MEDIA_EXTENSIONS:
+        return IMMUTABLE
+    if suffix in {'.md', '.html'} or (in_media and suffix == '.json'):
+        return REVALIDATE
+    if suffix in {'.js', '.css'}:
+        return SHORT_TTL
+    return LONG_TTL
+
+
+def _manifest_etag(rel_path):
+    """ETag derived from the upload's SHA-256 in the hash manifest, if known."""
+    path = Path(rel_path)
+    if len(path.parts) != 3 or path.parts[0] != 'media':
+        return None
+
+    stem, suffix = path.stem, ''
+    match = VARIANT_SUFFIX_PATTERN.search(stem)
+    if match:
+        stem, suffix = stem[:match.start()], match.group(0)
+    main_name = f'{stem}{path.suffix}'
+
+    for file_hash, entry in hash_index.entries(path.parent).items():
+        if entry_filename(entry) == main_name:
+            return f'"{file_hash[:32]}{suffix}"'
+    return None
+
+
+def compute_etag(rel_path, file_path, stat_result):
+    """
+    Get a strong ETag for a file.
+
+    Media reuses the source hash recorded at upload time; anything else is
+    hashed once and cached until its size or mtime changes.
+
+    Args:
+        rel_path: Path relative to the served root
+        file_path: Filesystem path to the file
+        stat_result: os.stat_result of the open file
+
+    Returns:
+        Quoted ETag string
+    """
+    key = (str(file_path), stat_result.st_size, stat_result.st_mtime_ns)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+    if etag is not None:
+        return etag
+
+    etag = _manifest_etag(rel_path)
+    if etag is None:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                sha256.update(chunk)
+        etag = f'"{sha256.hexdigest()[:32]}"'
+
+    with _etag_lock:
+        if len(_etag_cache) >= _ETAG_CACHE_SIZE:
+            _etag_cache.clear()
+        _etag_cache[key] = etag
+    return etag
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches the given ETag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in candidates or f'W/{etag}' in candidates
+
+
+def not_modified_since(if_modified_since, mtime):
+    """Whether an If-Modified-Since header is at or after the file's mtime."""
+    if if_modified_since is None:
+        return False
+    try:
+        ims = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, IndexError, OverflowError, ValueError):
+        return False
+    if ims.tzinfo is None:
+        ims = ims.replace(tzinfo=datetime.timezone.utc)
+    last_modified = datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc).replace(microsecond=0)
+    return last_modified <= ims
+
+
+def parse_range(range_header, size):
+    """
+    Parse a Range header against a file size.
+
+    Args:
+        range_header: Value such as 'bytes=0-499, -500'
+        size: Size of the file in bytes
+
+    Returns:
+        List of inclusive (start, end) tuples; an empty list if no range is
+        satisfiable (416); None if the header should be ignored (send 200)
+    """
+    if not range_header:
+        return None
+    unit, _, specs = range_header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        start, sep, end = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if start.strip():
+                start = int(start)
+                if end.strip():
+                    end = int(end)
+                    if start > end:
+                        return None
+                else:
+                    end = size - 1
+            else:
+                suffix = int(end)
+                start, end = max(size - suffix, 0), size - 1
+                if suffix == 0:
+                    continue
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def if_range_allows(if_range, etag, last_modified):
+    """
+    Whether an If-Range precondition lets a Range request proceed.
+
+    Args:
+        if_range: If-Range header value (an ETag or HTTP-date), or None
+        etag: Current strong ETag
+        last_modified: Current Last-Modified header value
+    """
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def byteranges_body(ranges, size, content_type):
+    """
+    Lay out a multipart/byteranges response body.
+
+    Returns:
+        Tuple of (boundary, segments, trailer, content_length) where segments
+        is a list of (part header bytes, start, length) to send in order
+    """
+    boundary = uuid.uuid4().hex
+    segments = []
+    length = 0
+    for start, end in ranges:
+        header = (f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+                  f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('latin-1')
+        segments.append((header, start, end - start + 1))
+        length += len(header) + end - start + 1
+    trailer = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+    return boundary, segments, trailer, length + len(trailer)
+
+
+def is_compressible(file_path, size):
+    """Whether a file should be served compressed when the client allows it."""
+    return size >= MIN_COMPRESS_SIZE and Path(file_path).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the best supported content coding from an Accept-Encoding header.
+
+    Returns:
+        'br', 'gzip' or None for identity
+    """
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress_body(data, encoding):
+    """Compress a generated response body ('br' or 'gzip'), favouring speed over ratio."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def precompress(data, encoding):
+    """Compress at the highest level, for output built once and served many times."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress_encodings():
+    """Encodings precompress() supports here ('br' needs the brotli package)."""
+    return ['gzip'] + (['br'] if brotli is not None else [])
+
+
+def encoded_etag(etag, encoding):
+    """ETag for a compressed representation (distinct from the identity one)."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+class CompressedCache:
+    """
+    LRU cache of compressed file contents, invalidated by size and mtime.
+
+    Entries are built lazily on first request (or by warm()), so an edit
+    through write_session is picked up on the next request for that file.
+    """
+
+    def __init__(self, max_bytes=COMPRESSED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()    # (path, encoding) -> (size, mtime_ns, data)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, file_path, stat_result, encoding):
+        """
+        Get the compressed contents of a file.
+
+        Args:
+            file_path: Filesystem path to the file
+            stat_result: os.stat_result of the file
+            encoding: 'br' or 'gzip'
+
+        Returns:
+            Compressed bytes
+        """
+        key = (os.path.abspath(file_path), encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        with open(file_path, 'rb') as f:
+            data = precompress(f.read(), encoding)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._total -= len(old[2])
+            self._entries[key] = (stat_result.st_size, stat_result.st_mtime_ns, data)
+            self._total += len(data)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= len(evicted[2])
+        return data
+
+    def warm(self, root):
+        """Precompress every compressible file under root (run at startup)."""
+        encodings = precompress_encodings()
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    stat_result = os.stat(file_path)
+                    if is_compressible(file_path, stat_result.st_size):
+                        for encoding in encodings:
+                            self.get(file_path, stat_result, encoding)
+                except OSError:
+                    pass
+
+
+compressed_cache = CompressedCache()
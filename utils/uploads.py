@@ -0,0 +1,246 @@
+"""Resumable uploads: files sent as a series of chunks that survive dropped connections."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: chunks are serialized per process only
+
+
+# Partial uploads are written here (outside the served tree)
+UPLOAD_DIR = Path(tempfile.gettempdir()) / 'growthlab-uploads'
+
+# Largest file accepted through the resumable protocol
+MAX_RESUMABLE_BYTES = 200 * 1024 * 1024
+
+# Chunk size suggested to clients, and the largest single chunk accepted
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Uploads with no chunk received for this long are discarded
+UPLOAD_TTL_SECONDS = 24 * 60 * 60
+
+# Request bodies are copied to disk in pieces of this size
+_COPY_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A request the upload can't accept; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ResumableUpload:
+    """One upload in progress: its target size, bytes received and running hash."""
+
+    def __init__(self, upload_id, filename, size, session_id, path):
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.session_id = session_id
+        self.path = path
+        self.offset = 0
+        self.hasher = hashlib.sha256()
+        self.hashed = 0          # Bytes of the part file fed to hasher
+        self.lock = threading.Lock()
+
+    def progress(self):
+        return {'uploadId': self.id, 'offset': self.offset, 'size': self.size,
+                'complete': self.offset == self.size}
+
+    def catch_up(self):
+        """Hash bytes appended by another process since this one last saw the file."""
+        if self.hashed == self.offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.hashed)
+            while self.hashed < self.offset:
+                data = f.read(min(_COPY_SIZE, self.offset - self.hashed))
+                if not data:
+                    break
+                self.hasher.update(data)
+                self.hashed += len(data)
+
+
+class UploadStore:
+    """
+    Uploads in progress, kept on disk as a part file plus a JSON sidecar.
+
+    Chunks are appended to the part file and hashed as they arrive, so
+    finishing an upload needs no second pass over the file. A chunk must
+    start at the current offset (the part file's size); when a connection
+    drops mid-chunk, the bytes that did arrive are kept and the client
+    resumes from the offset reported by progress().
+
+    Because the state is on disk, any worker process can take the next
+    chunk and uploads survive a server restart. Chunks of one upload are
+    serialized with a file lock on the part file.
+    """
+
+    def __init__(self, upload_dir=UPLOAD_DIR):
+        self.upload_dir = Path(upload_dir)
+        self._lock = threading.Lock()
+        self._uploads = {}
+
+    def _meta_path(self, upload_id):
+        return self.upload_dir / f'{upload_id}.json'
+
+    def create(self, filename, size, session_id):
+        """
+        Start an upload.
+
+        Returns:
+            The new ResumableUpload
+        """
+        if size > MAX_RESUMABLE_BYTES:
+            raise UploadError(f'File too large (max {MAX_RESUMABLE_BYTES // (1024 * 1024)}MB)', 413)
+        self.expire()
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        path = self.upload_dir / f'{upload_id}{Path(filename).suffix.lower()}'
+        path.touch()
+        meta = {'filename': filename, 'size': size, 'sessionId': session_id, 'path': path.name}
+        fd, temp_path = tempfile.mkstemp(dir=self.upload_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._meta_path(upload_id))
+
+        upload = ResumableUpload(upload_id, filename, size, session_id, path)
+        with self._lock:
+            self._uploads[upload_id] = upload
+        return upload
+
+    def get(self, upload_id):
+        """Get an upload in progress, or raise UploadError (404)."""
+        meta_path = self._meta_path(upload_id) if upload_id.isalnum() else None
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if meta_path is None or not meta_path.exists():
+                # Finished or expired, possibly by another process
+                self._uploads.pop(upload_id, None)
+                raise UploadError('Upload not found', 404)
+            if upload is None:
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    raise UploadError('Upload not found', 404)
+                upload = ResumableUpload(upload_id, meta['filename'], meta['size'], meta['sessionId'],
+                                         self.upload_dir / meta['path'])
+                self._uploads[upload_id] = upload
+        try:
+            upload.offset = upload.path.stat().st_size
+        except FileNotFoundError:
+            raise UploadError('Upload not found', 404)
+        return upload
+
+    def write_chunk(self, upload_id, offset, stream, length):
+        """
+        Append a chunk read from stream.
+
+        Args:
+            offset: Where the chunk starts; must equal the bytes received so far
+            stream: File-like object to read the chunk from
+            length: Chunk length in bytes
+
+        Returns:
+            The upload, with offset advanced by the bytes received
+        """
+        upload = self.get(upload_id)
+        if length > MAX_CHUNK_BYTES:
+            raise UploadError(f'Chunk too large (max {MAX_CHUNK_BYTES // (1024 * 1024)}MB)', 413)
+        if not upload.lock.acquire(blocking=False):
+            raise UploadError('Another chunk of this upload is in progress', 409, upload.offset)
+        try:
+            with open(upload.path, 'ab') as f:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        raise UploadError('Another chunk of this upload is in progress', 409, upload.offset)
+                upload.offset = os.fstat(f.fileno()).st_size
+                if offset != upload.offset:
+                    raise UploadError('Offset does not match bytes received', 409, upload.offset)
+                if offset + length > upload.size:
+                    raise UploadError('Chunk extends past the declared size', 400, upload.offset)
+                upload.catch_up()
+
+                remaining = length
+                while remaining > 0:
+                    data = stream.read(min(_COPY_SIZE, remaining))
+                    if not data:
+                        break  # Connection dropped; keep what arrived
+                    f.write(data)
+                    upload.hasher.update(data)
+                    upload.offset += len(data)
+                    upload.hashed = upload.offset
+                    remaining -= len(data)
+            if remaining > 0:
+                raise UploadError('Chunk truncated', 400, upload.offset)
+            return upload
+        finally:
+            upload.lock.release()
+
+    def finish(self, upload_id, expected_sha256=None):
+        """
+        Complete an upload and hand its file to the caller.
+
+        Returns:
+            Tuple of (upload, sha256 hex digest); the caller now owns upload.path
+        """
+        upload = self.get(upload_id)
+        with upload.lock:
+            if upload.offset != upload.size:
+                raise UploadError('Upload incomplete', 409, upload.offset)
+            try:
+                # Whoever removes the sidecar owns the file
+                self._meta_path(upload_id).unlink()
+            except FileNotFoundError:
+                raise UploadError('Upload not found', 404)
+            with self._lock:
+                self._uploads.pop(upload_id, None)
+            upload.catch_up()
+            file_hash = upload.hasher.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != file_hash:
+            upload.path.unlink(missing_ok=True)
+            raise UploadError('Checksum mismatch; upload discarded', 422)
+        return upload, file_hash
+
+    def expire(self, ttl=UPLOAD_TTL_SECONDS):
+        """
+        Discard uploads idle for longer than ttl seconds.
+
+        Returns:
+            Number of uploads discarded
+        """
+        cutoff = time.time() - ttl
+        removed = 0
+        for meta_path in self.upload_dir.glob('*.json'):
+            part_paths = [p for p in self.upload_dir.glob(f'{meta_path.stem}*') if p != meta_path]
+            try:
+                updated = max(p.stat().st_mtime for p in part_paths + [meta_path])
+            except FileNotFoundError:
+                continue
+            if updated >= cutoff:
+                continue
+            meta_path.unlink(missing_ok=True)
+            for part_path in part_paths:
+                part_path.unlink(missing_ok=True)
+            with self._lock:
+                self._uploads.pop(meta_path.stem, None)
+            removed += 1
+        return removed
+
+
+upload_store = UploadStore()
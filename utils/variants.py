@@ -0,0 +1,24 @@
+"""Naming scheme for responsive image variants."""
+
+import re
+from pathlib import Path
+
+
+VARIANT_SUFFIX_PATTERN = re.compile(r'-(\d+w|lqip)$')
+
+
+def variant_path(output_path, width):
+    """Path of the responsive variant of an image at the given width."""
+    output_path = Path(output_path)
+    return output_path.with_name(f'{output_path.stem}-{width}w.webp')
+
+
+def placeholder_path(output_path):
+    """Path of the blurred placeholder of an image."""
+    output_path = Path(output_path)
+    return output_path.with_name(f'{output_path.stem}-lqip.webp')
+
+
+def is_variant_file(filename):
+    """Whether a filename is a generated variant or placeholder rather than a main image."""
+    return bool(VARIANT_SUFFIX_PATTERN.search(Path(filename).stem))